@@ -2,14 +2,17 @@
 Application Streamlit - Tableau de Bord Segmentation Client
 Dashboard business pour stakeholders et managers
 """
+import logging
+import time
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from src.data_preprocessing import load_and_clean_data
-from src.rfm_analysis import calculate_rfm, score_rfm, map_rfm_to_segment
+from src.rfm_analysis import calculate_rfm, score_rfm, assign_segments
 from src.basket_analysis import perform_basket_analysis
-from src.recommendations import get_customer_recommendations
+from src.recommendations import build_segment_popularity, get_customer_recommendations
 from src.metrics import (
     compute_global_metrics, 
     compute_segment_metrics, 
@@ -17,6 +20,18 @@ from src.metrics import (
     compute_business_insights,
     get_segment_actions
 )
+from src.artifact_store import (artifact_versions, dataset_version, default_store_dir, read_artifact,
+                                store_exists, write_artifacts)
+from src.cache import get_or_compute
+from src.compact import decode_labels
+from src.config import get_settings
+from src.customer_index import build_customer_index, get_customer_summary, get_customer_transactions
+from src.rule_index import build_rule_index
+from src.sketches import GlobalMetricsSketch
+from src.item_similarity import build_item_similarity, similarity_from_frame
+from src.profiling import profiling_enabled, summarize
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 st.set_page_config(
@@ -116,26 +131,6 @@ st.markdown("""
         box-shadow: 0 2px 8px rgba(0,0,0,0.08);
     }
     
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 4px;
-        background: #f0f2f5;
-        padding: 0.4rem;
-        border-radius: 8px;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background: white;
-        border-radius: 6px;
-        font-weight: 500;
-        padding: 0.4rem 1rem;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(135deg, #4361ee 0%, #3a0ca3 100%);
-        color: white;
-    }
-    
     /* Priority badges */
     .priority-critique { color: #ef476f; font-weight: 700; }
     .priority-haute { color: #f77f00; font-weight: 600; }
@@ -148,59 +143,142 @@ st.markdown("""
 st.markdown('<p class="main-header">Tableau de Bord Segmentation Client</p>', unsafe_allow_html=True)
 
 # Chargement des données (pré-calculées ou calcul à la volée)
-@st.cache_data
-def load_app_data():
+PROCESSED_DIR = default_store_dir()
+
+# Colonnes de transactions utilisées par chaque onglet (projection Parquet)
+TAB_COLUMNS = {
+    'synthese': ('CustomerID', 'InvoiceNo', 'Description', 'TotalPrice'),
+    'performance': ('CustomerID', 'InvoiceNo', 'Description', 'TotalPrice'),
+    'actions': ('CustomerID', 'InvoiceNo', 'Description', 'TotalPrice'),
+    'client_360': ('CustomerID', 'InvoiceNo', 'InvoiceDate', 'Description', 'Quantity', 'TotalPrice'),
+}
+
+def ensure_store():
+    """
+    Calcul complet si le store n'existe pas : les artefacts sont écrits
+    pour accélérer les démarrages suivants
+    """
+    if not store_exists(PROCESSED_DIR):
+        df = load_and_clean_data()
+        rfm = calculate_rfm(df)
+        rfm_scored = score_rfm(rfm)
+        rfm_scored['Segment'] = assign_segments(rfm_scored)
+        rules = perform_basket_analysis(df)
+        write_artifacts(PROCESSED_DIR, df, rfm_scored, rules)
+
+# Chaque chargeur prend la version du store en argument (clé de cache) :
+# une réécriture du store (ex. --incremental) les invalide tous ensemble,
+# sans mélange entre anciennes et nouvelles données.
+
+@st.cache_data(max_entries=2)
+def load_app_data(version):
+    """Chargement des données pré-calculées (RFM et règles) depuis le store Parquet"""
+    rfm = read_artifact(PROCESSED_DIR, 'rfm_segments')
+    rules = read_artifact(PROCESSED_DIR, 'association_rules')
+    return rfm, rules
+
+@st.cache_data(max_entries=2 * len(TAB_COLUMNS))
+def load_transactions(columns, version):
+    """Chargement des transactions limité aux colonnes d'un onglet"""
+    return read_artifact(PROCESSED_DIR, 'transactions', columns=columns)
+
+@st.cache_resource(max_entries=2)
+def load_customer_index(version):
+    """
+    Index client construit une fois par version du store (partagé entre
+    sessions, à ne pas modifier) : sélection d'un client en O(1)
     """
-    Chargement des données pré-calculées pour un démarrage rapide.
-    Fallback sur calcul complet si les fichiers n'existent pas.
+    return build_customer_index(read_artifact(PROCESSED_DIR, 'transactions',
+                                              columns=TAB_COLUMNS['client_360']))
+
+@st.cache_resource(max_entries=2)
+def load_rule_index(version):
+    """
+    Règles d'association compilées une fois par version du store (index
+    inversé produit -> règles, partagé entre sessions)
+    """
+    return build_rule_index(load_app_data(version)[1])
+
+@st.cache_resource(max_entries=2)
+def load_segment_popularity(version):
+    """Meilleures ventes par segment, calculées une fois par version du store"""
+    transactions = read_artifact(PROCESSED_DIR, 'transactions',
+                                 columns=['CustomerID', 'Description', 'TotalPrice'])
+    segments = read_artifact(PROCESSED_DIR, 'rfm_segments', columns=['Segment'])
+    return build_segment_popularity(transactions, segments)
+
+@st.cache_resource(max_entries=2)
+def load_item_similarity(version):
+    """
+    Voisinages produits top-K : lus dans le store (pré-calcul), sinon
+    calculés depuis les transactions, une fois par version du store
+    """
+    if store_exists(PROCESSED_DIR, names=('item_similarity',)):
+        return similarity_from_frame(read_artifact(PROCESSED_DIR, 'item_similarity'))
+    return build_item_similarity(read_artifact(PROCESSED_DIR, 'transactions',
+                                               columns=['CustomerID', 'Description']))
+
+@st.cache_resource(max_entries=2)
+def load_global_metrics_sketch(version):
+    """
+    Sketch des KPIs globaux écrit par precompute (HyperLogLog, Space-Saving) :
+    en mode metrics.approximate, les KPIs globaux ne sont pas recalculés
+    depuis les transactions
+    """
+    return GlobalMetricsSketch.from_frame(read_artifact(PROCESSED_DIR, 'global_metrics_sketch'))
+
+def _artifact_version(name):
+    """Version du store complétée par celle d'un artefact optionnel (absent des stores anciens)"""
+    if store_exists(PROCESSED_DIR, names=(name,)):
+        return (data_version,) + artifact_versions(PROCESSED_DIR, [name])
+    return None
+
+def persistent_selectbox(label, options, key):
     """
-    import os
-    import pickle
-    
-    processed_dir = os.path.join(os.path.dirname(__file__), 'data', 'processed')
-    transactions_path = os.path.join(processed_dir, 'transactions.csv')
-    rfm_path = os.path.join(processed_dir, 'rfm_segments.csv')
-    rules_path = os.path.join(processed_dir, 'association_rules.pkl')
-    
-    # Vérifier si les fichiers pré-calculés existent
-    if all(os.path.exists(p) for p in [transactions_path, rfm_path, rules_path]):
-        # Chargement rapide des données pré-calculées
-        df = pd.read_csv(transactions_path, parse_dates=['InvoiceDate'])
-        rfm = pd.read_csv(rfm_path, index_col='CustomerID')
-        with open(rules_path, 'rb') as f:
-            rules = pickle.load(f)
-        return df, rfm, rules
-    
-    # Fallback: calcul complet (première exécution ou données manquantes)
-    from src.data_preprocessing import load_and_clean_data
-    from src.rfm_analysis import calculate_rfm, score_rfm, map_rfm_to_segment
-    from src.basket_analysis import perform_basket_analysis
-    
-    df = load_and_clean_data()
-    rfm = calculate_rfm(df)
-    rfm_scored = score_rfm(rfm)
-    rfm_scored['Segment'] = rfm_scored.apply(
-        lambda row: map_rfm_to_segment(int(row['R_score']), int(row['F_score']), int(row['M_score'])),
-        axis=1
-    )
-    rules = perform_basket_analysis(df)
-    return df, rfm_scored, rules
+    Sélection conservée quand son onglet n'est pas rendu
 
-df, rfm, rules = load_app_data()
+    Streamlit efface l'état d'un widget absent d'un rerun : la valeur est
+    recopiée dans une clé de session distincte (`key`) qui sert de valeur
+    initiale quand l'onglet est de nouveau affiché.
+    """
+    if st.session_state.get(key) not in options:
+        st.session_state[key] = options[0] if options else None
+    value = st.selectbox(label, options, index=options.index(st.session_state[key]) if options else None,
+                         key=f"{key}_widget", label_visibility="collapsed")
+    st.session_state[key] = value
+    return value
 
-# Onglets principaux
-tabs = st.tabs([
-    'Synthese Executive',
-    'Performance Segments', 
-    'Actions Prioritaires',
-    'Client 360'
-])
+ensure_store()
+# Version des données, calculée avant tout chargement : les chargeurs et
+# les agrégats (src/cache.py) sont indexés par elle, partagés entre onglets
+# et sessions
+data_version = dataset_version(PROCESSED_DIR)
+similarity_version = _artifact_version('item_similarity') or (data_version,)
+sketch_version = _artifact_version('global_metrics_sketch')
+rfm, rules = load_app_data(data_version)
 
 # ========== ONGLET 1: SYNTHESE EXECUTIVE ==========
-with tabs[0]:
+def render_synthese():
+    """Onglet Synthese Executive"""
+    df = load_transactions(TAB_COLUMNS['synthese'], data_version)
+    
     # KPIs globaux
-    global_metrics = compute_global_metrics(df)
-    insights = compute_business_insights(df, rfm)
+    # Exact ou par sketches selon metrics.* : la configuration fait partie de la clé
+    metrics_config = get_settings().metrics
+    if metrics_config.approximate and sketch_version is not None:
+        global_metrics = get_or_compute(
+            'global_metrics', data_version,
+            lambda: load_global_metrics_sketch(sketch_version).result(),
+            params=(metrics_config, sketch_version))
+    else:
+        global_metrics = get_or_compute('global_metrics', data_version,
+                                        lambda: compute_global_metrics(df), params=(metrics_config,))
+    # En mode approché, CA total lu dans le sketch persisté (pas d'agrégat des transactions)
+    sketch = (load_global_metrics_sketch(sketch_version)
+              if metrics_config.approximate and sketch_version is not None else None)
+    insights = get_or_compute('business_insights', data_version,
+                              lambda: compute_business_insights(df, rfm, sketch=sketch),
+                              params=(metrics_config, sketch_version))
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -280,7 +358,8 @@ with tabs[0]:
     
     with col_chart1:
         st.markdown('<p class="section-header">Repartition du CA par Segment</p>', unsafe_allow_html=True)
-        segments_metrics = get_all_segments_metrics(df, rfm)
+        segments_metrics = get_or_compute('all_segments_metrics', data_version,
+                                          lambda: get_all_segments_metrics(df, rfm))
         fig_ca = px.bar(
             segments_metrics,
             x='Segment',
@@ -323,14 +402,18 @@ with tabs[0]:
         st.plotly_chart(fig_comparison, use_container_width=True)
 
 # ========== ONGLET 2: PERFORMANCE SEGMENTS ==========
-with tabs[1]:
+def render_performance():
+    """Onglet Performance Segments"""
+    df = load_transactions(TAB_COLUMNS['performance'], data_version)
     st.markdown('<p class="section-header">Selection du Segment</p>', unsafe_allow_html=True)
     
     segments = sorted(rfm['Segment'].unique())
-    selected_segment = st.selectbox("Segment", segments, label_visibility="collapsed")
+    selected_segment = persistent_selectbox("Segment", segments, key='segment_select')
     
     if selected_segment:
-        segment_metrics = compute_segment_metrics(df, rfm, selected_segment)
+        segment_metrics = get_or_compute('segment_metrics', data_version,
+                                         lambda: compute_segment_metrics(df, rfm, selected_segment),
+                                         params=(selected_segment,))
         segment_data = rfm[rfm['Segment'] == selected_segment]
         nb_clients = len(segment_data)
         
@@ -409,11 +492,14 @@ with tabs[1]:
             """, unsafe_allow_html=True)
 
 # ========== ONGLET 3: ACTIONS PRIORITAIRES ==========
-with tabs[2]:
+def render_actions():
+    """Onglet Actions Prioritaires"""
+    df = load_transactions(TAB_COLUMNS['actions'], data_version)
     st.markdown('<p class="section-header">Matrice des Actions par Segment</p>', unsafe_allow_html=True)
     
     # Tableau des actions
-    segments_metrics = get_all_segments_metrics(df, rfm)
+    segments_metrics = get_or_compute('all_segments_metrics', data_version,
+                                      lambda: get_all_segments_metrics(df, rfm))
     actions_data = []
     for segment in segments_metrics['Segment']:
         actions = get_segment_actions(segment)
@@ -462,11 +548,17 @@ with tabs[2]:
         st.info("Aucun client haute valeur identifié comme à risque")
 
 # ========== ONGLET 4: CLIENT 360 ==========
-with tabs[3]:
+def render_client_360():
+    """Onglet Client 360"""
+    customer_index = load_customer_index(data_version)
+    rule_index = load_rule_index(data_version)
+    segment_popularity = load_segment_popularity(data_version)
+    item_similarity = load_item_similarity(similarity_version)
+    df = customer_index['transactions']
     st.markdown('<p class="section-header">Selection du Client</p>', unsafe_allow_html=True)
     
     customer_ids = sorted(rfm.index)
-    selected_customer = st.selectbox("Client", customer_ids, key='customer_select', label_visibility="collapsed")
+    selected_customer = persistent_selectbox("Client", customer_ids, key='customer_select')
     
     if selected_customer:
         customer_segment = rfm.loc[selected_customer, 'Segment']
@@ -490,19 +582,23 @@ with tabs[3]:
         
         with col_left:
             st.markdown('<p class="section-header">Historique Achats</p>', unsafe_allow_html=True)
-            history = df[df['CustomerID'] == selected_customer][['InvoiceDate', 'Description', 'Quantity', 'TotalPrice']]
-            history = history.sort_values('InvoiceDate', ascending=False).head(10).copy()
+            customer_tx = get_customer_transactions(customer_index, selected_customer)
+            history = customer_tx[['InvoiceDate', 'Description', 'Quantity', 'TotalPrice']]
+            history = decode_labels(history.sort_values('InvoiceDate', ascending=False).head(10))
             history['TotalPrice'] = history['TotalPrice'].apply(lambda x: f"£{x:,.0f}")
             history.columns = ['Date', 'Produit', 'Qté', 'Montant']
             st.dataframe(history, use_container_width=True, hide_index=True)
             
-            unique_products = df[df['CustomerID'] == selected_customer]['Description'].nunique()
-            total_orders = df[df['CustomerID'] == selected_customer]['InvoiceNo'].nunique()
-            st.markdown(f"**{unique_products}** produits uniques | **{total_orders}** commandes")
+            summary = get_customer_summary(customer_index, selected_customer)
+            st.markdown(f"**{summary['nb_produits']}** produits uniques | **{summary['nb_commandes']}** commandes")
         
         with col_right:
             st.markdown('<p class="section-header">Recommandations Produit</p>', unsafe_allow_html=True)
-            recs_data = get_customer_recommendations(df, rfm, rules, selected_customer)
+            recs_data = get_customer_recommendations(df, rfm, rules, selected_customer,
+                                                     customer_index=customer_index,
+                                                     rule_index=rule_index,
+                                                     segment_popularity=segment_popularity,
+                                                     item_similarity=item_similarity)
             
             if len(recs_data['recommendations']) > 0:
                 recs_df = pd.DataFrame(recs_data['recommendations'])
@@ -521,4 +617,46 @@ with tabs[3]:
                 <strong>{actions['action']}</strong><br>
                 {actions['tactique']}
             </div>
-            """, unsafe_allow_html=True)
\ No newline at end of file
+            """, unsafe_allow_html=True)
+
+# ========== NAVIGATION ==========
+# Rendu paresseux : seul l'onglet affiché est exécuté à chaque rerun
+# (st.tabs exécute les quatre blocs à chaque interaction)
+TABS = {
+    'Synthese Executive': render_synthese,
+    'Performance Segments': render_performance,
+    'Actions Prioritaires': render_actions,
+    'Client 360': render_client_360,
+}
+
+selected_tab = st.radio("Onglet", list(TABS), horizontal=True,
+                        label_visibility="collapsed", key='onglet')
+start = time.perf_counter()
+TABS[selected_tab]()
+render_time = time.perf_counter() - start
+
+# Instrumentation : temps de rendu par onglet (dernier et moyenne de la session)
+render_times = st.session_state.setdefault('render_times', {})
+tab_times = render_times.setdefault(selected_tab, [])
+tab_times.append(render_time)
+del tab_times[:-50]  # 50 derniers rendus par onglet
+logger.info("Rendu onglet %s : %.0f ms", selected_tab, render_time * 1000)
+with st.sidebar.expander("Temps de rendu"):
+    st.dataframe(pd.DataFrame([
+        {'Onglet': tab,
+         'Dernier (ms)': round(times[-1] * 1000),
+         'Moyenne (ms)': round(sum(times) / len(times) * 1000),
+         'Rendus': len(times)}
+        for tab, times in render_times.items()
+    ]), use_container_width=True, hide_index=True)
+
+# Profilage des étapes (SEGMENTATION_PROFILE=1) : mesures cumulées du processus
+if profiling_enabled():
+    with st.sidebar.expander("Profilage"):
+        st.dataframe(pd.DataFrame([
+            {'Étape': name, 'Appels': entry['calls'],
+             'Total (ms)': round(entry['total_s'] * 1000),
+             'Max (ms)': round(entry['max_s'] * 1000),
+             'Pic RSS (Mo)': entry['max_peak_rss_mb']}
+            for name, entry in sorted(summarize().items(), key=lambda item: -item[1]['total_s'])
+        ]), use_container_width=True, hide_index=True)
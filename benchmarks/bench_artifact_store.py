@@ -0,0 +1,72 @@
+"""
+Benchmark du store d'artefacts
+Temps de chargement Parquet (complet et projeté) contre le chemin CSV historique
+
+Usage : python benchmarks/bench_artifact_store.py [--rows 500000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifact_store import read_artifact, write_artifact
+from src.synthetic import generate_transactions
+
+
+def _best_time(fn, repeat):
+    """Meilleur temps d'exécution sur `repeat` essais"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = generate_transactions(args.rows)
+    df = df[(df['Quantity'] > 0) & df['CustomerID'].notna()].copy()
+    df['CustomerID'] = df['CustomerID'].astype('Int64')
+    df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
+    df['InvoiceMonth'] = df['InvoiceDate'].dt.to_period('M')
+
+    client_columns = ['CustomerID', 'InvoiceNo', 'InvoiceDate', 'Description', 'Quantity', 'TotalPrice']
+    summary_columns = ['CustomerID', 'InvoiceNo', 'Description', 'TotalPrice']
+
+    with tempfile.TemporaryDirectory() as store_dir:
+        csv_path = os.path.join(store_dir, 'transactions.csv')
+        df.to_csv(csv_path, index=False)
+        write_artifact(store_dir, 'transactions', df)
+
+        csv_size = os.path.getsize(csv_path)
+        parquet_size = os.path.getsize(os.path.join(store_dir, 'transactions.parquet'))
+
+        results = [
+            ('CSV (parse_dates)', _best_time(
+                lambda: pd.read_csv(csv_path, parse_dates=['InvoiceDate']), args.repeat)),
+            ('Parquet complet', _best_time(
+                lambda: read_artifact(store_dir, 'transactions'), args.repeat)),
+            ('Parquet Client 360', _best_time(
+                lambda: read_artifact(store_dir, 'transactions', columns=client_columns), args.repeat)),
+            ('Parquet Synthese', _best_time(
+                lambda: read_artifact(store_dir, 'transactions', columns=summary_columns), args.repeat)),
+        ]
+
+    print(f"{len(df):,} transactions | CSV {csv_size / 1e6:.1f} Mo | Parquet {parquet_size / 1e6:.1f} Mo")
+    baseline = results[0][1]
+    for label, seconds in results:
+        print(f"{label:<22} {seconds * 1000:>9.1f} ms   x{baseline / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de la construction du panier
+Panier dense historique (groupby/unstack/map) contre matrice creuse CSR
+
+Usage : python benchmarks/bench_basket.py [--rows 540000] [--min-support 0.01]
+
+Mesure temps et mémoire de construction sur l'ensemble des factures
+(sans échantillonnage), puis le minage apriori sur la matrice creuse.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+from mlxtend.frequent_patterns import apriori
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.basket_analysis import basket_to_frame, build_sparse_basket
+from src.data_preprocessing import add_features, clean_transactions
+from src.synthetic import generate_transactions
+
+
+def legacy_dense_basket(df):
+    """Version historique : matrice dense float puis binarisation élément par élément"""
+    return (df.groupby(['InvoiceNo', 'Description'])['Quantity']
+            .sum().unstack().fillna(0)
+            .map(lambda x: 1 if x > 0 else 0))
+
+
+def _measure(fn, trace=True):
+    """
+    Temps et pic mémoire Python (tracemalloc) d'un appel
+
+    tracemalloc ralentit fortement le code Python élément par élément :
+    il est désactivé pour le panier historique (pic non mesuré).
+    """
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=540_000, help="taille du jeu UCI par défaut")
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--skip-legacy', action='store_true',
+                        help="ne pas mesurer le panier dense (plusieurs minutes à pleine échelle)")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    df = add_features(clean_transactions(generate_transactions(args.rows)))
+    print(f"{len(df):,} transactions, {df['InvoiceNo'].nunique():,} factures, "
+          f"{df['Description'].nunique():,} produits")
+
+    (basket, _, products), sparse_time, sparse_peak = _measure(lambda: build_sparse_basket(df))
+    sparse_bytes = basket.data.nbytes + basket.indices.nbytes + basket.indptr.nbytes
+    print(f"CSR creux      {sparse_time:>8.2f}s  pic {sparse_peak / 1e6:>8.1f} Mo  "
+          f"matrice {sparse_bytes / 1e6:>7.1f} Mo  ({basket.shape[0]:,} x {basket.shape[1]:,}, nnz {basket.nnz:,})")
+
+    if not args.skip_legacy:
+        dense, dense_time, _ = _measure(lambda: legacy_dense_basket(df), trace=False)
+        dense_bytes = dense.memory_usage(index=False).sum()
+        print(f"dense (histo)  {dense_time:>8.2f}s  pic {'-':>8}     "
+              f"matrice {dense_bytes / 1e6:>7.1f} Mo")
+        del dense
+
+    frame = basket_to_frame(basket, products, dense_cell_limit=0)
+    itemsets, mining_time, mining_peak = _measure(
+        lambda: apriori(frame, min_support=args.min_support, use_colnames=True, low_memory=True))
+    print(f"apriori creux  {mining_time:>8.2f}s  pic {mining_peak / 1e6:>8.1f} Mo  "
+          f"{len(itemsets):,} itemsets (support >= {args.min_support})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark de la similarité produit-produit
+Construction des voisinages top-K par blocs et latence de recherche, selon la taille du catalogue
+
+Usage : python benchmarks/bench_item_similarity.py [--rows 540000] [--products 4000 10000 20000]
+        [--metric cosine] [--k 20]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.customer_index import build_customer_index, get_customer_products
+from src.data_preprocessing import add_features, clean_transactions
+from src.item_similarity import SIMILARITY_METRICS, build_item_similarity, similar_products
+from src.synthetic import generate_transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=540_000, help="taille du jeu UCI par défaut")
+    parser.add_argument('--products', type=int, nargs='+', default=[4000, 10_000, 20_000])
+    parser.add_argument('--metric', default='cosine', choices=SIMILARITY_METRICS)
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    print(f"{'produits':>9} {'clients':>8} {'construction':>13} {'recherche':>11}")
+    for n_products in args.products:
+        df = add_features(clean_transactions(generate_transactions(args.rows, n_products=n_products)))
+        start = time.perf_counter()
+        similarity = build_item_similarity(df, k=args.k, metric=args.metric)
+        build_time = time.perf_counter() - start
+
+        customer_index = build_customer_index(df)
+        rng = np.random.default_rng(0)
+        customers = rng.choice(customer_index['customer_ids'], size=args.lookups)
+        histories = [set(get_customer_products(customer_index, cid)) for cid in customers]
+        start = time.perf_counter()
+        for history in histories:
+            similar_products(similarity, history, top_n=5)
+        lookup_time = (time.perf_counter() - start) / len(histories)
+
+        print(f"{len(similarity['products']):>9,} {len(customer_index['customer_ids']):>8,} "
+              f"{build_time:>12.2f}s {lookup_time * 1e3:>9.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
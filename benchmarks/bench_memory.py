@@ -0,0 +1,52 @@
+"""
+Benchmark de l'empreinte mémoire des transactions
+Octets par ligne et par colonne avant / après la représentation compacte, et temps des agrégats
+
+Usage : python benchmarks/bench_memory.py [--rows 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.compact import compact_transactions, memory_report
+from src.data_preprocessing import add_features, clean_transactions
+from src.metrics import compute_global_metrics
+from src.rfm_analysis import calculate_rfm, compute_segment_evolution
+from src.synthetic import generate_transactions
+
+
+def _timed(fn, df):
+    start = time.perf_counter()
+    fn(df)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = add_features(clean_transactions(generate_transactions(args.rows, affinity=0.3)))
+    start = time.perf_counter()
+    compacted = compact_transactions(df)
+    compact_time = time.perf_counter() - start
+
+    report = memory_report(df, compacted)
+    print(f"{len(df):,} transactions nettoyées, compactage en {compact_time:.2f}s\n")
+    print(report.to_string())
+    total = report.loc['Total']
+    print(f"\nTotal : {total['octets_avant'] * len(df) / 1e6:,.0f} Mo -> "
+          f"{total['octets_apres'] * len(df) / 1e6:,.0f} Mo")
+
+    print(f"\n{'agrégat':<28} {'objets':>9} {'compact':>9}")
+    for name, fn in [('calculate_rfm', calculate_rfm),
+                     ('compute_global_metrics', compute_global_metrics),
+                     ('compute_segment_evolution', compute_segment_evolution)]:
+        print(f"{name:<28} {_timed(fn, df):>8.3f}s {_timed(fn, compacted):>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
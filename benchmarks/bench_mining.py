@@ -0,0 +1,65 @@
+"""
+Benchmark des moteurs d'extraction d'itemsets
+apriori / fpgrowth (mlxtend) / eclat (bitsets) selon le support minimum
+
+Usage : python benchmarks/bench_mining.py [--rows 540000] [--supports 0.05 0.02 0.01 0.005 0.002]
+        [--algorithms apriori fpgrowth eclat] [--timeout 300]
+
+Chaque moteur tourne sur la même matrice creuse (toutes les factures, produits
+élagués sous le support) ; le nombre d'itemsets doit être identique.
+Un moteur dépassant --timeout à un support n'est plus mesuré aux supports inférieurs.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.basket_analysis import MINING_ALGORITHMS, build_sparse_basket, mine_frequent_itemsets
+from src.data_preprocessing import add_features, clean_transactions
+from src.synthetic import generate_transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=540_000, help="taille du jeu UCI par défaut")
+    parser.add_argument('--supports', type=float, nargs='+', default=[0.05, 0.02, 0.01, 0.005, 0.002])
+    parser.add_argument('--algorithms', nargs='+', default=list(MINING_ALGORITHMS),
+                        choices=MINING_ALGORITHMS)
+    parser.add_argument('--timeout', type=float, default=300,
+                        help="secondes au-delà desquelles un moteur est abandonné")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    df = add_features(clean_transactions(generate_transactions(args.rows)))
+    basket, _, products = build_sparse_basket(df)
+    counts = np.asarray(basket.sum(axis=0)).ravel()
+    print(f"{basket.shape[0]:,} factures x {basket.shape[1]:,} produits, nnz {basket.nnz:,}")
+    print(f"{'support':>8} {'moteur':>9} {'temps':>9} {'itemsets':>9}")
+
+    abandoned = set()
+    for min_support in sorted(args.supports, reverse=True):
+        frequent = counts >= min_support * basket.shape[0]
+        pruned, pruned_products = basket[:, frequent], products[frequent]
+        sizes = {}
+        for algorithm in args.algorithms:
+            if algorithm in abandoned:
+                print(f"{min_support:>8} {algorithm:>9} {'-':>9} {'-':>9}")
+                continue
+            start = time.perf_counter()
+            itemsets = mine_frequent_itemsets(pruned, pruned_products, min_support, algorithm)
+            elapsed = time.perf_counter() - start
+            sizes[algorithm] = len(itemsets)
+            print(f"{min_support:>8} {algorithm:>9} {elapsed:>8.2f}s {len(itemsets):>9,}")
+            if elapsed > args.timeout:
+                abandoned.add(algorithm)
+        if len(set(sizes.values())) > 1:
+            print(f"  ⚠ nombres d'itemsets différents : {sizes}")
+
+
+if __name__ == "__main__":
+    main()
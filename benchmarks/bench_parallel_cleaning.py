@@ -0,0 +1,43 @@
+"""
+Benchmark du nettoyage parallèle
+Nettoyage et features en un processus contre partitions par facture sur un pool de processus
+
+Usage : python benchmarks/bench_parallel_cleaning.py [--rows 2000000] [--jobs 1 2 4 8]
+
+Vérifie que le résultat est identique au nettoyage en un seul processus.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_preprocessing import add_features, clean_and_featurize_parallel, clean_transactions
+from src.synthetic import generate_transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    raw = generate_transactions(args.rows)
+    print(f"{len(raw):,} lignes brutes, {os.cpu_count()} cœurs")
+
+    start = time.perf_counter()
+    reference = add_features(clean_transactions(raw))
+    serial_time = time.perf_counter() - start
+    print(f"{'1 processus':>14} {serial_time:>8.2f}s  {len(reference):,} lignes")
+
+    for n_jobs in args.jobs:
+        start = time.perf_counter()
+        cleaned = clean_and_featurize_parallel(raw, n_jobs)
+        elapsed = time.perf_counter() - start
+        status = "identique" if cleaned.equals(reference) else "⚠ DIFFÉRENT"
+        print(f"{f'x{n_jobs}':>14} {elapsed:>8.2f}s  x{serial_time / elapsed:.2f}  {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark du minage partitionné (SON)
+Minage en un processus contre partitions de factures sur un pool de processus
+
+Usage : python benchmarks/bench_partitioned_mining.py [--rows 540000] [--min-support 0.003]
+        [--algorithm fpgrowth] [--jobs 1 2 4 8]
+
+Vérifie que les itemsets sont identiques au minage en un seul processus.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.basket_analysis import (MINING_ALGORITHMS, build_sparse_basket, mine_frequent_itemsets,
+                                 mine_frequent_itemsets_partitioned)
+from src.data_preprocessing import add_features, clean_transactions
+from src.synthetic import generate_transactions
+
+
+def _itemset_supports(itemsets):
+    return dict(zip(itemsets['itemsets'], itemsets['support'].round(12)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=540_000, help="taille du jeu UCI par défaut")
+    parser.add_argument('--min-support', type=float, default=0.003)
+    parser.add_argument('--algorithm', default='fpgrowth', choices=MINING_ALGORITHMS)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    df = add_features(clean_transactions(generate_transactions(args.rows)))
+    basket, _, products = build_sparse_basket(df)
+    print(f"{basket.shape[0]:,} factures x {basket.shape[1]:,} produits, "
+          f"{os.cpu_count()} cœurs, support {args.min_support}, {args.algorithm}")
+
+    start = time.perf_counter()
+    reference = mine_frequent_itemsets(basket, products, args.min_support, args.algorithm)
+    serial_time = time.perf_counter() - start
+    print(f"{'1 processus':>14} {serial_time:>8.2f}s  {len(reference):,} itemsets")
+
+    expected = _itemset_supports(reference)
+    for n_jobs in args.jobs:
+        start = time.perf_counter()
+        itemsets = mine_frequent_itemsets_partitioned(basket, products, args.min_support,
+                                                      args.algorithm, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - start
+        status = "identique" if _itemset_supports(itemsets) == expected else "⚠ DIFFÉRENT"
+        print(f"{f'SON x{n_jobs}':>14} {elapsed:>8.2f}s  x{serial_time / elapsed:.2f}  {status}")
+
+
+if __name__ == "__main__":
+    main()
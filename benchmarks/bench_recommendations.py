@@ -0,0 +1,90 @@
+"""
+Benchmark du rapprochement historique / règles
+Parcours iterrows historique contre index de règles compilé
+
+Usage : python benchmarks/bench_recommendations.py [--rows 540000] [--customers 200]
+        [--min-support 0.002]
+
+Les règles sont minées à bas support puis tronquées à 50, 500 et toutes ;
+la latence est moyennée sur un échantillon de clients.
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+from mlxtend.frequent_patterns import association_rules
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.basket_analysis import build_sparse_basket, mine_frequent_itemsets, rank_rules
+from src.customer_index import build_customer_index, get_customer_products
+from src.data_preprocessing import add_features, clean_transactions
+from src.rule_index import build_rule_index, match_rules
+from src.synthetic import generate_transactions
+
+
+def legacy_matched_products(rules, history):
+    """Version historique : un test d'inclusion par règle à chaque appel"""
+    matched = []
+    for _, rule in rules.iterrows():
+        if set(rule['antecedents']).issubset(history):
+            for cons in rule['consequents']:
+                if cons not in history:
+                    matched.append(cons)
+    return matched
+
+
+def indexed_matched_products(index, history):
+    """Règles atteintes par l'historique uniquement"""
+    matched = []
+    for rule_id in match_rules(index, history):
+        matched.extend(cons for cons in index['consequents'][rule_id] if cons not in history)
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=540_000, help="taille du jeu UCI par défaut")
+    parser.add_argument('--customers', type=int, default=200)
+    parser.add_argument('--min-support', type=float, default=0.002)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+
+    df = add_features(clean_transactions(generate_transactions(args.rows)))
+    basket, _, products = build_sparse_basket(df)
+    itemsets = mine_frequent_itemsets(basket, products, args.min_support, 'fpgrowth')
+    all_rules = rank_rules(association_rules(itemsets, metric='lift', min_threshold=1.0))
+    all_rules = all_rules.reset_index(drop=True)
+
+    customer_index = build_customer_index(df)
+    rng = np.random.default_rng(0)
+    customers = rng.choice(customer_index['customer_ids'], size=args.customers, replace=False)
+    histories = [set(get_customer_products(customer_index, cid)) for cid in customers]
+    print(f"{len(all_rules):,} règles, {len(histories)} clients, "
+          f"historique moyen {np.mean([len(h) for h in histories]):.0f} produits")
+    print(f"{'règles':>8} {'iterrows':>12} {'index':>12} {'compilation':>12}")
+
+    for n_rules in [50, 500, len(all_rules)]:
+        rules = all_rules.head(n_rules)
+        start = time.perf_counter()
+        index = build_rule_index(rules)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = [indexed_matched_products(index, history) for history in histories]
+        indexed_time = (time.perf_counter() - start) / len(histories)
+
+        start = time.perf_counter()
+        legacy = [legacy_matched_products(rules, history) for history in histories]
+        legacy_time = (time.perf_counter() - start) / len(histories)
+
+        assert legacy == indexed, "résultats différents"
+        print(f"{n_rules:>8,} {legacy_time * 1e3:>10.2f}ms {indexed_time * 1e3:>10.3f}ms "
+              f"{build_time * 1e3:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark du calcul RFM
+Implémentation historique (lambda par client) contre les moteurs vectorisés
+
+Usage : python benchmarks/bench_rfm.py [--sizes 1000000 10000000 50000000]
+
+Les colonnes utiles au RFM sont générées directement en NumPy (factures
+codées en entiers) pour tenir 50M de lignes en mémoire.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.rfm_analysis import calculate_rfm
+
+
+def legacy_calculate_rfm(df, snapshot_date):
+    """Version historique : un appel Python par client pour la récence"""
+    return df.groupby('CustomerID').agg({
+        'InvoiceDate': lambda x: (snapshot_date - x.max()).days,
+        'InvoiceNo': 'nunique',
+        'TotalPrice': 'sum'
+    }).rename(columns={
+        'InvoiceDate': 'Récence',
+        'InvoiceNo': 'Fréquence',
+        'TotalPrice': 'Montant'
+    })
+
+
+def rfm_frame(n_rows, seed=42):
+    """Transactions minimales (CustomerID, InvoiceNo, InvoiceDate, TotalPrice)"""
+    rng = np.random.default_rng(seed)
+    n_customers = max(100, n_rows // 100)
+    n_invoices = max(1000, n_rows // 20)
+    invoice_customer = rng.integers(0, n_customers, size=n_invoices)
+    invoice_date = pd.Timestamp('2010-12-01').value + rng.integers(0, 374 * 86_400, size=n_invoices) * 10**9
+    invoices = np.sort(rng.integers(0, n_invoices, size=n_rows))
+    return pd.DataFrame({
+        'CustomerID': pd.array(12346 + invoice_customer[invoices], dtype='Int64'),
+        'InvoiceNo': invoices,
+        'InvoiceDate': pd.to_datetime(invoice_date[invoices]),
+        'TotalPrice': np.round(rng.lognormal(2.0, 1.0, size=n_rows), 2),
+    })
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument('--legacy-max-rows', type=int, default=10_000_000,
+                        help="Taille au-delà de laquelle la version historique n'est pas mesurée")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>12} {'historique':>12} {'pandas':>10} {'numpy':>10} {'gain':>8}")
+    for n_rows in args.sizes:
+        df = rfm_frame(n_rows)
+        snapshot = df['InvoiceDate'].max() + timedelta(days=1)
+
+        pandas_time, rfm = _timed(lambda: calculate_rfm(df, snapshot))
+        numpy_time, rfm_np = _timed(lambda: calculate_rfm(df, snapshot, engine='numpy'))
+        pd.testing.assert_frame_equal(rfm, rfm_np, check_exact=False)
+
+        if n_rows <= args.legacy_max_rows:
+            legacy_time, legacy = _timed(lambda: legacy_calculate_rfm(df, snapshot))
+            pd.testing.assert_frame_equal(legacy, rfm, check_exact=False)
+            legacy_label = f"{legacy_time:>11.2f}s"
+            gain = f"x{legacy_time / min(pandas_time, numpy_time):.1f}"
+        else:
+            legacy_label, gain = f"{'-':>12}", '-'
+
+        print(f"{n_rows:>12,} {legacy_label} {pandas_time:>9.2f}s {numpy_time:>9.2f}s {gain:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark des métriques par segment
+Boucle historique (un filtrage isin par segment) contre l'agrégation en un passage
+
+Usage : python benchmarks/bench_segment_metrics.py [--rows 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_preprocessing import add_features, clean_transactions
+from src.metrics import compute_segment_metrics, get_all_segments_metrics
+from src.rfm_analysis import assign_segments, calculate_rfm, score_rfm
+from src.synthetic import generate_transactions
+
+
+def legacy_get_all_segments_metrics(df, rfm):
+    """Version historique : un parcours complet des transactions par segment"""
+    metrics_list = []
+    ca_total_global = df['TotalPrice'].sum()
+    for segment in rfm['Segment'].unique():
+        metrics = compute_segment_metrics(df, rfm, segment)
+        nb_clients = len(rfm[rfm['Segment'] == segment])
+        ca_segment = metrics['ca_total']
+        metrics_list.append({
+            'Segment': segment,
+            'Clients': nb_clients,
+            'Part Clients': nb_clients / len(rfm) * 100,
+            'CA': ca_segment,
+            'Part CA': ca_segment / ca_total_global * 100 if ca_total_global > 0 else 0,
+            'Panier Moyen': metrics['panier_moyen'],
+            'Commandes': metrics['nb_commandes'],
+            'Valeur Client': ca_segment / nb_clients if nb_clients > 0 else 0
+        })
+    return pd.DataFrame(metrics_list).sort_values('CA', ascending=False)
+
+
+def _best_time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--categorical', action='store_true',
+                        help="Types du store Parquet (Description et Segment en catégories)")
+    args = parser.parse_args()
+
+    df = add_features(clean_transactions(generate_transactions(args.rows)))
+    rfm = score_rfm(calculate_rfm(df))
+    rfm['Segment'] = assign_segments(rfm)
+    if args.categorical:
+        df['Description'] = df['Description'].astype('category')
+        rfm['Segment'] = rfm['Segment'].astype('category')
+
+    expected = legacy_get_all_segments_metrics(df, rfm).reset_index(drop=True)
+    result = get_all_segments_metrics(df, rfm).reset_index(drop=True)
+    pd.testing.assert_frame_equal(expected, result, check_dtype=False)
+
+    legacy = _best_time(lambda: legacy_get_all_segments_metrics(df, rfm), args.repeat)
+    single_pass = _best_time(lambda: get_all_segments_metrics(df, rfm), args.repeat)
+    print(f"{len(df):,} transactions | {rfm['Segment'].nunique()} segments")
+    print(f"boucle historique  {legacy * 1000:>9.1f} ms")
+    print(f"un seul passage    {single_pass * 1000:>9.1f} ms   x{legacy / single_pass:.1f}")
+
+
+if __name__ == "__main__":
+    main()
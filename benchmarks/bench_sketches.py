@@ -0,0 +1,66 @@
+"""
+Benchmark des métriques globales par sketches
+KPIs exacts contre HyperLogLog / Space-Saving / KLL, avec l'erreur observée
+
+Usage : python benchmarks/bench_sketches.py [--rows 2000000] [--chunks 8]
+
+Les sketches sont construits bloc par bloc puis fusionnés, comme sur des
+partitions traitées séparément.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_preprocessing import add_features, clean_transactions
+from src.metrics import compute_global_metrics, sketch_global_metrics
+from src.rfm_analysis import calculate_rfm
+from src.sketches import KLLSketch
+from src.synthetic import generate_transactions
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--chunks', type=int, default=8)
+    args = parser.parse_args()
+
+    df = add_features(clean_transactions(generate_transactions(args.rows)))
+    print(f"{len(df):,} transactions, {args.chunks} blocs fusionnés")
+
+    exact, exact_time = _timed(lambda: compute_global_metrics(df, approximate=False))
+    bounds = np.linspace(0, len(df), args.chunks + 1).astype(int)
+    sketch, sketch_time = _timed(lambda: sketch_global_metrics(
+        df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])))
+    approx = sketch.result()
+    print(f"{'exact':>14} {exact_time:>8.2f}s")
+    print(f"{'sketches':>14} {sketch_time:>8.2f}s")
+
+    for key in ('nb_commandes', 'nb_clients'):
+        error = abs(approx[key] - exact[key]) / max(exact[key], 1) * 100
+        print(f"{key:>14} exact {exact[key]:>10,}  approx {approx[key]:>10,}  erreur {error:.2f} %")
+    same = list(approx['top_items'].index) == list(exact['top_items'].index)
+    print(f"{'top 5 produits':>14} {'identique' if same else '⚠ DIFFÉRENT'} "
+          f"(borne d'erreur {sketch.items.total / sketch.items.capacity:,.0f} £)")
+
+    rfm = calculate_rfm(df)
+    for column, q in (('Montant', 0.75), ('Montant', 0.50), ('Récence', 0.75), ('Fréquence', 0.25)):
+        values = rfm[column]
+        estimate = KLLSketch().update(values.to_numpy()).quantile(q)
+        rank_error = abs((values <= estimate).mean() - q) * 100
+        print(f"{f'{column} q{q:.2f}':>14} exact {values.quantile(q):>10.2f}  "
+              f"approx {estimate:>10.2f}  erreur de rang {rank_error:.2f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Suite de benchmarks du pipeline
+Temps de chaque étape sur données synthétiques reproductibles, résultats JSON comparables entre versions
+
+Usage : python benchmarks/run_suite.py [--sizes 100000 1000000 10000000] [--output resultats.json]
+        [--compare reference.json] [--tolerance 0.25] [--min-delta 0.05] [--repeat 1] [--seed 42]
+
+Hors ligne : les transactions sont générées par src.synthetic (graine fixe,
+achats conjoints par thèmes). Prévoir ~4 Go de mémoire pour 10M de lignes (~1 min).
+Avec --compare, une étape plus lente que la référence au-delà de la
+tolérance est signalée et le code de sortie vaut 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import mlxtend
+import numpy as np
+import pandas as pd
+import scipy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.basket_analysis import perform_basket_analysis
+from src.compact import compact_transactions
+from src.batch_recommendations import get_batch_recommendations
+from src.config import get_settings
+from src.customer_index import build_customer_index
+from src.data_preprocessing import clean_and_featurize_parallel
+from src.metrics import compute_business_insights, compute_global_metrics, get_all_segments_metrics
+from src.profiling import enable_profiling, get_records, profile_block, reset_profiling
+from src.recommendations import build_segment_popularity, get_customer_recommendations
+from src.rfm_analysis import assign_segments, calculate_rfm, compute_segment_evolution, score_rfm
+from src.rule_index import build_rule_index
+from src.synthetic import generate_transactions
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ['nettoyage', 'rfm', 'scoring', 'segmentation', 'evolution', 'metriques',
+          'panier', 'recommandations_lot', 'recommandations_client']
+
+
+def run_pipeline(raw, n_jobs=1, sample_customers=200):
+    """Pipeline complet, une mesure (profile_block) par étape"""
+    with profile_block('nettoyage', rows=len(raw)) as record:
+        df = compact_transactions(clean_and_featurize_parallel(raw, n_jobs))
+        record['rows_out'] = len(df)
+    with profile_block('rfm', rows=len(df)) as record:
+        rfm = calculate_rfm(df)
+        record['rows_out'] = len(rfm)
+    with profile_block('scoring', rows=len(rfm)):
+        rfm = score_rfm(rfm)
+    with profile_block('segmentation', rows=len(rfm)):
+        rfm['Segment'] = assign_segments(rfm)
+    with profile_block('evolution', rows=len(df)):
+        compute_segment_evolution(df)
+    with profile_block('metriques', rows=len(df)):
+        compute_global_metrics(df)
+        get_all_segments_metrics(df, rfm)
+        compute_business_insights(df, rfm)
+    with profile_block('panier', rows=len(df)) as record:
+        rules = perform_basket_analysis(df, n_jobs=n_jobs, partitions=n_jobs)
+        record['rows_out'] = len(rules)
+    with profile_block('recommandations_lot', rows=len(rfm)) as record:
+        record['rows_out'] = len(get_batch_recommendations(df, rfm, rules, top_n=10))
+
+    # Latence unitaire (dashboard) : index construits une fois, clients tirés au hasard
+    customer_index = build_customer_index(df)
+    rule_index = build_rule_index(rules)
+    segment_popularity = build_segment_popularity(df, rfm)
+    customers = np.random.default_rng(0).choice(rfm.index.to_numpy(),
+                                                size=min(sample_customers, len(rfm)), replace=False)
+    with profile_block('recommandations_client', rows=len(customers)):
+        for customer_id in customers:
+            get_customer_recommendations(df, rfm, rules, customer_id,
+                                         customer_index=customer_index, rule_index=rule_index,
+                                         segment_popularity=segment_popularity)
+
+
+def run_size(n_rows, seed, repeat, n_jobs):
+    """Meilleur temps de chaque étape sur `repeat` exécutions"""
+    start = time.perf_counter()
+    raw = generate_transactions(n_rows, seed=seed, affinity=0.3)
+    generation_s = time.perf_counter() - start
+
+    stages = {}
+    for _ in range(repeat):
+        reset_profiling()
+        run_pipeline(raw, n_jobs=n_jobs)
+        for record in get_records():
+            if record['depth'] != 0:
+                continue
+            best = stages.get(record['name'])
+            if best is None or record['wall_s'] < best['wall_s']:
+                stages[record['name']] = {key: record[key] for key in
+                                          ('wall_s', 'rows_in', 'rows_out', 'peak_rss_mb')}
+    return {'rows': n_rows, 'generation_s': generation_s,
+            'total_s': sum(stage['wall_s'] for stage in stages.values()),
+            'stages': {name: stages[name] for name in STAGES if name in stages}}
+
+
+def environment():
+    """Contexte de la mesure, pour ne comparer que des résultats comparables"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    basket_config = get_settings().basket_analysis
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'mlxtend': mlxtend.__version__,
+        'algorithm': basket_config.algorithm,
+        'min_support': basket_config.min_support,
+    }
+
+
+def compare(results, reference, tolerance, min_delta):
+    """Étapes plus lentes que la référence au-delà de la tolérance (et de min_delta secondes)"""
+    reference_sizes = {entry['rows']: entry for entry in reference['results']}
+    regressions = []
+    print(f"\n{'lignes':>12} {'etape':<24} {'reference':>10} {'actuel':>10} {'ratio':>7}")
+    for entry in results:
+        baseline = reference_sizes.get(entry['rows'])
+        if baseline is None:
+            continue
+        for name, stage in entry['stages'].items():
+            if name not in baseline['stages']:
+                continue
+            before = baseline['stages'][name]['wall_s']
+            ratio = stage['wall_s'] / before if before > 0 else float('inf')
+            flag = ''
+            if ratio > 1 + tolerance and stage['wall_s'] - before > min_delta:
+                flag = '  REGRESSION'
+                regressions.append({'rows': entry['rows'], 'stage': name, 'ratio': ratio})
+            print(f"{entry['rows']:>12,} {name:<24} {before:>9.3f}s {stage['wall_s']:>9.3f}s "
+                  f"{ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--output', default=None,
+                        help="Fichier JSON (par défaut benchmarks/results/suite-<date>.json)")
+    parser.add_argument('--compare', default=None, help="Résultats de référence (JSON de la suite)")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Ralentissement toléré avant de signaler une régression (0.25 = +25%%)")
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help="Écart absolu minimal (s) pour signaler une régression (bruit des étapes courtes)")
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--jobs', type=int, default=1, help="Processus de minage des règles")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', category=DeprecationWarning)
+    enable_profiling()
+
+    results = []
+    for n_rows in args.sizes:
+        entry = run_size(n_rows, args.seed, args.repeat, args.jobs)
+        results.append(entry)
+        print(f"\n{n_rows:,} lignes (génération {entry['generation_s']:.2f}s, "
+              f"pipeline {entry['total_s']:.2f}s)")
+        for name, stage in entry['stages'].items():
+            rows_out = f"{stage['rows_out']:,}" if stage['rows_out'] is not None else '-'
+            print(f"  {name:<24} {stage['wall_s']:>9.3f}s {stage['rows_in'] or 0:>12,} -> {rows_out:>10}")
+
+    output = args.output or os.path.join(PROJECT_DIR, 'benchmarks', 'results',
+                                         f"suite-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    report = {'generated_at': datetime.now().isoformat(timespec='seconds'),
+              'seed': args.seed, 'repeat': args.repeat, 'jobs': args.jobs,
+              'environment': environment(), 'results': results}
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file), args.tolerance, args.min_delta)
+        report['regressions'] = regressions
+
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False)
+    print(f"\nRésultats : {output}")
+    if regressions:
+        sys.exit(f"{len(regressions)} régression(s) au-delà de +{args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Script d'export des recommandations
+Top-N de tous les clients pour les campagnes e-mail, écrit bloc par bloc (Parquet ou CSV)
+"""
+import argparse
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.artifact_store import default_store_dir, read_artifact, store_exists
+from src.batch_recommendations import iter_batch_recommendations
+from src.item_similarity import similarity_from_frame
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export des recommandations de tous les clients")
+    parser.add_argument('output', help="Fichier de sortie (.parquet ou .csv)")
+    parser.add_argument('--store', default=None, help="Store d'artefacts, par defaut data/processed")
+    parser.add_argument('--top-n', type=int, default=10, help="Recommandations par client")
+    parser.add_argument('--chunk-size', type=int, default=50_000, help="Clients par bloc")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Processus en parallele sur les blocs (0 = tous les coeurs)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    store_dir = args.store or default_store_dir()
+    if not store_exists(store_dir):
+        sys.exit(f"Store introuvable ou incomplet : {store_dir} (lancer scripts/precompute.py)")
+
+    print("[1/2] Chargement des artefacts...")
+    df = read_artifact(store_dir, 'transactions', columns=['CustomerID', 'Description', 'TotalPrice'])
+    rfm = read_artifact(store_dir, 'rfm_segments', columns=['Segment'])
+    rules = read_artifact(store_dir, 'association_rules')
+    item_similarity = None
+    if store_exists(store_dir, names=('item_similarity',)):
+        item_similarity = similarity_from_frame(read_artifact(store_dir, 'item_similarity'))
+    print(f"      {len(rfm):,} clients, {len(rules):,} regles, "
+          f"similarite {'oui' if item_similarity is not None else 'non'}")
+
+    print(f"[2/2] Export vers {args.output}...")
+    chunks = iter_batch_recommendations(df, rfm, rules, top_n=args.top_n,
+                                        chunk_size=args.chunk_size, n_jobs=args.jobs or None,
+                                        item_similarity=item_similarity)
+    rows = 0
+    if args.output.endswith('.csv'):
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(args.output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            rows += len(chunk)
+    else:
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(args.output, table.schema, compression='zstd')
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    print(f"      {rows:,} recommandations ecrites")
+
+if __name__ == "__main__":
+    main()
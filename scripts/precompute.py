@@ -2,18 +2,87 @@
 Script de pré-calcul des données
 Exécuter avant chaque déploiement pour des temps de chargement optimaux
 """
+import argparse
 import os
 import sys
-import pickle
+from dataclasses import asdict
 
 # Ajouter le répertoire parent au path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.data_preprocessing import load_and_clean_data
-from src.rfm_analysis import calculate_rfm, score_rfm, map_rfm_to_segment
-from src.basket_analysis import perform_basket_analysis
+from src.data_preprocessing import (load_and_clean_data, iter_clean_chunks, read_ingestion_state,
+                                    reset_ingestion_state)
+from src.rfm_analysis import calculate_rfm, calculate_rfm_streaming, score_rfm, assign_segments
+from src.basket_analysis import basket_from_pairs, mine_association_rules, perform_basket_analysis
+from src.compact import PairAccumulator, fold_pairs
+from src.item_similarity import (build_item_similarity, item_similarity_from_purchases,
+                                 similarity_to_frame)
+from src.artifact_store import (append_artifact, dataset_version, read_artifact, read_manifest,
+                                store_exists, write_artifact, write_artifacts)
+from src.config import get_settings
+from src.metrics import (compute_segment_totals, fold_sketch, new_global_metrics_sketch,
+                         sketch_global_metrics)
+from src.sketches import GlobalMetricsSketch
+from src.profiling import enable_profiling, profile_block, write_report
+from src.sources import is_synthetic, local_source
+from src.stage_cache import run_stage, source_fingerprint
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pre-calcul des artefacts du dashboard")
+    parser.add_argument('--source', default=None,
+                        help="Source brute (Excel, CSV, Parquet ou synthetic://<lignes>), "
+                             "par defaut data.source_url")
+    parser.add_argument('--incremental', action='store_true',
+                        help="N'ingerer que les nouvelles factures depuis le dernier passage")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Lecture par blocs (CSV/Parquet) a memoire bornee, taille data.max_rows")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="Processus de minage des regles (SON), par defaut basket_analysis.n_jobs")
+    parser.add_argument('--refresh-source', action='store_true',
+                        help="Verifier aupres du serveur si la source distante a change (ETag)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Recalculer toutes les etapes (le cache d'etapes est reecrit)")
+    parser.add_argument('--profile', default=None, metavar='RAPPORT.json',
+                        help="Mesurer chaque etape (temps, memoire, lignes) et ecrire un rapport JSON")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="Avec --profile : suivre aussi les allocations Python (tracemalloc, plus lent)")
+    return parser.parse_args()
+
+def persist_chunks(chunks, output_dir):
+    """Ecriture de chaque bloc dans le store au fil du flux"""
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            write_artifact(output_dir, 'transactions', chunk)
+        else:
+            append_artifact(output_dir, 'transactions', chunk)
+        yield chunk
+
+def load_metrics_sketch(output_dir, settings):
+    """
+    Sketch des KPIs globaux déjà stocké, None s'il est absent ou construit
+    avec d'autres paramètres (metrics.hll_precision / heavy_hitters)
+    """
+    if not store_exists(output_dir, names=('global_metrics_sketch',)):
+        return None
+    sketch = GlobalMetricsSketch.from_frame(read_artifact(output_dir, 'global_metrics_sketch'))
+    if (sketch.invoices.precision, sketch.items.capacity) != (settings.metrics.hll_precision,
+                                                              settings.metrics.heavy_hitters):
+        return None
+    return sketch
+
+def segment_customers(rfm):
+    """Scores RFM et segments"""
+    rfm_scored = score_rfm(rfm)
+    rfm_scored['Segment'] = assign_segments(rfm_scored)
+    return rfm_scored
+
+def _from_cache(hit):
+    return " (cache)" if hit else ""
 
 def main():
+    args = parse_args()
+    if args.profile:
+        enable_profiling(memory=args.profile_memory)
     print("=" * 50)
     print("PRECOMPUTE - Pipeline de calcul des donnees")
     print("=" * 50)
@@ -21,47 +90,145 @@ def main():
     output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'processed')
     os.makedirs(output_dir, exist_ok=True)
     
+    settings = get_settings()
+    source = args.source or settings.data.source_url
+    if not is_synthetic(source):
+        # Copie locale adressée par contenu, Excel converti une fois en Parquet
+        source = local_source(source, refresh=args.refresh_source)
+        print(f"\nSource locale: {source}")
+    
     # 1. Chargement et nettoyage des données
-    print("\n[1/4] Chargement des donnees brutes...")
-    df = load_and_clean_data()
-    print(f"      {len(df):,} transactions chargees")
+    if args.streaming:
+        # Les blocs sont repliés dans le sketch des KPIs et dans les couples
+        # (facture, produit) / (client, produit) codés, écrits puis repliés
+        # dans les agrégats RFM sans jamais matérialiser la table complète
+        print("\n[1/4] Nettoyage en flux et agregats RFM par bloc...")
+        metrics_sketch = new_global_metrics_sketch()
+        basket_pairs = PairAccumulator('InvoiceNo', weight='Quantity')
+        purchase_pairs = PairAccumulator('CustomerID')
+        chunks = fold_pairs(fold_sketch(iter_clean_chunks(source), metrics_sketch),
+                            basket_pairs, purchase_pairs)
+        rfm = calculate_rfm_streaming(persist_chunks(chunks, output_dir))
+        if rfm.empty:
+            # Aucun bloc écrit : l'artefact 'transactions' serait absent ou périmé
+            raise SystemExit(f"Aucune transaction apres nettoyage dans {source} : "
+                             "store inchange (verifier la source et data.min_quantity)")
+        rows = read_manifest(output_dir)['artifacts']['transactions']['rows']
+        transactions_key = dataset_version(output_dir, names=('transactions',))
+        print(f"      {rows:,} transactions ecrites par blocs")
+    elif args.incremental:
+        print("\n[1/4] Ingestion incrementale des nouvelles factures...")
+        metrics_sketch = load_metrics_sketch(output_dir, settings)
+        batch = load_and_clean_data(source, incremental=True, store_dir=output_dir)
+        df = read_artifact(output_dir, 'transactions')
+        transactions_key = dataset_version(output_dir, names=('transactions',))
+        # Le sketch stocké absorbe celui du lot (lignes nouvelles, dédoublonnées)
+        if metrics_sketch is None:
+            metrics_sketch = sketch_global_metrics([df])
+        elif not batch.empty:
+            metrics_sketch.merge(sketch_global_metrics([batch]))
+        rows = len(df)
+        print(f"      {len(batch):,} nouvelles transactions ({rows:,} au total)")
+        late_rows = (read_ingestion_state(output_dir) or {}).get('late_rows', 0)
+        if late_rows:
+            print(f"      dont {late_rows:,} anterieures au filigrane (factures tardives)")
+    else:
+        print("\n[1/4] Chargement des donnees brutes...")
+        df, transactions_key, hit = run_stage(
+            'transactions', lambda: load_and_clean_data(source),
+            inputs=[source_fingerprint(source)],
+            config={'min_quantity': settings.data.min_quantity,
+                    'drop_na_customer': settings.data.drop_na_customer},
+            modules=['src.data_preprocessing', 'src.compact', 'src.sources', 'src.synthetic'],
+            refresh=args.no_cache)
+        rows = len(df)
+        print(f"      {rows:,} transactions chargees{_from_cache(hit)}")
+        sketch_frame, _, _ = run_stage(
+            'global_metrics_sketch', lambda: sketch_global_metrics([df]).to_frame(),
+            inputs=[transactions_key],
+            config={'hll_precision': settings.metrics.hll_precision,
+                    'heavy_hitters': settings.metrics.heavy_hitters},
+            modules=['src.sketches', 'src.metrics'], refresh=args.no_cache)
+        metrics_sketch = GlobalMetricsSketch.from_frame(sketch_frame)
     
     # 2. Calcul RFM
     print("[2/4] Calcul des scores RFM...")
-    rfm = calculate_rfm(df)
-    rfm_scored = score_rfm(rfm)
-    rfm_scored['Segment'] = rfm_scored.apply(
-        lambda row: map_rfm_to_segment(int(row['R_score']), int(row['F_score']), int(row['M_score'])),
-        axis=1
-    )
-    print(f"      {len(rfm_scored):,} clients segmentes")
+    if args.streaming:
+        rfm_scored = segment_customers(rfm)
+        hit = False
+    else:
+        rfm_scored, _, hit = run_stage(
+            'rfm', lambda: segment_customers(calculate_rfm(df)),
+            inputs=[transactions_key], config=settings.rfm,
+            modules=['src.rfm_analysis'], refresh=args.no_cache)
+    print(f"      {len(rfm_scored):,} clients segmentes{_from_cache(hit)}")
     
     # 3. Analyse de panier
     print("[3/4] Analyse de panier (regles d'association)...")
-    rules = perform_basket_analysis(df)
-    print(f"      {len(rules):,} regles generees")
+    # n_jobs / partitions ne changent pas le résultat (SON identique au minage en série)
+    basket_config = {key: value for key, value in asdict(settings.basket_analysis).items()
+                     if key not in ('n_jobs', 'partitions')}
+
+    def mine_rules():
+        if not args.streaming:
+            return perform_basket_analysis(df, n_jobs=args.jobs)
+        # Flux : matrice panier issue des couples cumulés, jamais de relecture
+        basket, _, products = basket_from_pairs(basket_pairs, settings.basket_analysis.sample_invoices,
+                                                settings.basket_analysis.sample_products)
+        return mine_association_rules(basket, products, n_jobs=args.jobs)
+
+    def build_similarity():
+        if not args.streaming:
+            return build_item_similarity(df)
+        purchases, _, products = purchase_pairs.matrix()
+        return item_similarity_from_purchases(purchases, products)
+
+    rules, _, hit = run_stage(
+        'association_rules', mine_rules,
+        inputs=[transactions_key], config=basket_config,
+        modules=['src.basket_analysis', 'src.eclat', 'src.compact'], refresh=args.no_cache)
+    print(f"      {len(rules):,} regles generees{_from_cache(hit)}")
+    similarity, _, hit = run_stage(
+        'item_similarity', build_similarity,
+        inputs=[transactions_key],
+        config={'metric': settings.recommendations.similarity_metric,
+                'neighbors': settings.recommendations.similarity_neighbors},
+        modules=['src.item_similarity', 'src.compact'], refresh=args.no_cache)
+    print(f"      {len(similarity['products']):,} produits, voisins top-{similarity['neighbors'].shape[1]}"
+          f"{_from_cache(hit)}")
     
     # 4. Sauvegarde
-    print("[4/4] Sauvegarde des fichiers...")
-    
-    # Transactions nettoyées
-    df.to_csv(os.path.join(output_dir, 'transactions.csv'), index=False)
-    print(f"      -> transactions.csv")
-    
-    # RFM avec segments
-    rfm_scored.to_csv(os.path.join(output_dir, 'rfm_segments.csv'))
-    print(f"      -> rfm_segments.csv")
-    
-    # Règles d'association (pickle car contient des frozensets)
-    with open(os.path.join(output_dir, 'association_rules.pkl'), 'wb') as f:
-        pickle.dump(rules, f)
-    print(f"      -> association_rules.pkl")
+    print("[4/4] Sauvegarde des artefacts (Parquet)...")
+    with profile_block('precompute.sauvegarde'):
+        if args.incremental or args.streaming:
+            # Les transactions ont deja ete ecrites par l'ingestion ou le flux
+            write_artifact(output_dir, 'rfm_segments', rfm_scored, index=True)
+            write_artifact(output_dir, 'association_rules', rules)
+        else:
+            write_artifacts(output_dir, df, rfm_scored, rules)
+        write_artifact(output_dir, 'item_similarity', similarity_to_frame(similarity))
+        write_artifact(output_dir, 'segment_totals', compute_segment_totals(rfm_scored), index=True)
+        write_artifact(output_dir, 'global_metrics_sketch', metrics_sketch.to_frame())
+    if not args.incremental:
+        reset_ingestion_state(output_dir)
+    for name in ['transactions', 'rfm_segments', 'association_rules', 'item_similarity',
+                 'segment_totals', 'global_metrics_sketch']:
+        print(f"      -> {name}.parquet")
+    print("      -> manifest.json")
     
     print("\n" + "=" * 50)
     print("TERMINE - Fichiers prets pour deploiement")
     print("=" * 50)
     print(f"\nRepertoire: {output_dir}")
     print("\nProchaine etape: git add data/processed/ && git push")
+    
+    if args.profile:
+        report = write_report(args.profile, metadata={'source': source, 'incremental': args.incremental,
+                                                      'streaming': args.streaming, 'jobs': args.jobs,
+                                                      'rows': rows, 'customers': len(rfm_scored)})
+        print(f"\nProfil: {args.profile}")
+        for name, entry in sorted(report['summary'].items(), key=lambda item: -item[1]['total_s']):
+            print(f"      {name:<45} {entry['calls']:>5} appel(s) {entry['total_s']:>9.2f}s")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,290 @@
+"""
+Module de stockage des artefacts
+Stockage colonnaire (Parquet) versionné des données pré-calculées
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.compact import build_code_tables, compact_transactions
+
+STORE_VERSION = 3
+MANIFEST_NAME = 'manifest.json'
+CATEGORICAL_COLUMNS = ['Description', 'Country', 'Segment']
+# Artefacts écrits et relus en représentation compacte (src/compact.py)
+COMPACT_ARTIFACTS = ('transactions',)
+# Tables de codes du store, partagées par les artefacts : colonne -> table
+CODE_TABLES = 'code_tables'
+SHARED_CODES = {
+    'transactions': {'InvoiceNo': 'InvoiceNo', 'StockCode': 'StockCode',
+                     'Description': 'Description', 'Country': 'Country'},
+    'item_similarity': {'Description': 'Description', 'Voisin': 'Description'},
+}
+
+
+def default_store_dir():
+    """Répertoire par défaut des artefacts (data/processed à la racine du projet)"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, 'data', 'processed')
+
+
+def read_manifest(store_dir):
+    """
+    Lecture du manifeste du store
+
+    Raises:
+        FileNotFoundError: si le store n'existe pas
+        ValueError: si la version du store est incompatible
+    """
+    with open(os.path.join(store_dir, MANIFEST_NAME), 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest.get('version') != STORE_VERSION:
+        raise ValueError(
+            f"Version de store {manifest.get('version')} incompatible "
+            f"(attendue : {STORE_VERSION})"
+        )
+    return manifest
+
+
+def _write_manifest(store_dir, manifest):
+    """Écriture atomique du manifeste"""
+    manifest['updated_at'] = datetime.now().isoformat(timespec='seconds')
+    tmp_path = os.path.join(store_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_NAME))
+
+
+def _load_or_create_manifest(store_dir):
+    """Manifeste existant, ou manifeste vide si absent ou d'une autre version"""
+    try:
+        return read_manifest(store_dir)
+    except (FileNotFoundError, ValueError, json.JSONDecodeError):
+        return {'version': STORE_VERSION, 'artifacts': {}}
+
+
+def _write_part(store_dir, filename, storable, index):
+    """Écriture d'un fichier Parquet"""
+    table = pa.Table.from_pandas(storable, preserve_index=index)
+    pq.write_table(table, os.path.join(store_dir, filename), compression='zstd')
+
+
+def _remove_part(store_dir, filename):
+    """Suppression d'un fichier Parquet obsolète"""
+    try:
+        os.remove(os.path.join(store_dir, filename))
+    except FileNotFoundError:
+        pass
+
+
+def store_exists(store_dir, names=('transactions', 'rfm_segments', 'association_rules')):
+    """Vérifie que le store est lisible et contient les artefacts demandés"""
+    try:
+        manifest = read_manifest(store_dir)
+    except (FileNotFoundError, ValueError, json.JSONDecodeError):
+        return False
+    return all(
+        name in manifest['artifacts']
+        and all(os.path.exists(os.path.join(store_dir, filename))
+                for filename in manifest['artifacts'][name]['files'])
+        for name in names
+    )
+
+
+def artifact_versions(store_dir, names):
+    """
+    Version des artefacts d'après le manifeste (date d'écriture, nombre de lignes)
+
+    Sert de clé de cache : elle change à chaque écriture ou ajout.
+    """
+    artifacts = read_manifest(store_dir)['artifacts']
+    return tuple((name, artifacts[name]['written_at'], artifacts[name]['rows']) for name in names)
+
+
+def dataset_version(store_dir, names=('transactions', 'rfm_segments', 'association_rules')):
+    """
+    Empreinte de version des artefacts (manifeste + taille et mtime des fichiers)
+
+    Change dès qu'un artefact est réécrit ou complété, même deux fois dans
+    la même seconde ; ne lit aucune donnée.
+    """
+    artifacts = read_manifest(store_dir)['artifacts']
+    digest = hashlib.sha1()
+    for name, written_at, rows in artifact_versions(store_dir, names):
+        digest.update(f"{name}|{written_at}|{rows}".encode())
+        for filename in artifacts[name]['files']:
+            stat = os.stat(os.path.join(store_dir, filename))
+            digest.update(f"|{filename}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _to_storable(df):
+    """Conversion des types pour Parquet (catégories, frozensets)"""
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    # Les itemsets (frozenset) sont stockés en listes triées
+    frozenset_columns = [
+        col for col in df.columns
+        if df[col].dtype == object and len(df) > 0 and isinstance(df[col].iloc[0], frozenset)
+    ]
+    for col in frozenset_columns:
+        df[col] = df[col].map(sorted)
+    return df, frozenset_columns
+
+
+def read_code_tables(store_dir, columns=None):
+    """
+    Tables de codes partagées du store
+
+    Args:
+        columns: tables à charger (None = toutes)
+
+    Returns:
+        dict {colonne: Index des libellés triés} (vide pour un store sans tables)
+    """
+    entry = read_manifest(store_dir)['artifacts'].get(CODE_TABLES)
+    if entry is None:
+        return {}
+    filters = [('column', 'in', list(columns))] if columns is not None else None
+    frame = pd.read_parquet(os.path.join(store_dir, entry['files'][0]), filters=filters)
+    return {str(col): pd.Index(labels.to_numpy(dtype=object))
+            for col, labels in frame.groupby('column', observed=True, sort=False)['label']}
+
+
+def _write_code_tables(store_dir, tables):
+    """Tables de codes au format long (column, label) dans l'artefact CODE_TABLES"""
+    frame = pd.DataFrame({
+        'column': pd.Categorical(np.repeat(np.array(list(tables), dtype=object),
+                                           [len(table) for table in tables.values()])),
+        'label': np.concatenate([table.to_numpy(dtype=object) for table in tables.values()]
+                                or [np.empty(0, dtype=object)])
+    })
+    write_artifact(store_dir, CODE_TABLES, frame)
+
+
+def _apply_code_tables(df, tables, shared):
+    """Colonnes recodées sur les tables du store (colonne laissée telle quelle si un libellé en est absent)"""
+    for col, table_name in shared.items():
+        if col not in df.columns or table_name not in tables:
+            continue
+        dtype = pd.CategoricalDtype(tables[table_name])
+        coded = (df[col].cat.set_categories(dtype.categories) if isinstance(df[col].dtype, pd.CategoricalDtype)
+                 else df[col].astype(dtype))
+        if coded.isna().sum() == df[col].isna().sum():
+            df[col] = coded
+    return df
+
+
+def write_artifact(store_dir, name, df, index=False):
+    """
+    Écriture d'un artefact Parquet et mise à jour du manifeste
+
+    Args:
+        store_dir: répertoire du store
+        name: nom logique de l'artefact
+        df: DataFrame à stocker
+        index: conserver l'index du DataFrame
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = _load_or_create_manifest(store_dir)
+    if name in COMPACT_ARTIFACTS:
+        df = compact_transactions(df)
+
+    # Les parties issues d'ajouts incrémentaux sont remplacées
+    previous = manifest['artifacts'].get(name, {}).get('files', [])
+    storable, frozenset_columns = _to_storable(df)
+    filename = f"{name}.parquet"
+    _write_part(store_dir, filename, storable, index)
+    for old_file in previous:
+        if old_file != filename:
+            _remove_part(store_dir, old_file)
+
+    manifest['artifacts'][name] = {
+        'files': [filename],
+        'rows': len(df),
+        'index': list(df.index.names) if index else None,
+        'schema': {str(col): str(dtype) for col, dtype in storable.dtypes.items()},
+        'frozenset_columns': frozenset_columns,
+        'written_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    _write_manifest(store_dir, manifest)
+    if name in COMPACT_ARTIFACTS:
+        _write_code_tables(store_dir, build_code_tables(df))
+
+
+def append_artifact(store_dir, name, df):
+    """
+    Ajout d'une partie Parquet à un artefact existant (ingestion incrémentale)
+
+    Le schéma de la nouvelle partie doit être identique à celui de l'artefact.
+
+    Raises:
+        ValueError: si le schéma diffère de celui du manifeste
+    """
+    manifest = read_manifest(store_dir)
+    if name not in manifest['artifacts']:
+        write_artifact(store_dir, name, df)
+        return
+
+    entry = manifest['artifacts'][name]
+    if name in COMPACT_ARTIFACTS:
+        df = compact_transactions(df)
+    storable, _ = _to_storable(df)
+    schema = {str(col): str(dtype) for col, dtype in storable.dtypes.items()}
+    if schema != entry['schema']:
+        raise ValueError(f"Schéma incompatible pour l'ajout à '{name}' : {schema}")
+
+    filename = f"{name}-{len(entry['files']):05d}.parquet"
+    _write_part(store_dir, filename, storable, index=entry['index'] is not None)
+    entry['files'].append(filename)
+    entry['rows'] += len(df)
+    entry['written_at'] = datetime.now().isoformat(timespec='seconds')
+    _write_manifest(store_dir, manifest)
+    if name in COMPACT_ARTIFACTS:
+        _write_code_tables(store_dir, build_code_tables(df, base=read_code_tables(store_dir)))
+
+
+def read_artifact(store_dir, name, columns=None):
+    """
+    Lecture d'un artefact avec projection de colonnes
+
+    Args:
+        store_dir: répertoire du store
+        name: nom logique de l'artefact
+        columns: colonnes à charger (None = toutes)
+
+    Returns:
+        DataFrame (l'index éventuel est toujours restauré)
+    """
+    manifest = read_manifest(store_dir)
+    entry = manifest['artifacts'][name]
+    paths = [os.path.join(store_dir, filename) for filename in entry['files']]
+    df = pd.read_parquet(paths if len(paths) > 1 else paths[0],
+                         columns=list(columns) if columns is not None else None)
+
+    for col in entry['frozenset_columns']:
+        if col in df.columns:
+            df[col] = df[col].map(frozenset)
+    if name in COMPACT_ARTIFACTS:
+        df = compact_transactions(df)
+    if name in SHARED_CODES and df.columns.intersection(list(SHARED_CODES[name])).size:
+        # Mêmes codes pour toutes les parties et tous les artefacts du store :
+        # projections concaténables, jointures sur les codes
+        shared = {col: table for col, table in SHARED_CODES[name].items() if col in df.columns}
+        df = _apply_code_tables(df, read_code_tables(store_dir, set(shared.values())), shared)
+    return df
+
+
+def write_artifacts(store_dir, df, rfm, rules):
+    """Écriture des trois artefacts du pipeline (transactions, RFM, règles)"""
+    write_artifact(store_dir, 'transactions', df)
+    write_artifact(store_dir, 'rfm_segments', rfm, index=True)
+    write_artifact(store_dir, 'association_rules', rules)
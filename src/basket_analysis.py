@@ -2,40 +2,245 @@
 Module d'analyse de panier
 Extraction des règles d'ASSOCIATION OPTIMISÉE
 """
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from mlxtend.frequent_patterns import apriori, association_rules
-from src.utils import load_config
+import scipy.sparse as sp
+from mlxtend.frequent_patterns import apriori, association_rules, fpgrowth
+from src.config import get_settings
+from src.eclat import count_itemsets, eclat
+from src.profiling import profiled
 
-def perform_basket_analysis(df):
-    """Analyse complète du panier OPTIMISÉE"""
-    config = load_config()
-    
-    # ÉCHANTILLONNAGE : Top 1000 factures + Top 500 produits
-    top_invoices = df['InvoiceNo'].value_counts().head(1000).index
-    top_products = df['Description'].value_counts().head(500).index
-    
-    df_sample = df[df['InvoiceNo'].isin(top_invoices) & 
-                   df['Description'].isin(top_products)]
-    
-    # Panier binaire OPTIMISÉ
-    basket = (df_sample.groupby(['InvoiceNo', 'Description'])['Quantity']
-              .sum().unstack().fillna(0)
-              .map(lambda x: 1 if x > 0 else 0))  # ✅ map au lieu de applymap
+DENSE_CELL_LIMIT = 20_000_000  # 20 Mo en booléen dense
+MINING_ALGORITHMS = ('apriori', 'fpgrowth', 'eclat')
+
+@profiled()
+def build_sparse_basket(df, sample_invoices=None, sample_products=None):
+    """
+    Matrice panier booléenne creuse (factures x produits)
+
+    Factures et produits sont codés en entiers ; un couple est présent si
+    la quantité cumulée est positive (même règle que le panier dense).
+
+    Args:
+        df: transactions (InvoiceNo, Description, Quantity)
+        sample_invoices: ne garder que les N factures les plus longues (None = toutes)
+        sample_products: ne garder que les N produits les plus fréquents (None = tous)
+
+    Returns:
+        (matrice CSR booléenne, factures, produits triés)
+    """
+    if sample_invoices is not None or sample_products is not None:
+        mask = np.ones(len(df), dtype=bool)
+        if sample_invoices is not None:
+            top_invoices = df['InvoiceNo'].value_counts().head(sample_invoices).index
+            mask &= df['InvoiceNo'].isin(top_invoices).to_numpy()
+        if sample_products is not None:
+            top_products = df['Description'].value_counts().head(sample_products).index
+            mask &= df['Description'].isin(top_products).to_numpy()
+        df = df[mask]
+
+    invoice_codes, invoices = pd.factorize(df['InvoiceNo'])
+    product_codes, products = pd.factorize(df['Description'], sort=True)
+    known = product_codes >= 0
+
+    quantities = sp.csr_matrix(
+        (df['Quantity'].to_numpy(dtype=np.float64)[known],
+         (invoice_codes[known], product_codes[known])),
+        shape=(len(invoices), len(products))
+    )
+    quantities.sum_duplicates()
+    basket = (quantities > 0).astype(bool).tocsr()
+    basket.eliminate_zeros()
+    return basket, invoices, np.asarray(products)
+
+def basket_from_pairs(pairs, sample_invoices=None, sample_products=None):
+    """
+    Matrice panier booléenne depuis les couples cumulés d'un flux de blocs
+
+    Args:
+        pairs: PairAccumulator('InvoiceNo', weight='Quantity') alimenté bloc par bloc
+        sample_invoices: ne garder que les N factures ayant le plus de produits (None = toutes)
+        sample_products: ne garder que les N produits présents dans le plus de factures (None = tous)
+
+    Returns:
+        (matrice CSR booléenne, factures, produits triés) ; sans
+        échantillonnage, identique à build_sparse_basket sur la table complète
+    """
+    quantities, invoices, products = pairs.matrix()
+    basket = (quantities > 0).astype(bool).tocsr()
+    basket.eliminate_zeros()
+    if sample_invoices is not None:
+        rows = np.sort(np.argsort(-basket.getnnz(axis=1), kind='stable')[:sample_invoices])
+        basket, invoices = basket[rows], invoices[rows]
+    if sample_products is not None:
+        cols = np.sort(np.argsort(-basket.getnnz(axis=0), kind='stable')[:sample_products])
+        basket, products = basket[:, cols], products[cols]
+    return basket, invoices, products
+
+def basket_to_frame(basket, products, dense_cell_limit=DENSE_CELL_LIMIT):
+    """
+    DataFrame attendu par mlxtend
+
+    Booléen dense si la matrice est petite (chemin le plus rapide de
+    mlxtend), DataFrame creux Sparse[bool] au-delà de `dense_cell_limit`
+    cellules pour garder une mémoire proportionnelle aux achats.
+    """
+    if basket.shape[0] * basket.shape[1] <= dense_cell_limit:
+        return pd.DataFrame(basket.toarray(), columns=products)
+    frame = pd.DataFrame.sparse.from_spmatrix(basket.astype(np.uint8), columns=products)
+    return frame.astype(pd.SparseDtype(bool, False))
+
+@profiled()
+def mine_frequent_itemsets(basket, products, min_support, algorithm='apriori', max_len=None):
+    """
+    Itemsets fréquents avec le moteur choisi
+
+    Args:
+        basket: matrice creuse booléenne (factures x produits)
+        products: libellés des colonnes
+        min_support: support minimum (fraction des factures)
+        algorithm: 'apriori', 'fpgrowth' (mlxtend) ou 'eclat' (tidlists en bitsets)
+        max_len: taille maximale des itemsets (None = sans limite)
+
+    Returns:
+        DataFrame (support, itemsets)
+    """
+    if algorithm == 'eclat':
+        return eclat(basket, products, min_support=min_support, max_len=max_len)
+    if algorithm == 'apriori':
+        return apriori(basket_to_frame(basket, products), min_support=min_support,
+                       use_colnames=True, max_len=max_len, low_memory=True)
+    if algorithm == 'fpgrowth':
+        return fpgrowth(basket_to_frame(basket, products), min_support=min_support,
+                        use_colnames=True, max_len=max_len)
+    raise ValueError(f"Algorithme inconnu : {algorithm} (attendu : {', '.join(MINING_ALGORITHMS)})")
+
+def _mine_partition(basket, min_support, algorithm, max_len):
+    """Itemsets localement fréquents d'une partition (tuples d'indices de colonnes)"""
+    counts = np.asarray(basket.sum(axis=0)).ravel()
+    local_columns = np.flatnonzero(counts >= min_support * basket.shape[0])
+    itemsets = mine_frequent_itemsets(basket[:, local_columns], local_columns,
+                                      min_support, algorithm, max_len)
+    return {tuple(sorted(int(j) for j in itemset)) for itemset in itemsets['itemsets']}
+
+def _count_partition(basket, candidates):
+    """Comptage des candidats dans une partition"""
+    return count_itemsets(basket, candidates)
+
+def mine_frequent_itemsets_partitioned(basket, products, min_support, algorithm='apriori',
+                                       max_len=None, partitions=None, n_jobs=None):
+    """
+    Itemsets fréquents en parallèle par partitions de factures (algorithme SON)
+
+    1. Chaque partition est minée localement au même support relatif : un
+       itemset globalement fréquent l'est dans au moins une partition.
+    2. L'union des candidats est recomptée sur toutes les partitions et
+       seuls les itemsets au-dessus du support global sont conservés.
+
+    Résultat identique au minage en un seul processus.
+
+    Args:
+        partitions: nombre de partitions (None = n_jobs)
+        n_jobs: processus en parallèle (None = tous les cœurs)
+
+    Returns:
+        DataFrame (support, itemsets)
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    partitions = max(1, min(partitions or n_jobs, basket.shape[0]))
+    bounds = np.linspace(0, basket.shape[0], partitions + 1).astype(int)
+    parts = [basket[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    with ProcessPoolExecutor(max_workers=min(n_jobs, partitions)) as executor:
+        # Phase 1 : candidats localement fréquents
+        local = executor.map(_mine_partition, parts, [min_support] * partitions,
+                             [algorithm] * partitions, [max_len] * partitions)
+        candidates = sorted(set().union(*local), key=lambda itemset: (len(itemset), itemset))
+        if not candidates:
+            return pd.DataFrame(columns=['support', 'itemsets'])
+
+        # Phase 2 : comptage global des candidats
+        counts = sum(executor.map(_count_partition, parts, [candidates] * partitions))
+
+    support = counts / basket.shape[0]
+    keep = counts >= np.ceil(min_support * basket.shape[0] - 1e-9)
+    products = np.asarray(products)
+    return pd.DataFrame({
+        'support': support[keep],
+        'itemsets': [frozenset(products[list(itemset)])
+                     for itemset, kept in zip(candidates, keep) if kept]
+    })
+
+def rank_rules(rules):
+    """
+    Règles triées par lift puis confiance décroissants
+
+    Ordre indépendant du moteur et du partitionnement : métriques arrondies
+    (écarts d'arrondi flottant) et égalités départagées par les libellés.
+    """
+    keys = pd.DataFrame({
+        'lift': rules['lift'].round(9),
+        'confidence': rules['confidence'].round(9),
+        'antecedents': rules['antecedents'].map(lambda items: tuple(sorted(items))),
+        'consequents': rules['consequents'].map(lambda items: tuple(sorted(items)))
+    }, index=rules.index)
+    order = keys.sort_values(['lift', 'confidence', 'antecedents', 'consequents'],
+                             ascending=[False, False, True, True]).index
+    return rules.loc[order]
+
+@profiled()
+def mine_association_rules(basket, products, n_jobs=None, partitions=None):
+    """
+    Règles d'association d'une matrice panier (support, confiance, lift de la config)
+
+    Args:
+        basket: matrice creuse booléenne (factures x produits)
+        products: libellés des colonnes
+        n_jobs, partitions: surcharge de basket_analysis.n_jobs / partitions ;
+            au-delà d'une partition, minage SON multi-processus
+    """
+    basket_config = get_settings().basket_analysis
+    n_jobs = n_jobs if n_jobs is not None else basket_config.n_jobs
+    partitions = partitions if partitions is not None else basket_config.partitions
     
-    # Vérification mémoire
-    if basket.shape[1] > 200:
-        basket = basket.loc[:, basket.sum() > 10]  # Top produits fréquents
+    # Élagage sans perte : un produit sous le support minimum n'entre dans aucun itemset
+    min_count = basket_config.min_support * basket.shape[0]
+    frequent = np.asarray(basket.sum(axis=0)).ravel() >= min_count
+    basket, products = basket[:, frequent], products[frequent]
     
-    frequent_itemsets = apriori(basket, 
-                              min_support=0.05,  # ✅ Augmenté
-                              use_colnames=True,
-                              low_memory=True)   # ✅ Optimisé
+    if (partitions or n_jobs or os.cpu_count() or 1) > 1:
+        frequent_itemsets = mine_frequent_itemsets_partitioned(
+            basket, products, min_support=basket_config.min_support,
+            algorithm=basket_config.algorithm, partitions=partitions, n_jobs=n_jobs)
+    else:
+        frequent_itemsets = mine_frequent_itemsets(basket, products,
+                                                   min_support=basket_config.min_support,
+                                                   algorithm=basket_config.algorithm)
     
     if frequent_itemsets.empty:
         return pd.DataFrame()
         
     rules = association_rules(frequent_itemsets, metric='lift',
-                            min_threshold=1.2)  # ✅ Plus strict
+                            min_threshold=basket_config.min_lift)
+    
+    rules = rules[rules['confidence'] >= basket_config.min_confidence]
+    return rank_rules(rules).head(basket_config.max_rules).reset_index(drop=True)
+
+@profiled()
+def perform_basket_analysis(df, n_jobs=None, partitions=None):
+    """
+    Analyse complète du panier OPTIMISÉE
+
+    Args:
+        n_jobs, partitions: surcharge de basket_analysis.n_jobs / partitions ;
+            au-delà d'une partition, minage SON multi-processus
+    """
+    basket_config = get_settings().basket_analysis
     
-    rules = rules[rules['confidence'] >= 0.3]  # ✅ Plus strict
-    return rules.head(50)  # ✅ Limité
\ No newline at end of file
+    # ÉCHANTILLONNAGE optionnel (sample_invoices / sample_products, null = tout)
+    basket, _, products = build_sparse_basket(df, basket_config.sample_invoices,
+                                              basket_config.sample_products)
+    return mine_association_rules(basket, products, n_jobs=n_jobs, partitions=partitions)
@@ -0,0 +1,280 @@
+"""
+Module de recommandations par lots
+Top-N de tous les clients en un passage vectorisé (matrices creuses client x produit et règle x produit)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from src.config import get_settings
+from src.item_similarity import similarity_matrix
+from src.recommendations import SIMILARITY_SOURCE, segment_popularity_for
+from src.profiling import profiled
+
+OUTPUT_COLUMNS = ['CustomerID', 'rang', 'produit', 'lift', 'confidence', 'source']
+SOURCES = np.array(['Association', SIMILARITY_SOURCE, 'Segment'], dtype=object)
+
+
+def build_product_vocabulary(df, rules):
+    """Produits des transactions et des règles (colonnes des matrices)"""
+    products = pd.unique(df['Description'].dropna().astype(object))
+    if not rules.empty:
+        rule_items = {item for column in ('antecedents', 'consequents')
+                      for items in rules[column] for item in items}
+        products = np.concatenate([products, np.array(sorted(rule_items - set(products)), dtype=object)])
+    return pd.Index(products)
+
+
+def build_history_matrix(df, customer_ids, products):
+    """
+    Historique d'achat booléen (clients x produits) au format CSR
+
+    Args:
+        customer_ids: pd.Index des clients (lignes)
+        products: pd.Index des produits (colonnes)
+    """
+    df = df[['CustomerID', 'Description']].dropna()
+    rows = customer_ids.get_indexer(df['CustomerID'].to_numpy())
+    cols = products.get_indexer(df['Description'].to_numpy(dtype=object))
+    keep = (rows >= 0) & (cols >= 0)
+    history = sp.csr_matrix((np.ones(keep.sum(), dtype=np.int32), (rows[keep], cols[keep])),
+                            shape=(len(customer_ids), len(products)))
+    history.sum_duplicates()
+    history.data[:] = 1
+    history.sort_indices()
+    return history
+
+
+def build_rule_matrices(rules, products):
+    """
+    Règles sous forme de matrices creuses (règles x produits)
+
+    Returns:
+        dict: antecedents (0/1), sizes (taille des antécédents), consequents
+        (position + 1 du conséquent, ordre alphabétique), lift et confidence
+        arrondis comme dans get_customer_recommendations
+    """
+    n_rules = len(rules)
+    antecedents = [products.get_indexer(list(items)) for items in rules['antecedents']] if n_rules else []
+    consequents = [products.get_indexer(sorted(items)) for items in rules['consequents']] if n_rules else []
+
+    def _matrix(items_per_rule, positional):
+        lengths = np.array([len(items) for items in items_per_rule], dtype=np.int64)
+        rows = np.repeat(np.arange(n_rules), lengths)
+        cols = np.concatenate(items_per_rule) if n_rules else np.empty(0, dtype=np.int64)
+        data = (np.concatenate([np.arange(1, n + 1) for n in lengths]) if positional and n_rules
+                else np.ones(len(cols), dtype=np.int32))
+        return sp.csr_matrix((data.astype(np.int32), (rows, cols)), shape=(n_rules, len(products)))
+
+    antecedent_matrix = _matrix(antecedents, positional=False)
+    return {
+        'antecedents': antecedent_matrix,
+        'sizes': np.asarray(antecedent_matrix.sum(axis=1)).ravel(),
+        'consequents': _matrix(consequents, positional=True),
+        'lift': np.array([round(float(value), 2) for value in rules['lift']] if n_rules else []),
+        'confidence': np.array([round(float(value), 2) for value in rules['confidence']] if n_rules else [])
+    }
+
+
+def _first_per_key(keys, order):
+    """Indices (dans `order`) du premier élément de chaque clé"""
+    sorted_keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    return order[first]
+
+
+def _rank_within(groups):
+    """Rang (0, 1, ...) de chaque élément dans son groupe, groupes contigus"""
+    starts = np.ones(len(groups), dtype=bool)
+    starts[1:] = groups[1:] != groups[:-1]
+    start_positions = np.flatnonzero(starts)
+    return np.arange(len(groups)) - np.repeat(start_positions, np.diff(np.append(start_positions, len(groups))))
+
+
+def recommend_chunk(history, segment_codes, rule_matrices, segment_table, top_n=10,
+                    similarity=None):
+    """
+    Recommandations d'un bloc de clients
+
+    Mêmes règles que get_customer_recommendations : conséquents des règles
+    dont l'antécédent est inclus dans l'historique (meilleur lift par
+    produit, ordre des règles à égalité), produits similaires, puis
+    meilleures ventes du segment absentes de l'historique.
+
+    Args:
+        history: CSR booléen (clients du bloc x produits)
+        segment_codes: code segment de chaque client du bloc (-1 = aucun)
+        rule_matrices: build_rule_matrices
+        segment_table: indices produits (segments x top_n_segment, -1 = vide)
+        similarity: None ou dict matrix (voisinages produits x produits),
+            order (rang catalogue de chaque produit), top_n
+
+    Returns:
+        (lignes clients, rangs, indices produits, lift, confidence, code source)
+        triés par client et rang
+    """
+    n_products = history.shape[1]
+    history_keys = (np.repeat(np.arange(history.shape[0], dtype=np.int64), np.diff(history.indptr))
+                    * n_products + history.indices)
+
+    # 1. Règles satisfaites : nombre de produits de l'antécédent présents dans l'historique
+    antecedents = rule_matrices['antecedents']
+    counts = (history @ antecedents.T).tocoo()
+    matched = counts.data == rule_matrices['sizes'][counts.col]
+    customers, rule_ids = counts.row[matched].astype(np.int64), counts.col[matched].astype(np.int64)
+
+    # Dépliage des conséquents de chaque règle satisfaite
+    consequents = rule_matrices['consequents']
+    lengths = np.diff(consequents.indptr)[rule_ids]
+    offsets = np.repeat(consequents.indptr[rule_ids] - np.cumsum(lengths) + lengths, lengths)
+    positions = np.arange(lengths.sum()) + offsets
+    customers, rule_ids = np.repeat(customers, lengths), np.repeat(rule_ids, lengths)
+    products, slots = consequents.indices[positions].astype(np.int64), consequents.data[positions]
+    keys = customers * n_products + products
+    fresh = ~np.isin(keys, history_keys)
+    customers, rule_ids, products, slots, keys = (
+        customers[fresh], rule_ids[fresh], products[fresh], slots[fresh], keys[fresh])
+
+    # Un produit par client : meilleur lift, position de sa première apparition
+    lift = rule_matrices['lift'][rule_ids]
+    first = _first_per_key(keys, np.lexsort((slots, rule_ids, keys)))
+    best = _first_per_key(keys, np.lexsort((rule_ids, -lift, keys)))
+    assoc = {
+        'customers': customers[first], 'products': products[first],
+        'first_rule': rule_ids[first], 'first_slot': slots[first],
+        'lift': lift[best], 'confidence': rule_matrices['confidence'][rule_ids[best]]
+    }
+    order = np.lexsort((assoc['first_slot'], assoc['first_rule'], -assoc['lift'], assoc['customers']))
+    assoc = {name: values[order] for name, values in assoc.items()}
+    assoc_rank = _rank_within(assoc['customers'])
+    n_assoc = np.bincount(assoc['customers'], minlength=history.shape[0])
+    taken_keys = assoc['customers'] * n_products + assoc['products']
+
+    # 2. Produits similaires : somme des similarités avec l'historique
+    sim_customers = sim_products = sim_rank = np.empty(0, dtype=np.int64)
+    if similarity is not None:
+        scores = (history.astype(np.float64) @ similarity['matrix']).tocoo()
+        sim_customers, sim_products = scores.row.astype(np.int64), scores.col.astype(np.int64)
+        sim_keys = sim_customers * n_products + sim_products
+        keep = (scores.data > 0) & ~np.isin(sim_keys, history_keys) & ~np.isin(sim_keys, taken_keys)
+        sim_customers, sim_products = sim_customers[keep], sim_products[keep]
+        totals = np.round(scores.data[keep], 6)
+        order = np.lexsort((similarity['order'][sim_products], -totals, sim_customers))
+        sim_customers, sim_products = sim_customers[order], sim_products[order]
+        sim_rank = _rank_within(sim_customers)
+        selected = sim_rank < similarity['top_n']
+        sim_customers, sim_products, sim_rank = (
+            sim_customers[selected], sim_products[selected], sim_rank[selected])
+        taken_keys = np.concatenate([taken_keys, sim_customers * n_products + sim_products])
+        sim_rank = sim_rank + n_assoc[sim_customers]
+    n_taken = n_assoc + np.bincount(sim_customers, minlength=history.shape[0])
+
+    # 3. Meilleures ventes du segment, absentes de l'historique et des sources précédentes
+    has_segment = segment_codes >= 0
+    seg_customers = np.repeat(np.flatnonzero(has_segment), segment_table.shape[1])
+    seg_products = segment_table[segment_codes[has_segment]].ravel().astype(np.int64)
+    seg_keys = seg_customers * n_products + seg_products
+    keep = ((seg_products >= 0) & ~np.isin(seg_keys, history_keys)
+            & ~np.isin(seg_keys, taken_keys))
+    seg_customers, seg_products = seg_customers[keep], seg_products[keep]
+    seg_rank = n_taken[seg_customers] + _rank_within(seg_customers)
+
+    # Fusion et top-N par client
+    n_plain = len(sim_customers) + len(seg_customers)
+    customers = np.concatenate([assoc['customers'], sim_customers, seg_customers])
+    ranks = np.concatenate([assoc_rank, sim_rank, seg_rank])
+    products = np.concatenate([assoc['products'], sim_products, seg_products])
+    lift = np.concatenate([assoc['lift'], np.full(n_plain, np.nan)])
+    confidence = np.concatenate([assoc['confidence'], np.full(n_plain, np.nan)])
+    sources = np.repeat(np.arange(3), [len(assoc_rank), len(sim_rank), len(seg_rank)])
+    selected = ranks < top_n
+    order = np.lexsort((ranks[selected], customers[selected]))
+    return tuple(values[selected][order] for values in (customers, ranks, products, lift,
+                                                        confidence, sources))
+
+
+def _recommend_frame(history, segment_codes, customer_ids, products, rule_matrices,
+                     segment_table, top_n, similarity):
+    """Bloc de recommandations au format long (OUTPUT_COLUMNS)"""
+    customers, ranks, product_ids, lift, confidence, sources = recommend_chunk(
+        history, segment_codes, rule_matrices, segment_table, top_n, similarity)
+    return pd.DataFrame({
+        'CustomerID': customer_ids[customers],
+        'rang': ranks + 1,
+        'produit': products[product_ids],
+        'lift': lift,
+        'confidence': confidence,
+        'source': SOURCES[sources]
+    }, columns=OUTPUT_COLUMNS)
+
+
+def iter_batch_recommendations(df, rfm, rules, customer_ids=None, top_n=10, chunk_size=50_000,
+                               n_jobs=1, segment_popularity=None, item_similarity=None):
+    """
+    Recommandations de tous les clients, bloc par bloc
+
+    Args:
+        customer_ids: clients à traiter (None = tous les clients de `rfm`)
+        top_n: recommandations par client
+        chunk_size: clients par bloc (mémoire bornée)
+        n_jobs: processus en parallèle sur les blocs (1 = dans le processus courant)
+        segment_popularity: build_segment_popularity (si absente, en cache par
+            jeu de données, voir segment_popularity_for)
+        item_similarity: build_item_similarity (None = pas de source Similarité)
+
+    Yields:
+        DataFrame long : CustomerID, rang, produit, lift, confidence, source
+    """
+    settings = get_settings()
+    if segment_popularity is None:
+        segment_popularity = segment_popularity_for(df, rfm)
+    customer_ids = pd.Index(rfm.index if customer_ids is None else customer_ids)
+
+    products = build_product_vocabulary(df, rules)
+    history = build_history_matrix(df, customer_ids, products)
+    rule_matrices = build_rule_matrices(rules, products)
+
+    # Table segment x meilleures ventes (indices produits, -1 = vide)
+    segments = list(segment_popularity)
+    width = settings.recommendations.top_n_segment
+    segment_table = np.full((len(segments), width), -1, dtype=np.int64)
+    for i, segment in enumerate(segments):
+        best = products.get_indexer(segment_popularity[segment].index[:width].to_numpy(dtype=object))
+        segment_table[i, :len(best)] = best
+    segment_codes = pd.Index(segments).get_indexer(
+        rfm['Segment'].reindex(customer_ids).to_numpy(dtype=object))
+
+    similarity = None
+    if item_similarity is not None:
+        # Égalités départagées par l'ordre du catalogue de similarité, comme similar_products
+        catalogue_order = pd.Index(item_similarity['products']).get_indexer(products)
+        similarity = {
+            'matrix': similarity_matrix(item_similarity, products),
+            'order': np.where(catalogue_order >= 0, catalogue_order, len(products)),
+            'top_n': settings.recommendations.top_n_similar
+        }
+
+    product_labels = products.to_numpy(dtype=object)
+    bounds = list(range(0, len(customer_ids), chunk_size)) + [len(customer_ids)]
+    chunks = [(history[start:stop], segment_codes[start:stop], customer_ids[start:stop].to_numpy(),
+               product_labels, rule_matrices, segment_table, top_n, similarity)
+              for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    if n_jobs == 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield _recommend_frame(*chunk)
+        return
+    with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count()) as executor:
+        yield from executor.map(_recommend_frame, *zip(*chunks))
+
+
+@profiled()
+def get_batch_recommendations(df, rfm, rules, **kwargs):
+    """Recommandations de tous les clients en un seul DataFrame (voir iter_batch_recommendations)"""
+    frames = list(iter_batch_recommendations(df, rfm, rules, **kwargs))
+    if not frames:
+        return pd.DataFrame(columns=OUTPUT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
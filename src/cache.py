@@ -0,0 +1,100 @@
+"""
+Module de cache des résultats dérivés
+Agrégats calculés une fois par version des données : LRU en mémoire et niveau disque optionnel
+"""
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from src.config import get_settings
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+
+
+def _disk_dir(settings):
+    """Répertoire du niveau disque (relatif au projet), None si désactivé"""
+    disk_dir = settings.cache.disk_dir
+    if not disk_dir:
+        return None
+    return disk_dir if os.path.isabs(disk_dir) else os.path.join(PROJECT_DIR, disk_dir)
+
+
+def _params_digest(params):
+    return hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+
+
+def _read_disk(path):
+    try:
+        with open(path, 'rb') as file:
+            return True, pickle.load(file)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return False, None
+
+
+def _write_disk(disk_dir, name, version, filename, value):
+    """Écriture atomique puis suppression des versions précédentes du même résultat"""
+    os.makedirs(disk_dir, exist_ok=True)
+    tmp_path = os.path.join(disk_dir, f".{filename}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as file:
+        pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, os.path.join(disk_dir, filename))
+    for other in os.listdir(disk_dir):
+        if other.startswith(f"{name}-") and other.endswith('.pkl') and f"-{version[:16]}-" not in other:
+            try:
+                os.remove(os.path.join(disk_dir, other))
+            except FileNotFoundError:
+                pass
+
+
+def get_or_compute(name, version, compute, params=()):
+    """
+    Résultat dérivé en cache
+
+    Args:
+        name: nom du résultat (ex. 'global_metrics')
+        version: version des données sources (artifact_store.dataset_version)
+        compute: fonction sans argument calculant le résultat
+        params: paramètres hachables qui distinguent deux résultats de même nom
+
+    Returns:
+        le résultat, partagé entre appels et sessions (à ne pas modifier)
+    """
+    settings = get_settings()
+    key = (name, version, params)
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return _memory[key]
+
+    disk_dir = _disk_dir(settings)
+    filename = f"{name}-{version[:16]}-{_params_digest(params)}.pkl"
+    found = False
+    if disk_dir is not None:
+        found, value = _read_disk(os.path.join(disk_dir, filename))
+    if not found:
+        value = compute()
+        if disk_dir is not None:
+            _write_disk(disk_dir, name, version, filename, value)
+
+    with _lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > settings.cache.max_entries:
+            _memory.popitem(last=False)
+    return value
+
+
+def clear_cache(disk=False):
+    """Vidage du cache mémoire (et du niveau disque si `disk`)"""
+    with _lock:
+        _memory.clear()
+    disk_dir = _disk_dir(get_settings())
+    if disk and disk_dir is not None and os.path.isdir(disk_dir):
+        for filename in os.listdir(disk_dir):
+            if filename.endswith('.pkl'):
+                os.remove(os.path.join(disk_dir, filename))
@@ -0,0 +1,199 @@
+"""
+Module de représentation compacte des transactions
+Colonnes codées en mémoire (tables de codes, entiers 32 bits) et décodage à l'affichage
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from src.config import get_settings
+
+# Colonnes texte codées par dictionnaire (codes entiers + table de libellés)
+CODED_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Country']
+MONTH_FORMAT = '%Y-%m'
+
+
+def _labels(series):
+    """Libellés distincts (chaînes) d'une colonne, sans décoder une catégorie ligne à ligne"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.cat.remove_unused_categories().cat.categories.to_series()
+    return series.dropna().astype(str).unique()
+
+
+def build_code_tables(*frames, columns=CODED_COLUMNS, base=None):
+    """
+    Tables de codes communes à plusieurs DataFrames (libellés triés)
+
+    Deux tables compactées avec les mêmes tables partagent leurs codes :
+    concaténation sans repasser par des chaînes, jointures sur les codes.
+
+    Args:
+        base: tables existantes, complétées des libellés nouveaux (ajouts au store)
+    """
+    base = base or {}
+    tables = {}
+    for col in columns:
+        labels = [_labels(frame[col]) for frame in frames if col in frame.columns]
+        if col in base:
+            labels.append(base[col].to_numpy(dtype=object))
+        if labels:
+            tables[col] = pd.Index(np.unique(np.concatenate(labels).astype(object)))
+    return tables
+
+
+def compact_transactions(df, code_tables=None):
+    """
+    Représentation compacte des transactions
+
+    - InvoiceNo, StockCode, Description, Country : catégories (codes int8 à
+      int32 selon la taille de la table, libellés stockés une seule fois)
+    - CustomerID : int32 (Int32 si les clients anonymes sont conservés)
+    - Quantity : int32 ; UnitPrice : float32 (prix unitaires exacts au centime)
+    - TotalPrice reste en float64 : les sommes sur des millions de lignes
+      perdraient leur précision en float32
+    - InvoiceMonth : catégorie 'AAAA-MM' (ordre lexical = ordre chronologique)
+    - InvoiceDate reste en datetime64[ns] : même largeur qu'un entier de
+      jours, sans perdre l'heure
+
+    Les colonnes absentes (projection) sont ignorées ; l'opération est
+    idempotente.
+
+    Args:
+        df: transactions nettoyées (voir clean_transactions / add_features)
+        code_tables: tables partagées (build_code_tables), None = propres au DataFrame
+    """
+    code_tables = code_tables or {}
+    df = df.copy()
+    for col in CODED_COLUMNS:
+        if col not in df.columns:
+            continue
+        categorical = isinstance(df[col].dtype, pd.CategoricalDtype)
+        if col in code_tables:
+            table = code_tables[col]
+            df[col] = (df[col].cat.set_categories(table) if categorical
+                       else df[col].astype(pd.CategoricalDtype(table)))
+        elif not categorical:
+            df[col] = df[col].astype('category')
+
+    if 'CustomerID' in df.columns:
+        nullable = not get_settings().data.drop_na_customer
+        df['CustomerID'] = df['CustomerID'].astype('Int32' if nullable else 'int32')
+    if 'Quantity' in df.columns:
+        df['Quantity'] = df['Quantity'].astype(np.int32)
+    if 'UnitPrice' in df.columns:
+        df['UnitPrice'] = df['UnitPrice'].astype(np.float32)
+    if 'InvoiceMonth' in df.columns and not isinstance(df['InvoiceMonth'].dtype, pd.CategoricalDtype):
+        df['InvoiceMonth'] = df['InvoiceMonth'].dt.strftime(MONTH_FORMAT).astype('category')
+    return df
+
+
+def _concat(parts, dtype):
+    return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+
+class PairAccumulator:
+    """
+    Couples (clé, produit) distincts d'un flux de blocs, codés en entiers
+
+    Chaque bloc est réduit à ses couples distincts (poids cumulé : somme
+    de `weight`, ou nombre de lignes) codés par des tables de libellés qui
+    grandissent au fil des blocs. La mémoire dépend du nombre de couples
+    distincts, pas du nombre de lignes ni de la taille des libellés.
+    """
+
+    def __init__(self, key, item='Description', weight=None):
+        self.key, self.item, self.weight = key, item, weight
+        self.keys = pd.Index([])
+        self.items = pd.Index([])
+        self._rows, self._cols, self._weights = [], [], []
+
+    @staticmethod
+    def _encode(table, labels):
+        """Codes de `labels` dans `table`, complétée des libellés nouveaux (ordre d'apparition)"""
+        codes = table.get_indexer(labels)
+        unseen = codes < 0
+        if unseen.any():
+            table = table.append(pd.Index(pd.unique(labels[unseen])))
+            codes[unseen] = table.get_indexer(labels[unseen])
+        return table, codes.astype(np.int32)
+
+    def update(self, chunk):
+        columns = [self.key, self.item] + ([self.weight] if self.weight else [])
+        pairs = chunk[columns].dropna(subset=[self.key, self.item])
+        grouped = pairs.groupby([self.key, self.item], observed=True, sort=False)
+        weights = grouped[self.weight].sum() if self.weight else grouped.size()
+        self.keys, rows = self._encode(self.keys, weights.index.get_level_values(0).to_numpy())
+        self.items, cols = self._encode(self.items, weights.index.get_level_values(1).to_numpy())
+        self._rows.append(rows)
+        self._cols.append(cols)
+        self._weights.append(weights.to_numpy(dtype=np.float64))
+        return self
+
+    def matrix(self):
+        """
+        Matrice creuse (clés x produits) des poids cumulés
+
+        Returns:
+            (matrice CSR, clés dans l'ordre d'apparition, produits triés)
+        """
+        order = np.argsort(self.items.to_numpy(dtype=object), kind='stable')
+        rank = np.empty(len(order), dtype=np.int32)
+        rank[order] = np.arange(len(order), dtype=np.int32)
+        matrix = sp.csr_matrix(
+            (_concat(self._weights, np.float64),
+             (_concat(self._rows, np.int32), rank[_concat(self._cols, np.int32)])),
+            shape=(len(self.keys), len(self.items)))
+        matrix.sum_duplicates()
+        return matrix, self.keys, np.asarray(self.items[order], dtype=object)
+
+
+def fold_pairs(chunks, *accumulators):
+    """Passage des blocs d'un flux, chacun replié au passage dans les accumulateurs de couples"""
+    for chunk in chunks:
+        for accumulator in accumulators:
+            accumulator.update(chunk)
+        yield chunk
+
+
+def decode_labels(df, columns=None):
+    """
+    Libellés d'origine à la frontière d'affichage ou d'export
+
+    Catégories -> valeurs (chaînes), InvoiceMonth -> Period mensuelle.
+    """
+    df = df.copy()
+    for col in columns or df.columns:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if col == 'InvoiceMonth':
+            df[col] = pd.PeriodIndex(df[col].astype(str), freq='M')
+        else:
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+def memory_report(df, compacted=None):
+    """
+    Empreinte mémoire par colonne (octets par ligne), avant / après compactage
+
+    Args:
+        df: transactions d'origine
+        compacted: version compacte (None = compact_transactions(df))
+
+    Returns:
+        DataFrame (colonne, avant, après, gain) et ligne 'Total' ;
+        unités : octets par ligne
+    """
+    if compacted is None:
+        compacted = compact_transactions(df)
+    rows = max(len(df), 1)
+    before = df.memory_usage(deep=True, index=False) / rows
+    after = compacted.memory_usage(deep=True, index=False) / rows
+    report = pd.DataFrame({
+        'type_avant': df.dtypes.astype(str),
+        'octets_avant': before,
+        'type_apres': compacted.dtypes.astype(str).reindex(before.index),
+        'octets_apres': after.reindex(before.index)
+    })
+    report.loc['Total'] = ['', before.sum(), '', after.sum()]
+    report['gain'] = report['octets_avant'] / report['octets_apres']
+    return report.round(2)
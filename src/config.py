@@ -0,0 +1,145 @@
+"""
+Module de configuration
+Configuration typée, chargée une fois par processus et rechargée si le fichier change
+"""
+import os
+import threading
+from dataclasses import dataclass
+
+import yaml
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'config.yaml'
+)
+
+
+@dataclass(frozen=True)
+class DataConfig:
+    source_url: str
+    min_quantity: int
+    drop_na_customer: bool
+    max_rows: int
+    raw_cache_dir: str | None = 'data/raw'
+    offline: bool = False
+    n_jobs: int | None = 1
+    late_days: int = 7
+
+
+@dataclass(frozen=True)
+class RFMConfig:
+    snapshot_days: int
+    recency_quantiles: int
+    frequency_quantiles: int
+    monetary_quantiles: int
+    segment_rules: dict
+    default_segment: str = 'Autre'
+
+
+@dataclass(frozen=True)
+class BasketConfig:
+    min_support: float
+    min_confidence: float
+    min_lift: float
+    max_rules: int
+    sample_invoices: int | None = None
+    sample_products: int | None = None
+    algorithm: str = 'apriori'
+    n_jobs: int | None = 1
+    partitions: int | None = None
+
+
+@dataclass(frozen=True)
+class RecommendationsConfig:
+    top_n_segment: int
+    top_n_rules: int
+    top_n_similar: int = 5
+    similarity_metric: str = 'cosine'
+    similarity_neighbors: int = 20
+
+
+@dataclass(frozen=True)
+class VisualizationConfig:
+    max_customers_display: int
+    chart_height: int
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    max_entries: int = 64
+    disk_dir: str | None = None
+    stage_dir: str | None = 'data/cache/stages'
+    stage_max_mb: int = 2048
+
+
+@dataclass(frozen=True)
+class MetricsConfig:
+    approximate: bool = False
+    hll_precision: int = 14
+    heavy_hitters: int = 1024
+
+
+@dataclass(frozen=True)
+class Settings:
+    data: DataConfig
+    rfm: RFMConfig
+    basket_analysis: BasketConfig
+    recommendations: RecommendationsConfig
+    visualization: VisualizationConfig
+    cache: CacheConfig
+    metrics: MetricsConfig
+    raw: dict
+    path: str
+    mtime_ns: int
+
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def config_path():
+    """Chemin du fichier de configuration (SEGMENTATION_CONFIG ou config/config.yaml du projet)"""
+    return os.environ.get('SEGMENTATION_CONFIG', DEFAULT_CONFIG_PATH)
+
+
+def _parse(path, mtime_ns):
+    """Lecture YAML et construction des sections typées"""
+    with open(path, 'r', encoding='utf-8') as file:
+        raw = yaml.safe_load(file)
+    return Settings(
+        data=DataConfig(**raw['data']),
+        rfm=RFMConfig(**raw['rfm']),
+        basket_analysis=BasketConfig(**raw['basket_analysis']),
+        recommendations=RecommendationsConfig(**raw['recommendations']),
+        visualization=VisualizationConfig(**raw['visualization']),
+        cache=CacheConfig(**(raw.get('cache') or {})),
+        metrics=MetricsConfig(**(raw.get('metrics') or {})),
+        raw=raw,
+        path=path,
+        mtime_ns=mtime_ns,
+    )
+
+
+def get_settings():
+    """
+    Configuration courante du processus
+
+    Le fichier n'est relu que si sa date de modification a changé : le coût
+    par appel se limite à un stat().
+    """
+    path = config_path()
+    mtime_ns = os.stat(path).st_mtime_ns
+    settings = _cache.get(path)
+    if settings is not None and settings.mtime_ns == mtime_ns:
+        return settings
+
+    with _lock:
+        settings = _cache.get(path)
+        if settings is None or settings.mtime_ns != mtime_ns:
+            settings = _parse(path, mtime_ns)
+            _cache[path] = settings
+    return settings
+
+
+def load_config():
+    """Configuration brute (dict) partagée, à ne pas modifier"""
+    return get_settings().raw
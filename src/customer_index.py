@@ -0,0 +1,75 @@
+"""
+Module d'index client
+Accès en O(1) aux transactions et résumés d'un client (vue Client 360)
+"""
+import numpy as np
+import pandas as pd
+from src.profiling import profiled
+
+
+@profiled()
+def build_customer_index(df):
+    """
+    Construction de l'index client
+
+    Les transactions sont triées (tri stable) par CustomerID : celles d'un
+    client forment une tranche contiguë décrite par un tableau d'offsets
+    de type CSR. Les produits distincts et le nombre de commandes de
+    chaque client sont précalculés.
+
+    Returns:
+        dict: transactions triées, customer_ids, offsets, positions,
+        product_offsets, products, summary
+    """
+    df = df[df['CustomerID'].notna()]
+    order = np.argsort(df['CustomerID'].to_numpy(dtype=np.int64), kind='stable')
+    transactions = df.iloc[order].reset_index(drop=True)
+
+    sorted_ids = transactions['CustomerID'].to_numpy(dtype=np.int64)
+    customer_ids, starts = np.unique(sorted_ids, return_index=True)
+    offsets = np.append(starts, len(sorted_ids)).astype(np.int64)
+
+    # Produits distincts par client, dans l'ordre du premier achat
+    customer_products = transactions[['CustomerID', 'Description']].dropna().drop_duplicates()
+    product_ids = customer_products['CustomerID'].to_numpy(dtype=np.int64)
+    product_offsets = np.append(np.searchsorted(product_ids, customer_ids), len(product_ids))
+
+    summary = pd.DataFrame({
+        'nb_produits': np.diff(product_offsets),
+        'nb_commandes': transactions.groupby('CustomerID')['InvoiceNo'].nunique().to_numpy()
+    }, index=pd.Index(customer_ids, name='CustomerID'))
+
+    return {
+        'transactions': transactions,
+        'customer_ids': customer_ids,
+        'offsets': offsets,
+        'positions': {int(cid): i for i, cid in enumerate(customer_ids)},
+        'product_offsets': product_offsets,
+        'products': customer_products['Description'].to_numpy(),
+        'summary': summary
+    }
+
+
+def get_customer_transactions(index, customer_id):
+    """Transactions d'un client (tranche de la table triée)"""
+    i = index['positions'].get(int(customer_id))
+    if i is None:
+        return index['transactions'].iloc[0:0]
+    return index['transactions'].iloc[index['offsets'][i]:index['offsets'][i + 1]]
+
+
+def get_customer_products(index, customer_id):
+    """Produits distincts achetés par un client"""
+    i = index['positions'].get(int(customer_id))
+    if i is None:
+        return index['products'][0:0]
+    return index['products'][index['product_offsets'][i]:index['product_offsets'][i + 1]]
+
+
+def get_customer_summary(index, customer_id):
+    """Résumé d'un client : nombre de produits distincts et de commandes"""
+    i = index['positions'].get(int(customer_id))
+    if i is None:
+        return {'nb_produits': 0, 'nb_commandes': 0}
+    row = index['summary'].iloc[i]
+    return {'nb_produits': int(row['nb_produits']), 'nb_commandes': int(row['nb_commandes'])}
@@ -2,39 +2,403 @@
 Module de préprocessing des données
 Nettoyage, préparation et ingénierie des features
 """
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-import yaml
-from datetime import datetime
-import requests
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.artifact_store import (append_artifact, default_store_dir, read_artifact,
+                                store_exists, write_artifact)
+from src.compact import compact_transactions
+from src.config import get_settings
+from src.hash_index import hash_index_add, hash_index_contains, isin_sorted
+from src.profiling import profiled
+from src.sources import is_synthetic, local_source, synthetic_source
 
-from src.utils import load_config
+RAW_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity',
+               'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+INGESTION_STATE = 'ingestion_state.json'
+ROW_HASH_INDEX = 'row_hashes.npy'
+# En dessous, le coût de lancement du pool dépasse le gain du parallélisme
+MIN_PARALLEL_ROWS = 100_000
 
-def load_and_clean_data(source_url=None):
+
+def read_source(source_url):
     """
-    Chargement et nettoyage des données de vente en ligne
+    Lecture d'une source brute (Excel, CSV, Parquet ou synthetic://<lignes>)
+
+    Les sources distantes et les classeurs Excel passent par le cache local
+    (src/sources.py) : téléchargement et conversion Parquet une seule fois.
     """
-    config = load_config()
-    
-    # Chargement depuis URL
-    if source_url is None:
-        source_url = config['data']['source_url']
-    
-    df = pd.read_excel(source_url)
-    
-    # Conversion des types
+    if is_synthetic(source_url):
+        return synthetic_source(source_url)
+    source_url = local_source(source_url)
+    path = str(source_url).lower()
+    if path.endswith('.csv'):
+        return pd.read_csv(source_url)
+    if path.endswith('.parquet'):
+        return pd.read_parquet(source_url)
+    return pd.read_excel(source_url)
+
+
+def iter_source_chunks(source_url, chunksize):
+    """
+    Lecture par blocs d'une source CSV ou Parquet (ou Excel converti en Parquet)
+
+    Raises:
+        ValueError: si le format ne permet pas la lecture par blocs (Excel sans cache local)
+    """
+    if is_synthetic(source_url):
+        df = synthetic_source(source_url)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+        return
+    source_url = local_source(source_url)
+    path = str(source_url).lower()
+    if path.endswith('.csv'):
+        yield from pd.read_csv(source_url, chunksize=chunksize)
+    elif path.endswith('.parquet'):
+        parquet_file = pq.ParquetFile(source_url)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Lecture par blocs non supportée pour {source_url} (CSV ou Parquet attendu)")
+
+
+def _has_timestamp_dates(path):
+    """InvoiceDate stockée en horodatage Parquet (filtrable à la lecture)"""
+    schema = pq.read_schema(path)
+    return 'InvoiceDate' in schema.names and pa.types.is_timestamp(schema.field('InvoiceDate').type)
+
+
+def read_source_since(source_url, since, chunksize=None):
+    """
+    Lecture des seules lignes d'une source datées d'au moins `since`
+
+    Parquet (ou Excel converti) avec dates typées : filtre appliqué par
+    pyarrow à la lecture, les groupes de lignes antérieurs sont sautés.
+    CSV / Parquet à dates textuelles : lecture par blocs de `chunksize`
+    lignes (data.max_rows), seules les lignes retenues sont conservées.
+
+    Returns:
+        lignes brutes, InvoiceDate converties en datetime
+    """
+    since = pd.Timestamp(since)
+    if not is_synthetic(source_url):
+        source_url = local_source(source_url)
+        path = str(source_url).lower()
+        if path.endswith('.parquet') and _has_timestamp_dates(source_url):
+            return pd.read_parquet(source_url, filters=[('InvoiceDate', '>=', since)])
+        if not path.endswith(('.csv', '.parquet')):
+            # Classeur Excel sans cache local : lecture complète
+            raw = read_source(source_url)
+            raw['InvoiceDate'] = pd.to_datetime(raw['InvoiceDate'])
+            return raw[raw['InvoiceDate'] >= since]
+
+    selected = []
+    empty = pd.DataFrame(columns=RAW_COLUMNS)
+    for chunk in iter_source_chunks(source_url, chunksize or get_settings().data.max_rows):
+        dates = pd.to_datetime(chunk['InvoiceDate'])
+        recent = (dates >= since).to_numpy()
+        empty = chunk.iloc[:0]
+        if recent.any():
+            chunk = chunk[recent].copy()
+            chunk['InvoiceDate'] = dates[recent]
+            selected.append(chunk)
+    return pd.concat(selected, ignore_index=True) if selected else empty
+
+
+@profiled()
+def clean_transactions(df, settings=None):
+    """
+    Conversion des types, filtres et dédoublonnage des lignes brutes
+    """
+    if settings is None:
+        settings = get_settings()
+
+    # Conversion des types (codes mixtes entiers/chaînes dans l'export Excel)
+    df = df.copy()
     df['InvoiceDate'] = pd.to_datetime(df['InvoiceDate'])
     df['CustomerID'] = df['CustomerID'].astype('Int64')
-    
+    df['InvoiceNo'] = df['InvoiceNo'].astype(str)
+    df['StockCode'] = df['StockCode'].astype(str)
+    df['Quantity'] = df['Quantity'].astype('int64')
+    df['UnitPrice'] = df['UnitPrice'].astype('float64')
+
     # Nettoyage
-    if config['data']['drop_na_customer']:
+    if settings.data.drop_na_customer:
         df = df.dropna(subset=['CustomerID'])
-    
-    df = df[df['Quantity'] > config['data']['min_quantity']]
+
+    df = df[df['Quantity'] > settings.data.min_quantity]
     df = df[df['UnitPrice'] > 0]
-    df = df.drop_duplicates()
-    
-    # Features
+    return df.drop_duplicates()
+
+
+def add_features(df):
+    """Ajout des features TotalPrice et InvoiceMonth"""
     df['TotalPrice'] = df['Quantity'] * df['UnitPrice']
     df['InvoiceMonth'] = df['InvoiceDate'].dt.to_period('M')
-    
-    return df
\ No newline at end of file
+    return df
+
+
+def _clean_partition(df, settings):
+    """Nettoyage et features d'une partition (exécuté dans un processus du pool)"""
+    return add_features(clean_transactions(df, settings))
+
+
+def partition_by_invoice(df, partitions):
+    """
+    Découpage des lignes brutes par empreinte de facture
+
+    Deux lignes identiques ont la même facture, donc tombent dans la même
+    partition : le dédoublonnage par partition équivaut au dédoublonnage
+    global. Chaque partition conserve l'index de `df`.
+    """
+    invoice_hash = pd.util.hash_array(df['InvoiceNo'].astype(str).to_numpy())
+    part_ids = invoice_hash % np.uint64(partitions)
+    order = np.argsort(part_ids, kind='stable')
+    bounds = np.searchsorted(part_ids[order], np.arange(partitions + 1, dtype=np.uint64))
+    return [df.iloc[order[start:stop]] for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start]
+
+
+@profiled()
+def clean_and_featurize_parallel(df, n_jobs=None, settings=None):
+    """
+    Nettoyage et features en parallèle sur un pool de processus
+
+    Les lignes sont partitionnées par facture (partition_by_invoice), chaque
+    partition est nettoyée dans un processus puis les résultats sont
+    réassemblés dans l'ordre d'origine : résultat identique à
+    add_features(clean_transactions(df)).
+
+    Args:
+        n_jobs: processus en parallèle (None = tous les cœurs)
+    """
+    if settings is None:
+        settings = get_settings()
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs <= 1 or len(df) < MIN_PARALLEL_ROWS:
+        return _clean_partition(df, settings)
+
+    # Index positionnel pendant le traitement : l'ordre d'origine est
+    # rétabli même si l'index reçu contient des doublons
+    parts = partition_by_invoice(df.reset_index(drop=True), n_jobs)
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(parts))) as executor:
+        cleaned = list(executor.map(_clean_partition, parts, [settings] * len(parts)))
+    result = pd.concat(cleaned).sort_index()
+    result.index = df.index[result.index.to_numpy()]
+    return result
+
+
+def hash_rows(df):
+    """
+    Empreintes uint64 des lignes sur les colonnes brutes
+
+    Types ramenés à une forme canonique : une ligne compactée (catégories,
+    int32, float32) a la même empreinte que la ligne nettoyée d'origine.
+    """
+    canonical = df[RAW_COLUMNS].astype({'Quantity': 'int64', 'UnitPrice': np.float32,
+                                        'CustomerID': 'Int64'})
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+
+def iter_clean_chunks(source_url=None, chunksize=None, dedupe=True):
+    """
+    Nettoyage en flux d'une source CSV/Parquet, bloc par bloc
+
+    Chaque bloc subit les mêmes règles que load_and_clean_data
+    (min_quantity, UnitPrice > 0, drop_na_customer). Les doublons entre
+    blocs sont écartés via un index d'empreintes (8 octets par ligne
+    distincte) : la mémoire reste bornée par la taille de bloc.
+
+    Args:
+        source_url: source brute (par défaut data.source_url)
+        chunksize: lignes par bloc (par défaut data.max_rows)
+        dedupe: dédoublonnage global entre blocs
+
+    Yields:
+        DataFrame nettoyé avec features pour chaque bloc
+    """
+    settings = get_settings()
+    if source_url is None:
+        source_url = settings.data.source_url
+    if chunksize is None:
+        chunksize = settings.data.max_rows
+
+    levels = []
+    for chunk in iter_source_chunks(source_url, chunksize):
+        chunk = clean_transactions(chunk, settings)
+        if dedupe and not chunk.empty:
+            hashes = hash_rows(chunk)
+            is_new = ~hash_index_contains(levels, hashes)
+            chunk = chunk[is_new]
+            hash_index_add(levels, hashes[is_new])
+        if not chunk.empty:
+            yield add_features(chunk.copy())
+
+
+def _read_ingestion_state(store_dir):
+    """État d'ingestion (filigrane) et index des empreintes déjà vues"""
+    state_path = os.path.join(store_dir, INGESTION_STATE)
+    index_path = os.path.join(store_dir, ROW_HASH_INDEX)
+    if not (os.path.exists(state_path) and os.path.exists(index_path)):
+        return None, None
+    with open(state_path, 'r', encoding='utf-8') as file:
+        state = json.load(file)
+    return state, np.load(index_path)
+
+
+def read_ingestion_state(store_dir):
+    """État d'ingestion (filigrane, lignes du dernier lot dont tardives), None si absent"""
+    try:
+        with open(os.path.join(store_dir, INGESTION_STATE), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_ingestion_state(store_dir, state, hash_index):
+    """Écriture atomique de l'état d'ingestion"""
+    index_tmp = os.path.join(store_dir, ROW_HASH_INDEX + '.tmp.npy')
+    np.save(index_tmp, hash_index)
+    os.replace(index_tmp, os.path.join(store_dir, ROW_HASH_INDEX))
+
+    state_tmp = os.path.join(store_dir, INGESTION_STATE + '.tmp')
+    with open(state_tmp, 'w', encoding='utf-8') as file:
+        json.dump(state, file, indent=2)
+    os.replace(state_tmp, os.path.join(store_dir, INGESTION_STATE))
+
+
+def reset_ingestion_state(store_dir):
+    """
+    Suppression de l'état d'ingestion après une réécriture complète des
+    transactions : il sera reconstruit au prochain passage incrémental
+    """
+    for filename in (INGESTION_STATE, ROW_HASH_INDEX):
+        try:
+            os.remove(os.path.join(store_dir, filename))
+        except FileNotFoundError:
+            pass
+
+
+def _bootstrap_ingestion_state(store_dir):
+    """Reconstruction de l'état à partir des transactions déjà stockées"""
+    if not store_exists(store_dir, names=('transactions',)):
+        return None, np.empty(0, dtype=np.uint64)
+    stored = read_artifact(store_dir, 'transactions', columns=RAW_COLUMNS)
+    if stored.empty:
+        return None, np.empty(0, dtype=np.uint64)
+    return _watermark(stored), np.unique(hash_rows(stored))
+
+
+def _watermark(df):
+    """Dernier couple (InvoiceDate, InvoiceNo) observé"""
+    last_date = df['InvoiceDate'].max()
+    last_invoice = df.loc[df['InvoiceDate'] == last_date, 'InvoiceNo'].astype(str).max()
+    return {'InvoiceDate': last_date.isoformat(), 'InvoiceNo': last_invoice}
+
+
+@profiled()
+def ingest_incremental(source_url=None, store_dir=None):
+    """
+    Ingestion incrémentale d'un lot de factures dans le store
+
+    Seules les lignes datées d'au moins le filigrane moins data.late_days
+    jours sont lues (filtre appliqué à la lecture, voir read_source_since).
+    Les lignes de cette fenêtre antérieures au filigrane (factures
+    arrivées en retard) passent comme les autres par l'index trié des
+    empreintes : déjà vues, elles sont écartées ; nouvelles, elles sont
+    ingérées et comptées dans l'état d'ingestion ('late_rows'). Le lot
+    est ajouté comme nouvelle partie de l'artefact 'transactions'.
+
+    Returns:
+        DataFrame du lot nettoyé effectivement ajouté
+    """
+    settings = get_settings()
+    if source_url is None:
+        source_url = settings.data.source_url
+    if store_dir is None:
+        store_dir = default_store_dir()
+    os.makedirs(store_dir, exist_ok=True)
+
+    state, hash_index = _read_ingestion_state(store_dir)
+    if state is None:
+        watermark, hash_index = _bootstrap_ingestion_state(store_dir)
+    else:
+        watermark = state['watermark']
+
+    if watermark is None:
+        raw = read_source(source_url)
+    else:
+        since = pd.Timestamp(watermark['InvoiceDate']) - pd.Timedelta(days=settings.data.late_days)
+        raw = read_source_since(source_url, since)
+
+    batch = clean_transactions(raw, settings)
+    hashes = hash_rows(batch)
+    is_new = ~isin_sorted(hashes, hash_index)
+    batch = add_features(batch[is_new].copy())
+    hashes = np.unique(hashes[is_new])
+    late_rows = 0 if watermark is None else int(
+        (batch['InvoiceDate'] < pd.Timestamp(watermark['InvoiceDate'])).sum())
+
+    if not batch.empty:
+        if store_exists(store_dir, names=('transactions',)):
+            append_artifact(store_dir, 'transactions', batch)
+        else:
+            write_artifact(store_dir, 'transactions', batch)
+
+        # Fusion de deux suites triées : le tri stable (timsort) est linéaire
+        hash_index = np.concatenate([hash_index, hashes])
+        hash_index.sort(kind='stable')
+        # Un lot de lignes tardives ne fait pas reculer le filigrane
+        latest = _watermark(batch)
+        if watermark is None or (pd.Timestamp(latest['InvoiceDate']), latest['InvoiceNo']) > (
+                pd.Timestamp(watermark['InvoiceDate']), watermark['InvoiceNo']):
+            watermark = latest
+
+    if watermark is not None:
+        _write_ingestion_state(store_dir, {'watermark': watermark, 'rows': int(len(hash_index)),
+                                           'batch_rows': int(len(batch)), 'late_rows': late_rows},
+                               hash_index)
+    return batch
+
+
+@profiled()
+def load_and_clean_data(source_url=None, incremental=False, store_dir=None, n_jobs=None):
+    """
+    Chargement et nettoyage des données de vente en ligne
+
+    Args:
+        source_url: source brute (par défaut data.source_url)
+        incremental: n'ingérer que les nouvelles factures (voir ingest_incremental)
+        store_dir: store d'artefacts utilisé en mode incrémental
+        n_jobs: surcharge de data.n_jobs ; au-delà d'un processus, nettoyage
+            partitionné par facture (clean_and_featurize_parallel)
+
+    Returns:
+        transactions en représentation compacte (voir compact_transactions)
+    """
+    if incremental:
+        return compact_transactions(ingest_incremental(source_url, store_dir))
+
+    settings = get_settings()
+
+    # Chargement depuis URL
+    if source_url is None:
+        source_url = settings.data.source_url
+
+    n_jobs = n_jobs if n_jobs is not None else settings.data.n_jobs
+
+    df = read_source(source_url)
+    if (n_jobs or os.cpu_count() or 1) > 1:
+        df = clean_and_featurize_parallel(df, n_jobs, settings)
+    else:
+        df = add_features(clean_transactions(df, settings))
+
+    # Représentation compacte (catégories, entiers 32 bits)
+    return compact_transactions(df)
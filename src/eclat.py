@@ -0,0 +1,105 @@
+"""
+Module ECLAT
+Extraction d'itemsets fréquents par tidlists verticales codées en bitsets
+"""
+import numpy as np
+import pandas as pd
+
+
+def build_tidsets(basket):
+    """
+    Tidlists verticales : une liste de factures par produit, codée en entier Python
+
+    Le bit i de l'entier d'un produit est à 1 si la facture i le contient ;
+    l'intersection de deux tidlists est un ET binaire et le support un
+    comptage de bits.
+
+    Args:
+        basket: matrice creuse booléenne (factures x produits)
+
+    Returns:
+        liste des bitsets, un par colonne
+    """
+    csc = basket.tocsc()
+    n_rows = csc.shape[0]
+    tidsets = []
+    for j in range(csc.shape[1]):
+        rows = np.zeros(n_rows, dtype=bool)
+        rows[csc.indices[csc.indptr[j]:csc.indptr[j + 1]]] = True
+        tidsets.append(int.from_bytes(np.packbits(rows, bitorder='little').tobytes(), 'little'))
+    return tidsets
+
+
+def eclat(basket, products, min_support=0.05, max_len=None):
+    """
+    Itemsets fréquents par parcours en profondeur des classes d'équivalence
+
+    Les produits sont ordonnés par support croissant : les intersections
+    les plus sélectives sont calculées en premier et les tidsets restent petits.
+
+    Args:
+        basket: matrice creuse booléenne (factures x produits)
+        products: libellés des colonnes
+        min_support: support minimum (fraction des factures)
+        max_len: taille maximale des itemsets (None = sans limite)
+
+    Returns:
+        DataFrame (support, itemsets) au format mlxtend
+    """
+    n_rows = basket.shape[0]
+    if n_rows == 0:
+        return pd.DataFrame(columns=['support', 'itemsets'])
+    min_count = int(np.ceil(min_support * n_rows - 1e-9))  # même seuil que mlxtend (support >= min_support)
+
+    tidsets = build_tidsets(basket)
+    items = [(j, tids, tids.bit_count()) for j, tids in enumerate(tidsets)]
+    items = sorted((item for item in items if item[2] >= min_count), key=lambda item: item[2])
+
+    supports, itemsets = [], []
+
+    def _extend(prefix, candidates):
+        for i, (j, tids, count) in enumerate(candidates):
+            itemset = prefix + (j,)
+            supports.append(count / n_rows)
+            itemsets.append(itemset)
+            if max_len is not None and len(itemset) >= max_len:
+                continue
+            # Classe d'équivalence : intersections avec les items suivants
+            suffix = []
+            for k, other, _ in candidates[i + 1:]:
+                common = tids & other
+                common_count = common.bit_count()
+                if common_count >= min_count:
+                    suffix.append((k, common, common_count))
+            if suffix:
+                _extend(itemset, suffix)
+
+    _extend((), items)
+
+    products = np.asarray(products)
+    return pd.DataFrame({
+        'support': supports,
+        'itemsets': [frozenset(products[list(itemset)]) for itemset in itemsets]
+    })
+
+
+def count_itemsets(basket, itemsets):
+    """
+    Nombre de factures contenant chaque itemset (indices de colonnes)
+
+    Args:
+        basket: matrice creuse booléenne (factures x produits)
+        itemsets: séquence de tuples d'indices de colonnes
+
+    Returns:
+        np.ndarray int64 des comptages
+    """
+    columns = sorted({j for itemset in itemsets for j in itemset})
+    tidsets = dict(zip(columns, build_tidsets(basket[:, columns])))
+    counts = np.empty(len(itemsets), dtype=np.int64)
+    for i, itemset in enumerate(itemsets):
+        tids = tidsets[itemset[0]]
+        for j in itemset[1:]:
+            tids &= tidsets[j]
+        counts[i] = tids.bit_count()
+    return counts
@@ -0,0 +1,37 @@
+"""
+Module d'index d'empreintes
+Ensembles d'empreintes uint64 en tableaux triés, interrogés par recherche dichotomique
+"""
+import numpy as np
+
+
+def isin_sorted(values, sorted_index):
+    """Appartenance de `values` à un tableau trié (recherche dichotomique)"""
+    if len(sorted_index) == 0:
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_index, values)
+    positions[positions == len(sorted_index)] = 0
+    return sorted_index[positions] == values
+
+
+def hash_index_contains(levels, hashes):
+    """Appartenance à un index d'empreintes par niveaux triés"""
+    seen = np.zeros(len(hashes), dtype=bool)
+    for level in levels:
+        seen |= isin_sorted(hashes, level)
+    return seen
+
+
+def hash_index_add(levels, hashes):
+    """
+    Ajout d'empreintes à un index par niveaux triés
+
+    Les niveaux de taille comparable sont fusionnés (structure LSM) :
+    coût total O(n log n) et au plus log(n) niveaux à interroger.
+    """
+    level = np.unique(hashes)
+    while levels and len(levels[-1]) <= len(level):
+        level = np.concatenate([levels.pop(), level])
+        level.sort(kind='stable')
+    levels.append(level)
+    return levels
@@ -0,0 +1,183 @@
+"""
+Module de similarité produit-produit
+Top-K voisins de chaque produit (cosinus ou Jaccard sur la matrice clients x produits)
+"""
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from src.config import get_settings
+from src.profiling import profiled
+
+SIMILARITY_METRICS = ('cosine', 'jaccard')
+
+
+@profiled()
+def build_item_similarity(df, k=None, metric=None, block_size=512):
+    """
+    Voisins les plus proches de chaque produit
+
+    Les co-achats (nombre de clients communs) sont calculés par blocs de
+    produits avec un produit de matrices creuses ; seul le top-K de chaque
+    ligne est conservé, la matrice produits x produits n'est jamais stockée.
+
+    Args:
+        df: transactions (CustomerID, Description)
+        k: voisins conservés par produit (None = recommendations.similarity_neighbors)
+        metric: 'cosine' ou 'jaccard' (None = recommendations.similarity_metric)
+        block_size: produits par bloc (mémoire bloc x produits)
+
+    Returns:
+        dict: products, positions, neighbors (int32, -1 = vide), scores (float32)
+    """
+    pairs = df[['CustomerID', 'Description']].dropna()
+    customer_codes, _ = pd.factorize(pairs['CustomerID'])
+    product_codes, products = pd.factorize(pairs['Description'], sort=True)
+    purchases = sp.csr_matrix((np.ones(len(pairs), dtype=np.float32), (customer_codes, product_codes)),
+                              shape=(customer_codes.max() + 1 if len(pairs) else 0, len(products)))
+    return item_similarity_from_purchases(purchases, products, k, metric, block_size)
+
+
+def item_similarity_from_purchases(purchases, products, k=None, metric=None, block_size=512):
+    """
+    Voisins les plus proches de chaque produit depuis la matrice clients x produits
+
+    Args:
+        purchases: matrice creuse (clients x produits), non nulle si le client
+            a acheté le produit (par exemple PairAccumulator('CustomerID').matrix())
+        products: libellés des colonnes
+
+    Returns:
+        dict au format de build_item_similarity
+    """
+    settings = get_settings().recommendations
+    k = settings.similarity_neighbors if k is None else k
+    metric = settings.similarity_metric if metric is None else metric
+    if metric not in SIMILARITY_METRICS:
+        raise ValueError(f"Métrique inconnue : {metric} (attendu : {', '.join(SIMILARITY_METRICS)})")
+
+    n_products = len(products)
+    purchases = sp.csr_matrix(purchases, dtype=np.float32, copy=True)
+    purchases.sum_duplicates()
+    purchases.data[:] = 1
+    by_product = purchases.T.tocsr()
+    buyers = np.asarray(purchases.sum(axis=0)).ravel()
+
+    k = min(k, max(n_products - 1, 0))
+    neighbors = np.full((n_products, k), -1, dtype=np.int32)
+    scores = np.zeros((n_products, k), dtype=np.float32)
+    for start in range(0, n_products, block_size):
+        stop = min(start + block_size, n_products)
+        common = (by_product[start:stop] @ purchases).toarray()
+        if metric == 'cosine':
+            similarity = common / np.sqrt(np.outer(buyers[start:stop], buyers))
+        else:
+            similarity = common / (buyers[start:stop, None] + buyers[None, :] - common)
+        similarity[common == 0] = 0
+        similarity[np.arange(stop - start), np.arange(start, stop)] = 0  # pas le produit lui-même
+
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k] if k else np.empty((stop - start, 0), int)
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        order = np.lexsort((best, -best_scores), axis=1)
+        best, best_scores = np.take_along_axis(best, order, 1), np.take_along_axis(best_scores, order, 1)
+        neighbors[start:stop] = np.where(best_scores > 0, best, -1)
+        scores[start:stop] = np.where(best_scores > 0, best_scores, 0)
+
+    products = np.asarray(products, dtype=object)
+    return {
+        'products': products,
+        'positions': {product: i for i, product in enumerate(products)},
+        'neighbors': neighbors,
+        'scores': scores
+    }
+
+
+def similar_products(similarity, history, top_n=5, exclude=()):
+    """
+    Produits les plus proches d'un historique
+
+    Le score d'un produit est la somme de ses similarités avec les produits
+    de l'historique (voisins top-K uniquement) ; les égalités sont
+    départagées par l'ordre du catalogue.
+
+    Returns:
+        liste de tuples (produit, score)
+    """
+    rows = [similarity['positions'][product] for product in history
+            if product in similarity['positions']]
+    if not rows:
+        return []
+    neighbors = similarity['neighbors'][rows].ravel()
+    scores = similarity['scores'][rows].ravel().astype(np.float64)
+    valid = neighbors >= 0
+    candidates, inverse = np.unique(neighbors[valid], return_inverse=True)
+    totals = np.round(np.bincount(inverse, weights=scores[valid]), 6)
+
+    excluded = set(rows) | {similarity['positions'][product] for product in exclude
+                            if product in similarity['positions']}
+    keep = ~np.isin(candidates, list(excluded))
+    candidates, totals = candidates[keep], totals[keep]
+    best = np.lexsort((candidates, -totals))[:top_n]
+    return [(similarity['products'][i], float(total)) for i, total in zip(candidates[best], totals[best])]
+
+
+def similarity_matrix(similarity, products):
+    """Voisinages top-K en matrice creuse (produits x produits) sur le vocabulaire `products`"""
+    positions = pd.Index(products).get_indexer(similarity['products'])
+    k = similarity['neighbors'].shape[1]
+    rows = np.repeat(positions, k)
+    neighbors = similarity['neighbors'].ravel()
+    valid = (neighbors >= 0) & (rows >= 0)
+    cols = positions[neighbors[valid]]
+    valid_cols = cols >= 0
+    return sp.csr_matrix((similarity['scores'].ravel()[valid][valid_cols].astype(np.float64),
+                          (rows[valid][valid_cols], cols[valid_cols])),
+                         shape=(len(products), len(products)))
+
+
+def similarity_to_frame(similarity):
+    """Voisinages au format long (Description, Voisin, Score) pour le store d'artefacts"""
+    k = similarity['neighbors'].shape[1]
+    neighbors = similarity['neighbors'].ravel()
+    valid = neighbors >= 0
+    return pd.DataFrame({
+        'Description': np.repeat(similarity['products'], k)[valid],
+        'Voisin': similarity['products'][neighbors[valid]],
+        'Score': similarity['scores'].ravel()[valid]
+    })
+
+
+def similarity_from_frame(frame):
+    """
+    Reconstruction des tableaux top-K depuis le format long (ordre des voisins conservé)
+
+    Description et Voisin codés sur la même table (tables de codes du store) :
+    positions tirées des codes, sans hacher les libellés.
+    """
+    description, voisin = frame['Description'], frame['Voisin']
+    if (isinstance(description.dtype, pd.CategoricalDtype) and isinstance(voisin.dtype, pd.CategoricalDtype)
+            and description.cat.categories.equals(voisin.cat.categories)
+            and description.cat.categories.is_monotonic_increasing):
+        codes = np.concatenate([description.cat.codes.to_numpy(), voisin.cat.codes.to_numpy()])
+        used = np.unique(codes)
+        products = np.asarray(description.cat.categories[used], dtype=object)
+        rows, cols = np.split(np.searchsorted(used, codes), [len(frame)])
+    else:
+        descriptions = description.astype(object).to_numpy()
+        voisins = voisin.astype(object).to_numpy()
+        products = np.asarray(sorted(set(descriptions) | set(voisins)), dtype=object)
+        index = pd.Index(products)
+        rows = index.get_indexer(descriptions)
+        cols = index.get_indexer(voisins)
+    ranks = frame.groupby(rows, sort=False).cumcount().to_numpy()
+    k = int(ranks.max()) + 1 if len(frame) else 0
+
+    neighbors = np.full((len(products), k), -1, dtype=np.int32)
+    scores = np.zeros((len(products), k), dtype=np.float32)
+    neighbors[rows, ranks] = cols
+    scores[rows, ranks] = frame['Score'].to_numpy(dtype=np.float32)
+    return {
+        'products': products,
+        'positions': {product: i for i, product in enumerate(products)},
+        'neighbors': neighbors,
+        'scores': scores
+    }
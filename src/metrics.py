@@ -4,21 +4,59 @@ Calcul des métriques globales et par segment
 """
 import pandas as pd
 import numpy as np
+from src.config import get_settings
+from src.profiling import profiled
+from src.sketches import GlobalMetricsSketch
 
-def compute_global_metrics(df):
+def _approximate(approximate):
+    """Mode sketch demandé (par défaut metrics.approximate)"""
+    return get_settings().metrics.approximate if approximate is None else approximate
+
+def new_global_metrics_sketch():
+    """Sketch vide des KPIs globaux aux paramètres de la section metrics"""
+    metrics_config = get_settings().metrics
+    return GlobalMetricsSketch(metrics_config.hll_precision, metrics_config.heavy_hitters)
+
+def sketch_global_metrics(chunks):
+    """
+    Sketch des KPIs globaux replié sur des blocs de transactions
+
+    Mémoire bornée quel que soit le nombre de lignes ; les sketches de
+    plusieurs sources ou processus se combinent avec merge().
+    """
+    sketch = new_global_metrics_sketch()
+    for chunk in chunks:
+        sketch.update(chunk)
+    return sketch
+
+def fold_sketch(chunks, sketch):
+    """Passage des blocs d'un flux, chacun replié au passage dans `sketch`"""
+    for chunk in chunks:
+        sketch.update(chunk)
+        yield chunk
+
+@profiled()
+def compute_global_metrics(df, approximate=None):
     """
     Calcul des métriques globales
 
+    Args:
+        approximate: commandes et clients par HyperLogLog, top produits par
+            Space-Saving (par défaut metrics.approximate) ; CA toujours exact
+
     Returns:
         dict: CA, panier_moyen, nb_commandes, top_items
     """
+    if _approximate(approximate):
+        return sketch_global_metrics([df]).result()
+
     ca_total = df['TotalPrice'].sum()
     nb_commandes = df['InvoiceNo'].nunique()
     panier_moyen = ca_total / nb_commandes if nb_commandes > 0 else 0
     nb_clients = df['CustomerID'].nunique()
 
     # Top 5 items par CA
-    top_items = (df.groupby('Description')['TotalPrice']
+    top_items = (df.groupby('Description', observed=True)['TotalPrice']
                  .sum()
                  .sort_values(ascending=False)
                  .head(5))
@@ -31,6 +69,7 @@ def compute_global_metrics(df):
         'top_items': top_items
     }
 
+@profiled()
 def compute_segment_metrics(df, rfm, segment):
     """
     Calcul des métriques pour un segment spécifique
@@ -62,7 +101,7 @@ def compute_segment_metrics(df, rfm, segment):
     panier_moyen = ca_total / nb_commandes if nb_commandes > 0 else 0
 
     # Top 5 items par CA
-    top_items = (df_segment.groupby('Description')['TotalPrice']
+    top_items = (df_segment.groupby('Description', observed=True)['TotalPrice']
                  .sum()
                  .sort_values(ascending=False)
                  .head(5))
@@ -74,6 +113,65 @@ def compute_segment_metrics(df, rfm, segment):
         'top_items': top_items
     }
 
+@profiled()
+def compute_all_segments_breakdown(df, rfm, top_n=5):
+    """
+    Calcul des métriques de tous les segments en un seul passage
+
+    Le segment de chaque client est joint une fois aux transactions sous
+    forme de code entier ; CA, commandes et ventes par produit sortent de
+    bincount sur des clés (segment, facture) et (segment, produit).
+
+    Returns:
+        dict {segment: dict au format de compute_segment_metrics}
+    """
+    customer_codes, segments = pd.factorize(rfm['Segment'])
+    n_segments = len(segments)
+    customer_segment = pd.Series(customer_codes, index=rfm.index)
+    segment_codes = df['CustomerID'].map(customer_segment).fillna(-1).to_numpy(dtype=np.int64)
+    valid = segment_codes >= 0
+    segment_codes = segment_codes[valid]
+    prices = df['TotalPrice'].to_numpy(dtype=np.float64)[valid]
+
+    ca = np.bincount(segment_codes, weights=prices, minlength=n_segments)
+
+    # Une facture appartient à un seul client, donc à un seul segment
+    invoice_codes, invoices = pd.factorize(df['InvoiceNo'].to_numpy()[valid])
+    pair_keys = segment_codes * len(invoices) + invoice_codes
+    orders = np.bincount(pd.unique(pair_keys) // max(len(invoices), 1), minlength=n_segments)
+
+    # Ventes par (segment, produit) sur une grille dense segments x produits
+    product_codes, products = pd.factorize(df['Description'][valid])
+    known = product_codes >= 0
+    item_keys = segment_codes[known] * len(products) + product_codes[known]
+    grid_size = n_segments * len(products)
+    item_sales = np.bincount(item_keys, weights=prices[known], minlength=grid_size)
+    item_sales = item_sales.reshape(n_segments, len(products))
+    item_present = np.bincount(item_keys, minlength=grid_size).reshape(n_segments, len(products)) > 0
+
+    breakdown = {}
+    for i, segment in enumerate(segments):
+        if orders[i] == 0:
+            breakdown[segment] = {
+                'ca_total': 0,
+                'panier_moyen': 0,
+                'nb_commandes': 0,
+                'top_items': pd.Series(dtype=float)
+            }
+            continue
+        candidates = np.flatnonzero(item_present[i])
+        best = candidates[np.argsort(-item_sales[i, candidates], kind='stable')[:top_n]]
+        breakdown[segment] = {
+            'ca_total': ca[i],
+            'panier_moyen': ca[i] / orders[i],
+            'nb_commandes': int(orders[i]),
+            'top_items': pd.Series(item_sales[i, best],
+                                   index=pd.Index(np.asarray(products)[best], name='Description'),
+                                   name='TotalPrice')
+        }
+    return breakdown
+
+@profiled()
 def get_all_segments_metrics(df, rfm):
     """
     Calcul des métriques pour tous les segments
@@ -81,13 +179,13 @@ def get_all_segments_metrics(df, rfm):
     Returns:
         DataFrame avec métriques par segment
     """
-    segments = rfm['Segment'].unique()
+    breakdown = compute_all_segments_breakdown(df, rfm)
+    clients_per_segment = rfm['Segment'].value_counts()
     metrics_list = []
     ca_total_global = df['TotalPrice'].sum()
 
-    for segment in segments:
-        metrics = compute_segment_metrics(df, rfm, segment)
-        nb_clients = len(rfm[rfm['Segment'] == segment])
+    for segment, metrics in breakdown.items():
+        nb_clients = clients_per_segment[segment]
         ca_segment = metrics['ca_total']
         
         metrics_list.append({
@@ -104,18 +202,46 @@ def get_all_segments_metrics(df, rfm):
     return pd.DataFrame(metrics_list).sort_values('CA', ascending=False)
 
 
-def compute_business_insights(df, rfm):
+def compute_segment_totals(rfm):
+    """
+    Totaux par segment dérivés des agrégats RFM par client
+
+    Utilisable en mode streaming : aucune relecture des transactions.
+
+    Returns:
+        DataFrame indexé par segment : Clients, CA, Commandes
+    """
+    return (rfm.groupby('Segment', observed=True)
+            .agg(Clients=('Montant', 'size'),
+                 CA=('Montant', 'sum'),
+                 Commandes=('Fréquence', 'sum'))
+            .sort_values('CA', ascending=False))
+
+
+@profiled()
+def compute_business_insights(df, rfm, approximate=None, sketch=None):
     """
     Calcul des insights business pour les stakeholders
+
+    Les seuils de risque et d'opportunité restent des quantiles exacts :
+    ils portent sur rfm (une ligne par client), déjà en mémoire.
+
+    Args:
+        approximate: CA par client lu dans rfm['Montant'] et CA total dans
+            `sketch`, sans agréger les transactions (par défaut metrics.approximate)
+        sketch: GlobalMetricsSketch persisté par precompute (None = CA total
+            sommé sur df)
     
     Returns:
         dict: Indicateurs stratégiques
     """
-    ca_total = df['TotalPrice'].sum()
+    approximate = _approximate(approximate)
+    ca_total = sketch.ca_total if approximate and sketch is not None else df['TotalPrice'].sum()
     nb_clients_total = len(rfm)
     
     # Concentration du CA (règle 80/20)
-    client_revenue = df.groupby('CustomerID')['TotalPrice'].sum().sort_values(ascending=False)
+    client_revenue = (rfm['Montant'] if approximate
+                      else df.groupby('CustomerID')['TotalPrice'].sum()).sort_values(ascending=False)
     cumsum = client_revenue.cumsum() / ca_total
     nb_clients_80_pct = (cumsum <= 0.80).sum()
     concentration_80_20 = nb_clients_80_pct / nb_clients_total * 100
@@ -148,7 +274,7 @@ def compute_business_insights(df, rfm):
     valeur_client_moyenne = ca_total / nb_clients_total
     
     # Top segment par CA
-    segment_ca = rfm_copy.groupby('Segment')['Montant'].sum().sort_values(ascending=False)
+    segment_ca = rfm_copy.groupby('Segment', observed=True)['Montant'].sum().sort_values(ascending=False)
     top_segment = segment_ca.index[0] if len(segment_ca) > 0 else "N/A"
     top_segment_pct = segment_ca.iloc[0] / ca_total * 100 if len(segment_ca) > 0 else 0
     
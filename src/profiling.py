@@ -0,0 +1,195 @@
+"""
+Module de profilage
+Temps, mémoire et volumes des étapes du pipeline, rapport JSON (désactivé par défaut)
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_ENV = 'SEGMENTATION_PROFILE'
+MAX_RECORDS = 10_000  # mesures détaillées gardées (les plus récentes)
+
+_state = {'enabled': os.environ.get(PROFILE_ENV, '') not in ('', '0'), 'memory': False}
+_records = deque(maxlen=MAX_RECORDS)
+_summary = {}  # agrégat par étape, complet même quand les mesures détaillées sont tronquées
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable_profiling(memory=False):
+    """
+    Active l'enregistrement des mesures
+
+    Args:
+        memory: suivre aussi les allocations Python (tracemalloc, coûteux)
+    """
+    _state['enabled'] = True
+    _state['memory'] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable_profiling():
+    """Désactive l'enregistrement (les mesures déjà prises sont conservées)"""
+    _state['enabled'] = False
+    if _state['memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state['memory'] = False
+
+
+def profiling_enabled():
+    return _state['enabled']
+
+
+def reset_profiling():
+    """Efface les mesures enregistrées"""
+    with _lock:
+        _records.clear()
+        _summary.clear()
+
+
+def _peak_rss_mb():
+    """Pic de mémoire résidente du processus (Mo), None si indisponible"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024  # octets sous macOS, Ko sinon
+
+
+def _rows(value):
+    """Nombre de lignes d'un DataFrame / tableau / matrice creuse, None sinon"""
+    shape = getattr(value, 'shape', None)
+    return int(shape[0]) if shape else None
+
+
+@contextmanager
+def profile_block(name, rows=None):
+    """
+    Mesure d'un bloc de code
+
+    Le dict produit peut être complété dans le bloc (ex. record['rows_out']).
+    Sans profilage actif, le bloc s'exécute sans mesure.
+    """
+    if not _state['enabled']:
+        yield {}
+        return
+
+    depth = getattr(_local, 'depth', 0)
+    record = {'name': name, 'depth': depth, 'rows_in': rows, 'rows_out': None,
+              'started_at': datetime.now().isoformat(timespec='milliseconds')}
+    tracing = _state['memory'] and tracemalloc.is_tracing()
+    if tracing:
+        if depth == 0:
+            tracemalloc.reset_peak()
+        alloc_before = tracemalloc.get_traced_memory()[0]
+    rss_before = _peak_rss_mb()
+    _local.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['wall_s'] = time.perf_counter() - start
+        _local.depth = depth
+        rss_after = _peak_rss_mb()
+        record['peak_rss_mb'] = rss_after
+        record['peak_rss_delta_mb'] = rss_after - rss_before if rss_after is not None else None
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            record['py_alloc_delta_mb'] = (current - alloc_before) / 1e6
+            # Pic depuis le début de l'étape de premier niveau englobante
+            record['py_peak_mb'] = (peak - alloc_before) / 1e6 if depth == 0 else None
+        with _lock:
+            _records.append(record)
+            _aggregate(_summary, record)
+
+
+def profiled(name=None):
+    """
+    Décorateur de mesure d'une fonction
+
+    Lignes en entrée : premier argument s'il s'agit d'un DataFrame ou d'une
+    matrice ; lignes en sortie : idem pour le résultat. Désactivé, le
+    surcoût se limite à un test de booléen.
+    """
+    def decorator(func):
+        label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state['enabled']:
+                return func(*args, **kwargs)
+            with profile_block(label, rows=_rows(args[0]) if args else None) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = _rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def get_records():
+    """Copie des mesures enregistrées, dans l'ordre de fin d'exécution"""
+    with _lock:
+        return [dict(record) for record in _records]
+
+
+def _aggregate(summary, record):
+    entry = summary.setdefault(record['name'], {'calls': 0, 'total_s': 0.0, 'max_s': 0.0,
+                                                'max_peak_rss_mb': None})
+    entry['calls'] += 1
+    entry['total_s'] += record['wall_s']
+    entry['max_s'] = max(entry['max_s'], record['wall_s'])
+    if record.get('peak_rss_mb') is not None:
+        entry['max_peak_rss_mb'] = max(entry['max_peak_rss_mb'] or 0, record['peak_rss_mb'])
+
+
+def summarize(records=None):
+    """
+    Agrégat par étape : appels, temps total / max, pic mémoire max
+
+    Sans `records`, agrégat de toutes les mesures depuis le dernier
+    reset_profiling (y compris celles sorties des MAX_RECORDS conservées).
+    """
+    if records is None:
+        with _lock:
+            return {name: dict(entry) for name, entry in _summary.items()}
+    summary = {}
+    for record in records:
+        _aggregate(summary, record)
+    return summary
+
+
+def write_report(path, metadata=None, reset=True):
+    """
+    Rapport JSON : métadonnées, résumé par étape et mesures détaillées
+
+    Args:
+        reset: effacer les mesures une fois le rapport écrit (un rapport par exécution)
+    """
+    with _lock:
+        records = [dict(record) for record in _records]
+        summary = {name: dict(entry) for name, entry in _summary.items()}
+        if reset:
+            _records.clear()
+            _summary.clear()
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'metadata': {**(metadata or {}), 'records_dropped': sum(entry['calls'] for entry in summary.values())
+                     - len(records)},
+        'summary': summary,
+        'records': records
+    }
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2, ensure_ascii=False, default=str)
+    return report
@@ -2,56 +2,153 @@
 Module de recommandations
 Stratégies multiples de recommandation
 """
+import hashlib
+
+import numpy as np
 import pandas as pd
-from src.utils import load_config
+from src.cache import get_or_compute
+from src.config import get_settings
+from src.customer_index import get_customer_products
+from src.item_similarity import similar_products
+from src.rule_index import build_rule_index, match_rules
+from src.profiling import profiled
+from src.utils import cached_fingerprint
+
+SIMILARITY_SOURCE = 'Similarité'
+
+@profiled()
+def build_segment_popularity(df, rfm, top_n=None):
+    """
+    Meilleures ventes de chaque segment, en un seul passage
+
+    Le segment de chaque client est joint aux transactions sous forme de
+    code entier ; le CA par (segment, produit) sort d'un bincount.
+
+    Args:
+        top_n: produits conservés par segment (None = recommendations.top_n_segment)
+
+    Returns:
+        dict {segment: Series CA indexée par Description, décroissante}
+    """
+    if top_n is None:
+        top_n = get_settings().recommendations.top_n_segment
+    customer_codes, segments = pd.factorize(rfm['Segment'])
+    customer_segment = pd.Series(customer_codes, index=rfm.index)
+    segment_codes = df['CustomerID'].map(customer_segment).fillna(-1).to_numpy(dtype=np.int64)
+    product_codes, products = pd.factorize(df['Description'], sort=True)
+    valid = (segment_codes >= 0) & (product_codes >= 0)
+
+    keys = segment_codes[valid] * len(products) + product_codes[valid]
+    grid_size = len(segments) * len(products)
+    sales = np.bincount(keys, weights=df['TotalPrice'].to_numpy(dtype=np.float64)[valid],
+                        minlength=grid_size).reshape(len(segments), len(products))
+    present = np.bincount(keys, minlength=grid_size).reshape(len(segments), len(products)) > 0
+
+    popularity = {}
+    for i, segment in enumerate(segments):
+        candidates = np.flatnonzero(present[i])
+        best = candidates[np.argsort(-sales[i, candidates], kind='stable')[:top_n]]
+        popularity[segment] = pd.Series(sales[i, best],
+                                        index=pd.Index(np.asarray(products)[best], name='Description'),
+                                        name='TotalPrice')
+    return popularity
 
-def get_customer_recommendations(df, rfm, rules, customer_id):
+def segment_popularity_for(df, rfm, top_n=None):
+    """
+    Meilleures ventes par segment en cache (src/cache.py)
+
+    Calculées une fois par contenu des transactions (CustomerID,
+    Description, TotalPrice) et des segments : toute nouvelle table de
+    transactions ou RFM change la version et invalide le résultat.
+    """
+    if top_n is None:
+        top_n = get_settings().recommendations.top_n_segment
+    version = hashlib.sha1(
+        (cached_fingerprint(df, ['CustomerID', 'Description', 'TotalPrice'])
+         + cached_fingerprint(rfm, ['Segment'])).encode()
+    ).hexdigest()
+    return get_or_compute('segment_popularity', version,
+                          lambda: build_segment_popularity(df, rfm, top_n), params=(top_n,))
+
+@profiled()
+def get_customer_recommendations(df, rfm, rules, customer_id, customer_index=None,
+                                 rule_index=None, segment_popularity=None, item_similarity=None):
     """
     Génération des recommandations pour un client avec lift
 
+    Args:
+        customer_index: index client (build_customer_index) pour lire
+            l'historique en O(1) au lieu de filtrer `df`
+        rule_index: règles compilées (build_rule_index) ; construites à la
+            volée si absentes
+        segment_popularity: meilleures ventes par segment
+            (build_segment_popularity) ; si absentes, calculées une fois par
+            jeu de données (segment_popularity_for)
+        item_similarity: voisinages produits (build_item_similarity) ; sans
+            eux, pas de source Similarité
+
     Returns:
         dict: {
             'history': liste des achats précédents,
             'recommendations': liste de tuples (produit, lift, source)
         }
     """
-    config = load_config()
-
-    history = df[df['CustomerID'] == customer_id]['Description'].unique()
-    recommendations_with_lift = []
-
-    # 1. Règles d'association avec lift
-    if not rules.empty:
-        for _, rule in rules.iterrows():
-            if set(rule['antecedents']).issubset(history):
-                for cons in rule['consequents']:
-                    if cons not in history:
-                        recommendations_with_lift.append({
-                            'produit': cons,
-                            'lift': round(rule['lift'], 2),
-                            'confidence': round(rule['confidence'], 2),
-                            'source': 'Association'
-                        })
-
-    # 2. Recommandations par segment (sans lift car basé sur popularité)
+    settings = get_settings()
+
+    if customer_index is not None:
+        history = get_customer_products(customer_index, customer_id)
+    else:
+        history = df[df['CustomerID'] == customer_id]['Description'].unique()
+    if rule_index is None:
+        rule_index = build_rule_index(rules)
+    history_set = set(history)
+    recommendations = {}  # produit -> recommandation (une seule par produit)
+
+    # 1. Règles d'association avec lift (seules les règles atteintes par l'historique)
+    for rule_id in match_rules(rule_index, history_set):
+        lift = round(float(rule_index['lift'][rule_id]), 2)
+        for cons in rule_index['consequents'][rule_id]:
+            if cons in history_set:
+                continue
+            current = recommendations.get(cons)
+            if current is None or lift > current['lift']:
+                recommendations[cons] = {
+                    'produit': cons,
+                    'lift': lift,
+                    'confidence': round(float(rule_index['confidence'][rule_id]), 2),
+                    'source': 'Association'
+                }
+
+    # 2. Produits proches de l'historique (similarité produit-produit)
+    if item_similarity is not None:
+        similar = similar_products(item_similarity, history_set,
+                                   top_n=settings.recommendations.top_n_similar,
+                                   exclude=recommendations.keys())
+        for product, _ in similar:
+            recommendations[product] = {
+                'produit': product,
+                'lift': None,
+                'confidence': None,
+                'source': SIMILARITY_SOURCE
+            }
+
+    # 3. Recommandations par segment (sans lift car basé sur popularité)
+    if segment_popularity is None:
+        segment_popularity = segment_popularity_for(df, rfm)
     segment = rfm.loc[customer_id, 'Segment']
-    segment_customers = rfm[rfm['Segment'] == segment].index
-    segment_sales = (df[df['CustomerID'].isin(segment_customers)]
-                    .groupby('Description')['TotalPrice'].sum()
-                    .sort_values(ascending=False))
-
-    for product in segment_sales.head(config['recommendations']['top_n_segment']).index:
-        if product not in history:
-            # Vérifier si déjà dans les recommandations
-            if not any(r['produit'] == product for r in recommendations_with_lift):
-                recommendations_with_lift.append({
-                    'produit': product,
-                    'lift': None,  # Pas de lift pour recommandations segment
-                    'confidence': None,
-                    'source': 'Segment'
-                })
+    segment_sales = segment_popularity.get(segment, pd.Series(dtype=float))
+
+    for product in segment_sales.head(settings.recommendations.top_n_segment).index:
+        if product not in history_set and product not in recommendations:
+            recommendations[product] = {
+                'produit': product,
+                'lift': None,  # Pas de lift pour recommandations segment
+                'confidence': None,
+                'source': 'Segment'
+            }
 
     # Trier par lift (les None à la fin)
+    recommendations_with_lift = list(recommendations.values())
     recommendations_with_lift.sort(
         key=lambda x: (x['lift'] is None, -x['lift'] if x['lift'] else 0),
         reverse=False
@@ -2,76 +2,328 @@
 Module d'analyse RFM
 Calcul des scores et segmentation des clients
 """
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
 from datetime import timedelta
-from src.utils import load_config
+from src.hash_index import hash_index_add, hash_index_contains
+from src.config import get_settings
+from src.utils import dataset_fingerprint
+from src.profiling import profiled
 
-def calculate_rfm(df, snapshot_date=None):
-    """Calcul des métriques RFM"""
-    config = load_config()
+NS_PER_DAY = 86_400 * 10**9
+SNAPSHOT_CACHE_SIZE = 8
+_SNAPSHOT_CACHE = OrderedDict()
+# (configuration rfm, table, labels) de la dernière compilation des règles de segments
+_SEGMENT_TABLE = None
+
+@profiled()
+def calculate_rfm(df, snapshot_date=None, engine='pandas'):
+    """
+    Calcul des métriques RFM
+
+    Args:
+        df: DataFrame des transactions nettoyées
+        snapshot_date: date de référence (par défaut dernier achat + snapshot_days)
+        engine: 'pandas' (groupby à réducteurs natifs) ou 'numpy'
+            (noyaux bincount sur CustomerID codés en entiers)
+    """
+    settings = get_settings()
     if snapshot_date is None:
-        snapshot_date = df['InvoiceDate'].max() + timedelta(days=config['rfm']['snapshot_days'])
-    
-    rfm = df.groupby('CustomerID').agg({
-        'InvoiceDate': lambda x: (snapshot_date - x.max()).days,
-        'InvoiceNo': 'nunique',
-        'TotalPrice': 'sum'
-    }).rename(columns={
-        'InvoiceDate': 'Récence',
-        'InvoiceNo': 'Fréquence', 
-        'TotalPrice': 'Montant'
-    })
+        snapshot_date = df['InvoiceDate'].max() + timedelta(days=settings.rfm.snapshot_days)
+
+    if engine == 'numpy':
+        return _calculate_rfm_numpy(df, snapshot_date)
+    if engine != 'pandas':
+        raise ValueError(f"Moteur RFM inconnu : {engine}")
+
+    # Un seul groupby à réducteurs natifs, récence par soustraction vectorisée
+    rfm = df.groupby('CustomerID').agg(
+        DernierAchat=('InvoiceDate', 'max'),
+        Fréquence=('InvoiceNo', 'nunique'),
+        Montant=('TotalPrice', 'sum')
+    )
+    rfm.insert(0, 'Récence', (snapshot_date - rfm.pop('DernierAchat')).dt.days)
     return rfm
 
+def _calculate_rfm_numpy(df, snapshot_date):
+    """Noyaux NumPy : maximum.at, bincount et couples (client, facture) uniques"""
+    customer_codes, customers = pd.factorize(df['CustomerID'], sort=True)
+    valid = customer_codes >= 0
+    customer_codes = customer_codes[valid]
+    n_customers = len(customers)
+
+    # Dernier achat (int64 ns) par client
+    dates = df['InvoiceDate'].to_numpy(dtype='datetime64[ns]').view('int64')[valid]
+    last_purchase = np.full(n_customers, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last_purchase, customer_codes, dates)
+    recency = (pd.Timestamp(snapshot_date).value - last_purchase) // NS_PER_DAY
+
+    # Factures distinctes : clé entière unique par couple (client, facture)
+    invoice_codes, invoices = pd.factorize(df['InvoiceNo'])
+    pair_keys = customer_codes.astype(np.int64) * len(invoices) + invoice_codes[valid]
+    frequency = np.bincount(pd.unique(pair_keys) // len(invoices), minlength=n_customers)
+
+    monetary = np.bincount(customer_codes, weights=df['TotalPrice'].to_numpy()[valid],
+                           minlength=n_customers)
+
+    return pd.DataFrame({
+        'Récence': recency,
+        'Fréquence': frequency.astype(np.int64),
+        'Montant': monetary
+    }, index=pd.Index(customers, name='CustomerID'))
+
+@profiled()
+def calculate_rfm_streaming(chunks, snapshot_date=None):
+    """
+    Calcul des métriques RFM par agrégation incrémentale de blocs
+
+    Chaque bloc est replié dans les agrégats par client (dernier achat,
+    montant cumulé, nombre de factures distinctes) : la mémoire dépend du
+    nombre de clients et de factures, pas du nombre de lignes.
+
+    Args:
+        chunks: itérable de DataFrames nettoyés (voir iter_clean_chunks)
+        snapshot_date: date de référence (par défaut dernier achat + snapshot_days)
+
+    Returns:
+        DataFrame au même format que calculate_rfm
+    """
+    settings = get_settings()
+    aggregates = None
+    invoice_levels = []
+
+    for chunk in chunks:
+        # Couples (client, facture) jamais vus dans les blocs précédents
+        pairs = chunk[['CustomerID', 'InvoiceNo']].drop_duplicates()
+        pair_hashes = pd.util.hash_pandas_object(pairs, index=False).to_numpy()
+        new_pairs = pairs[~hash_index_contains(invoice_levels, pair_hashes)]
+        hash_index_add(invoice_levels, pair_hashes)
+
+        chunk_agg = chunk.groupby('CustomerID').agg(
+            LastPurchase=('InvoiceDate', 'max'),
+            Montant=('TotalPrice', 'sum')
+        )
+        chunk_agg['Fréquence'] = new_pairs.groupby('CustomerID').size()
+        chunk_agg['Fréquence'] = chunk_agg['Fréquence'].fillna(0).astype('int64')
+
+        if aggregates is None:
+            aggregates = chunk_agg
+        else:
+            aggregates = pd.concat([aggregates, chunk_agg]).groupby(level=0).agg({
+                'LastPurchase': 'max',
+                'Montant': 'sum',
+                'Fréquence': 'sum'
+            })
+
+    if aggregates is None:
+        return pd.DataFrame(columns=['Récence', 'Fréquence', 'Montant'])
+
+    if snapshot_date is None:
+        snapshot_date = aggregates['LastPurchase'].max() + timedelta(days=settings.rfm.snapshot_days)
+
+    rfm = pd.DataFrame({
+        'Récence': (snapshot_date - aggregates['LastPurchase']).dt.days,
+        'Fréquence': aggregates['Fréquence'],
+        'Montant': aggregates['Montant']
+    })
+    rfm.index.name = 'CustomerID'
+    return rfm.sort_index()
+
+@profiled()
 def score_rfm(rfm):
     """Calcul des scores RFM (1-5)"""
-    config = load_config()
+    rfm_config = get_settings().rfm
     
     # Score Récence (inversé)
-    rfm['R_score'] = pd.qcut(rfm['Récence'], config['rfm']['recency_quantiles'], 
-                           labels=list(range(config['rfm']['recency_quantiles'], 0, -1)))
+    rfm['R_score'] = pd.qcut(rfm['Récence'], rfm_config.recency_quantiles, 
+                           labels=list(range(rfm_config.recency_quantiles, 0, -1)))
     
     # Scores Fréquence et Montant
     rfm['F_score'] = pd.qcut(rfm['Fréquence'].rank(method='first'), 
-                           config['rfm']['frequency_quantiles'], 
-                           labels=list(range(1, config['rfm']['frequency_quantiles'] + 1)))
-    rfm['M_score'] = pd.qcut(rfm['Montant'], config['rfm']['monetary_quantiles'], 
-                           labels=list(range(1, config['rfm']['monetary_quantiles'] + 1)))
+                           rfm_config.frequency_quantiles, 
+                           labels=list(range(1, rfm_config.frequency_quantiles + 1)))
+    rfm['M_score'] = pd.qcut(rfm['Montant'], rfm_config.monetary_quantiles, 
+                           labels=list(range(1, rfm_config.monetary_quantiles + 1)))
     
     rfm['RFM_score'] = (rfm['R_score'].astype(str) + rfm['F_score'].astype(str) + 
                        rfm['M_score'].astype(str))
     return rfm
 
+def compile_segment_rules(rfm_config=None):
+    """
+    Compilation du bloc rfm.segment_rules en liste ordonnée de règles
+
+    Returns:
+        (règles, segment par défaut) où chaque règle est un tuple
+        (label, bornes min [R, F, M], bornes max [R, F, M])
+    """
+    if rfm_config is None:
+        rfm_config = get_settings().rfm
+    rules = []
+    for rule in rfm_config.segment_rules.values():
+        mins = [-np.inf if v is None else v for v in rule.get('min') or [None] * 3]
+        maxs = [np.inf if v is None else v for v in rule.get('max') or [None] * 3]
+        rules.append((rule['label'], mins, maxs))
+    return rules, rfm_config.default_segment
+
 def map_rfm_to_segment(r_score, f_score, m_score):
     """Mapping des scores RFM vers segments"""
-    if r_score >= 4 and f_score >= 4 and m_score >= 4:
-        return 'Champions'
-    elif r_score >= 2 and f_score >= 3 and m_score >= 3:
-        return 'Clients Fidèles'
-    elif r_score >= 3 and f_score >= 2 and m_score >= 3:
-        return 'Potentiels Fidèles'
-    elif r_score >= 4 and f_score <= 1:
-        return 'Nouveaux Clients'
-    elif r_score <= 1 and f_score >= 4 and m_score >= 4:
-        return 'À Ne Pas Perdre'
-    elif r_score <= 1 and f_score <= 2 and m_score <= 2:
-        return 'Hibernants'
-    else:
-        return 'Autre'
-
-def compute_segment_evolution(df):
-    """Évolution des segments dans le temps"""
-    quarters = pd.date_range(df['InvoiceDate'].min(), df['InvoiceDate'].max(), freq='Q')
-    segments_dict = {}
-    
-    for q in quarters:
-        rfm_q = calculate_rfm(df, q + timedelta(days=1))
-        if not rfm_q.empty:
+    table, labels = compiled_segment_table()
+    scores = (int(r_score), int(f_score), int(m_score))
+    if all(0 <= score < size for score, size in zip(scores, table.shape)):
+        return labels[table[scores]]
+
+    # Scores hors des quantiles configurés : cascade évaluée directement
+    rules, default = compile_segment_rules()
+    for label, mins, maxs in rules:
+        if all(lo <= score <= hi for score, lo, hi in zip(scores, mins, maxs)):
+            return label
+    return default
+
+def build_segment_table(shape, rfm_config=None):
+    """
+    Table de correspondance (R, F, M) -> indice de segment
+
+    La cascade de règles est évaluée une fois sur la grille des scores ;
+    les règles prioritaires sont appliquées en dernier.
+
+    Returns:
+        (table d'indices de forme `shape`, tableau des labels)
+    """
+    rules, default = compile_segment_rules(rfm_config)
+    labels = np.array([label for label, _, _ in rules] + [default], dtype=object)
+    grid = np.indices(shape)
+    table = np.full(shape, len(rules), dtype=np.int8)
+    for i in range(len(rules) - 1, -1, -1):
+        _, mins, maxs = rules[i]
+        match = np.ones(shape, dtype=bool)
+        for axis in range(3):
+            match &= (grid[axis] >= mins[axis]) & (grid[axis] <= maxs[axis])
+        table[match] = i
+    return table, labels
+
+def compiled_segment_table(rfm_config=None):
+    """
+    Table (R, F, M) -> segment de la configuration courante, compilée une fois
+
+    Couvre les scores 0..quantiles de chaque axe. Recompilée uniquement
+    quand get_settings() renvoie une nouvelle configuration (fichier
+    modifié) : les appels client par client ne paient qu'une indexation.
+
+    Returns:
+        (table d'indices, tableau des labels)
+    """
+    global _SEGMENT_TABLE
+    if rfm_config is None:
+        rfm_config = get_settings().rfm
+    compiled = _SEGMENT_TABLE
+    if compiled is None or compiled[0] is not rfm_config:
+        shape = (rfm_config.recency_quantiles + 1, rfm_config.frequency_quantiles + 1,
+                 rfm_config.monetary_quantiles + 1)
+        compiled = (rfm_config, *build_segment_table(shape, rfm_config))
+        _SEGMENT_TABLE = compiled
+    return compiled[1], compiled[2]
+
+@profiled()
+def assign_segments(rfm):
+    """
+    Segmentation vectorisée des clients scorés (R_score, F_score, M_score)
+
+    Returns:
+        Series des segments, même index que `rfm`
+    """
+    scores = [rfm[col].astype(int).to_numpy() for col in ('R_score', 'F_score', 'M_score')]
+    shape = tuple(int(s.max()) + 1 if len(s) else 1 for s in scores)
+    table, labels = compiled_segment_table()
+    if any(size > compiled for size, compiled in zip(shape, table.shape)):
+        table, labels = build_segment_table(shape)
+    return pd.Series(labels[table[scores[0], scores[1], scores[2]]], index=rfm.index, name='Segment')
+
+def _snapshot_rfm(customers, last_purchase, frequency, monetary, snapshot_ns):
+    """Table RFM à une date à partir des agrégats courants"""
+    active = frequency > 0
+    return pd.DataFrame({
+        'Récence': (snapshot_ns - last_purchase[active]) // NS_PER_DAY,
+        'Fréquence': frequency[active],
+        'Montant': monetary[active]
+    }, index=pd.Index(customers[active], name='CustomerID'))
+
+def compute_segment_snapshots(df, freq='QE'):
+    """
+    Tables RFM segmentées à chaque fin de période
+
+    Les transactions sont triées une seule fois ; les agrégats par client
+    (dernier achat, factures distinctes, montant cumulé) sont mis à jour
+    avec les seules lignes de chaque nouvelle période. Chaque snapshot ne
+    voit que les transactions antérieures à sa date de référence.
+    Les résultats sont mis en cache par contenu de `df` et fréquence.
+
+    Args:
+        df: DataFrame des transactions nettoyées
+        freq: fréquence pandas des snapshots ('QE', 'ME', 'W'...)
+
+    Returns:
+        dict {période 'YYYY-MM-DD': DataFrame RFM scoré avec Segment}
+        (tables partagées par le cache, à ne pas modifier)
+    """
+    key = (dataset_fingerprint(df, ['CustomerID', 'InvoiceNo', 'InvoiceDate', 'TotalPrice']), freq)
+    if key in _SNAPSHOT_CACHE:
+        _SNAPSHOT_CACHE.move_to_end(key)
+        return _SNAPSHOT_CACHE[key]
+
+    df = df[df['CustomerID'].notna()]
+    dates = df['InvoiceDate'].to_numpy(dtype='datetime64[ns]').view('int64')
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    customer_codes, customers = pd.factorize(df['CustomerID'].to_numpy()[order], sort=True)
+    invoice_codes, invoices = pd.factorize(df['InvoiceNo'].to_numpy()[order])
+    prices = df['TotalPrice'].to_numpy()[order]
+
+    # Première apparition de chaque couple (client, facture) dans l'ordre du temps
+    pair_keys = customer_codes.astype(np.int64) * len(invoices) + invoice_codes
+    first_pair = ~pd.Series(pair_keys).duplicated().to_numpy()
+
+    n_customers = len(customers)
+    last_purchase = np.full(n_customers, np.iinfo(np.int64).min, dtype=np.int64)
+    frequency = np.zeros(n_customers, dtype=np.int64)
+    monetary = np.zeros(n_customers, dtype=np.float64)
+
+    snapshots = {}
+    start = 0
+    periods = pd.date_range(df['InvoiceDate'].min(), df['InvoiceDate'].max(), freq=freq)
+    for period_end in periods:
+        snapshot = period_end.normalize() + timedelta(days=1)
+        end = int(np.searchsorted(dates, snapshot.value, side='left'))
+
+        codes = customer_codes[start:end]
+        np.maximum.at(last_purchase, codes, dates[start:end])
+        frequency += np.bincount(codes[first_pair[start:end]], minlength=n_customers)
+        monetary += np.bincount(codes, weights=prices[start:end], minlength=n_customers)
+        start = end
+
+        rfm_q = _snapshot_rfm(customers, last_purchase, frequency, monetary, snapshot.value)
+        if rfm_q.empty:
+            continue
+        try:
             rfm_q = score_rfm(rfm_q)
-            rfm_q['Segment'] = rfm_q.apply(
-                lambda row: map_rfm_to_segment(int(row['R_score']), int(row['F_score']), int(row['M_score'])), 
-                axis=1
-            )
-            segments_dict[q.strftime('%Y-%m')] = rfm_q['Segment'].value_counts()
-    
-    return pd.DataFrame(segments_dict).T.fillna(0)
\ No newline at end of file
+        except ValueError:
+            # Trop peu de clients pour des quantiles distincts
+            continue
+        rfm_q['Segment'] = assign_segments(rfm_q)
+        snapshots[period_end.strftime('%Y-%m-%d')] = rfm_q
+
+    _SNAPSHOT_CACHE[key] = snapshots
+    while len(_SNAPSHOT_CACHE) > SNAPSHOT_CACHE_SIZE:
+        _SNAPSHOT_CACHE.popitem(last=False)
+    return snapshots
+
+@profiled()
+def compute_segment_evolution(df, freq='QE'):
+    """Évolution des segments dans le temps"""
+    snapshots = compute_segment_snapshots(df, freq)
+    segments_dict = {
+        pd.Timestamp(period).strftime('%Y-%m'): rfm_q['Segment'].value_counts()
+        for period, rfm_q in snapshots.items()
+    }
+    return pd.DataFrame(segments_dict).T.fillna(0)
@@ -0,0 +1,71 @@
+"""
+Module d'index des règles d'association
+Règles compilées : index inversé produit -> règles et antécédents en masques de bits
+"""
+import numpy as np
+import pandas as pd
+from src.profiling import profiled
+
+RULE_COLUMNS = ['antecedents', 'consequents', 'lift', 'confidence']
+
+
+@profiled()
+def build_rule_index(rules):
+    """
+    Compilation des règles d'association
+
+    Chaque produit présent dans un antécédent reçoit un bit ; l'antécédent
+    d'une règle devient un entier (OU des bits de ses produits). L'index
+    inversé associe à chaque produit les règles dont l'antécédent le contient.
+
+    Args:
+        rules: DataFrame (antecedents, consequents, lift, confidence)
+
+    Returns:
+        dict: bits, masks, postings, consequents, lift, confidence
+    """
+    if rules.empty:
+        rules = pd.DataFrame(columns=RULE_COLUMNS)
+
+    bits = {}
+    masks = []
+    postings = {}
+    for rule_id, antecedents in enumerate(rules['antecedents']):
+        mask = 0
+        for product in antecedents:
+            bit = bits.setdefault(product, len(bits))
+            mask |= 1 << bit
+            postings.setdefault(product, []).append(rule_id)
+        masks.append(mask)
+
+    return {
+        'bits': bits,
+        'masks': masks,
+        'postings': {product: np.array(ids, dtype=np.int64) for product, ids in postings.items()},
+        'consequents': [tuple(sorted(items)) for items in rules['consequents']],
+        'lift': rules['lift'].to_numpy(dtype=float),
+        'confidence': rules['confidence'].to_numpy(dtype=float)
+    }
+
+
+def match_rules(index, history):
+    """
+    Règles dont l'antécédent est inclus dans l'historique, dans l'ordre des règles
+
+    Seules les règles atteintes par un produit de l'historique sont testées :
+    le coût dépend de la taille de l'historique, pas du nombre de règles.
+    """
+    history_mask = 0
+    reachable = []
+    for product in history:
+        bit = index['bits'].get(product)
+        if bit is not None:
+            history_mask |= 1 << bit
+            reachable.append(index['postings'][product])
+    if not reachable:
+        return np.empty(0, dtype=np.int64)
+
+    masks = index['masks']
+    candidates = np.unique(np.concatenate(reachable))
+    return np.array([rule_id for rule_id in candidates
+                     if masks[rule_id] & history_mask == masks[rule_id]], dtype=np.int64)
@@ -0,0 +1,190 @@
+"""
+Module d'acquisition des sources brutes
+Cache local adressé par contenu, conversion Excel -> Parquet et source synthétique hors ligne
+"""
+import hashlib
+import json
+import os
+import shutil
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+import pandas as pd
+from src.cache import PROJECT_DIR
+from src.config import get_settings
+from src.synthetic import generate_transactions
+
+SYNTHETIC_SCHEME = 'synthetic://'
+INDEX_NAME = 'index.json'
+# Codes mixtes entiers/chaînes dans l'export Excel : stockés en chaînes pour Parquet
+TEXT_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Country']
+_CHUNK = 1 << 20
+
+
+def raw_cache_dir(settings=None):
+    """Répertoire du cache des sources brutes (relatif au projet), None si désactivé"""
+    cache_dir = (settings or get_settings()).data.raw_cache_dir
+    if not cache_dir:
+        return None
+    return cache_dir if os.path.isabs(cache_dir) else os.path.join(PROJECT_DIR, cache_dir)
+
+
+def is_remote(source):
+    return str(source).startswith(('http://', 'https://'))
+
+
+def is_synthetic(source):
+    return str(source).startswith(SYNTHETIC_SCHEME)
+
+
+def _extension(source):
+    """Extension du fichier (sans paramètres d'URL), '.xlsx' par défaut"""
+    ext = os.path.splitext(str(source).split('?', 1)[0])[1].lower()
+    return ext or '.xlsx'
+
+
+def file_digest(path):
+    """SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(_CHUNK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, INDEX_NAME), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_index(cache_dir, index):
+    """Écriture atomique de l'index URL -> contenu"""
+    tmp_path = os.path.join(cache_dir, INDEX_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(index, file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(cache_dir, INDEX_NAME))
+
+
+def _object_path(cache_dir, digest, ext):
+    return os.path.join(cache_dir, 'objects', f"{digest}{ext}")
+
+
+def fetch_source(source, refresh=False):
+    """
+    Copie locale d'une source distante, adressée par son contenu
+
+    Le premier appel télécharge le fichier dans objects/<sha256><ext> et
+    l'associe à l'URL dans index.json ; les suivants le relisent sans
+    réseau. Avec `refresh`, le serveur est interrogé (ETag /
+    Last-Modified) et le fichier n'est retéléchargé que s'il a changé.
+
+    Raises:
+        ConnectionError: hors ligne (data.offline) et URL absente du cache
+    """
+    settings = get_settings()
+    cache_dir = raw_cache_dir(settings)
+    if cache_dir is None:
+        raise ValueError("Cache des sources désactivé (data.raw_cache_dir)")
+    os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+    index = _read_index(cache_dir)
+    entry = index.get(source)
+    ext = _extension(source)
+    cached = entry is not None and os.path.exists(_object_path(cache_dir, entry['sha256'], ext))
+
+    if cached and not refresh:
+        return _object_path(cache_dir, entry['sha256'], ext)
+    if settings.data.offline:
+        if cached:
+            return _object_path(cache_dir, entry['sha256'], ext)
+        raise ConnectionError(f"Source absente du cache local en mode hors ligne : {source}")
+
+    request = urllib.request.Request(source)
+    if cached:
+        if entry.get('etag'):
+            request.add_header('If-None-Match', entry['etag'])
+        if entry.get('last_modified'):
+            request.add_header('If-Modified-Since', entry['last_modified'])
+
+    tmp_path = os.path.join(cache_dir, 'objects', f".download.{os.getpid()}.tmp")
+    digest = hashlib.sha256()
+    try:
+        with urllib.request.urlopen(request, timeout=120) as response, open(tmp_path, 'wb') as file:
+            for block in iter(lambda: response.read(_CHUNK), b''):
+                digest.update(block)
+                file.write(block)
+            headers = response.headers
+    except urllib.error.HTTPError as error:
+        if error.code == 304 and cached:
+            return _object_path(cache_dir, entry['sha256'], ext)
+        raise
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    path = _object_path(cache_dir, digest.hexdigest(), ext)
+    os.replace(tmp_path, path)
+    index[source] = {
+        'sha256': digest.hexdigest(),
+        'ext': ext,
+        'size': os.path.getsize(path),
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'fetched_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    _write_index(cache_dir, index)
+    return path
+
+
+def _to_parquet(path, target):
+    """Conversion unique d'un classeur Excel en Parquet (lecture openpyxl lente)"""
+    df = pd.read_excel(path)
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).where(df[col].notna())
+    tmp_path = f"{target}.{os.getpid()}.tmp"
+    df.to_parquet(tmp_path, index=False, compression='zstd')
+    os.replace(tmp_path, target)
+
+
+def local_source(source, refresh=False):
+    """
+    Fichier local rapide à lire pour une source
+
+    URL : copie locale (fetch_source). Classeur Excel, distant ou local :
+    converti une fois en Parquet, sous l'empreinte de son contenu, puis
+    relu en Parquet. CSV / Parquet locaux : inchangés.
+    """
+    cache_dir = raw_cache_dir()
+    if cache_dir is None:
+        return source
+    path = fetch_source(source, refresh=refresh) if is_remote(source) else source
+    if _extension(path) not in ('.xlsx', '.xls'):
+        return path
+
+    digest = os.path.splitext(os.path.basename(path))[0] if is_remote(source) else file_digest(path)
+    target = os.path.join(cache_dir, 'converted', f"{digest}.parquet")
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _to_parquet(path, target)
+    return target
+
+
+def synthetic_source(source):
+    """Transactions synthétiques pour une source 'synthetic://<lignes>[?seed=<graine>&affinity=<part>]'"""
+    spec = source[len(SYNTHETIC_SCHEME):]
+    rows, _, query = spec.partition('?')
+    params = dict(part.split('=', 1) for part in query.split('&') if '=' in part)
+    return generate_transactions(int(rows or 540_000), seed=int(params.get('seed', 42)),
+                                 affinity=float(params.get('affinity', 0.3)))
+
+
+def clear_raw_cache():
+    """Suppression des copies locales et des conversions"""
+    cache_dir = raw_cache_dir()
+    if cache_dir is not None and os.path.isdir(cache_dir):
+        shutil.rmtree(cache_dir)
@@ -0,0 +1,141 @@
+"""
+Module de mémoïsation des étapes du pipeline
+Résultats d'étape persistés sur disque sous une clé dérivée des entrées, de la configuration et du code
+"""
+import dataclasses
+import hashlib
+import importlib
+import json
+import os
+import pickle
+import sys
+
+from src.cache import PROJECT_DIR
+from src.config import get_settings
+
+_module_digests = {}
+
+
+def stage_cache_dir(settings=None):
+    """Répertoire du cache d'étapes (relatif au projet), None si désactivé"""
+    stage_dir = (settings or get_settings()).cache.stage_dir
+    if not stage_dir:
+        return None
+    return stage_dir if os.path.isabs(stage_dir) else os.path.join(PROJECT_DIR, stage_dir)
+
+
+def source_fingerprint(source):
+    """
+    Empreinte d'une source brute sans la lire
+
+    Fichier local : chemin, taille et date de modification ; URL : l'URL
+    elle-même (le contenu distant n'est pas vérifié).
+    """
+    if os.path.exists(source):
+        stat = os.stat(source)
+        return f"{os.path.abspath(source)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return source
+
+
+def _module_digest(module_name):
+    """Empreinte du code source d'un module (version du code d'une étape)"""
+    digest = _module_digests.get(module_name)
+    if digest is None:
+        module = sys.modules.get(module_name) or importlib.import_module(module_name)
+        with open(module.__file__, 'rb') as file:
+            digest = hashlib.sha1(file.read()).hexdigest()
+        _module_digests[module_name] = digest
+    return digest
+
+
+def stage_key(name, inputs=(), config=None, modules=()):
+    """
+    Clé d'une étape
+
+    Args:
+        name: nom de l'étape
+        inputs: clés des étapes amont ou empreintes des sources
+        config: paramètres de l'étape (dataclass de configuration ou dict)
+        modules: modules dont le code détermine le résultat
+    """
+    if dataclasses.is_dataclass(config):
+        config = dataclasses.asdict(config)
+    digest = hashlib.sha1(name.encode())
+    for key in inputs:
+        digest.update(f"|{key}".encode())
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    for module_name in modules:
+        digest.update(f"|{module_name}:{_module_digest(module_name)}".encode())
+    return digest.hexdigest()
+
+
+def _evict(cache_dir, max_bytes, keep):
+    """Suppression des entrées les moins récemment utilisées au-delà de max_bytes"""
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if filename.endswith('.pkl'):
+            stat = os.stat(os.path.join(cache_dir, filename))
+            entries.append((stat.st_mtime_ns, stat.st_size, filename))
+    total = sum(size for _, size, _ in entries)
+    for _, size, filename in sorted(entries):
+        if total <= max_bytes:
+            break
+        if filename == keep:
+            continue
+        try:
+            os.remove(os.path.join(cache_dir, filename))
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def run_stage(name, compute, inputs=(), config=None, modules=(), refresh=False):
+    """
+    Exécution mémoïsée d'une étape
+
+    Le résultat est relu sur disque si la clé (entrées, configuration, code)
+    a déjà été calculée ; sinon il est calculé puis écrit, et le cache est
+    ramené sous cache.stage_max_mb en supprimant les entrées les moins
+    récemment utilisées.
+
+    Args:
+        compute: fonction sans argument calculant le résultat
+        refresh: recalculer même si la clé est en cache
+
+    Returns:
+        (résultat, clé de l'étape à passer aux étapes aval, lu en cache ?)
+    """
+    settings = get_settings()
+    key = stage_key(name, inputs, config, modules)
+    cache_dir = stage_cache_dir(settings)
+    if cache_dir is None:
+        return compute(), key, False
+
+    filename = f"{name}-{key[:20]}.pkl"
+    path = os.path.join(cache_dir, filename)
+    if not refresh:
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+            os.utime(path)  # date d'accès pour l'éviction LRU
+            return value, key, True
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+
+    value = compute()
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = os.path.join(cache_dir, f".{filename}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as file:
+        pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    _evict(cache_dir, settings.cache.stage_max_mb * 1024 ** 2, keep=filename)
+    return value, key, False
+
+
+def clear_stage_cache():
+    """Vidage du cache d'étapes"""
+    cache_dir = stage_cache_dir()
+    if cache_dir is not None and os.path.isdir(cache_dir):
+        for filename in os.listdir(cache_dir):
+            if filename.endswith('.pkl'):
+                os.remove(os.path.join(cache_dir, filename))
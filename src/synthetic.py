@@ -0,0 +1,108 @@
+"""
+Module de génération de données synthétiques
+Transactions au format Online Retail (UCI) pour benchmarks et exécution hors ligne
+"""
+import numpy as np
+import pandas as pd
+
+RAW_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity',
+               'InvoiceDate', 'UnitPrice', 'CustomerID', 'Country']
+
+_ADJECTIVES = ['WHITE', 'RED', 'PINK', 'BLUE', 'VINTAGE', 'REGENCY', 'RETROSPOT',
+               'HEART', 'PAISLEY', 'JUMBO', 'LUNCH', 'SET OF 3', 'HANGING', 'WOODEN']
+_NOUNS = ['T-LIGHT HOLDER', 'LANTERN', 'BAG', 'CAKESTAND', 'MUG', 'TEACUP',
+          'BOX', 'CANDLE', 'SIGN', 'CUSHION COVER', 'BUNTING', 'ALARM CLOCK',
+          'DOORMAT', 'JAR', 'NAPKINS', 'PLATE']
+_COUNTRIES = ['United Kingdom', 'Germany', 'France', 'EIRE', 'Spain',
+              'Netherlands', 'Belgium', 'Switzerland', 'Portugal', 'Australia']
+_COUNTRY_WEIGHTS = [0.89, 0.025, 0.02, 0.018, 0.01, 0.01, 0.008, 0.007, 0.006, 0.006]
+
+
+def generate_transactions(n_rows=100_000, seed=42, n_products=None, n_customers=None,
+                          start='2010-12-01', end='2011-12-09', affinity=0.0, theme_size=20):
+    """
+    Génération de transactions brutes au format Online Retail
+
+    Les distributions reproduisent la forme du jeu UCI : popularité produit
+    de type Zipf, taille de panier géométrique, activité client de type Pareto,
+    ~25% de CustomerID manquants, ~2% d'annulations et ~1% de doublons.
+
+    Args:
+        affinity: part des lignes tirées dans le thème de la facture (achats
+            conjoints, donc règles d'association) ; 0 = produits indépendants
+        theme_size: nombre moyen de produits par thème
+
+    Returns:
+        DataFrame avec les colonnes brutes (RAW_COLUMNS)
+    """
+    rng = np.random.default_rng(seed)
+    if n_products is None:
+        n_products = int(min(4000, max(50, n_rows // 100)))
+    if n_customers is None:
+        n_customers = int(min(200_000, max(20, n_rows // 100)))
+
+    # Catalogue produits : popularité Zipf et prix log-normaux
+    ranks = np.arange(1, n_products + 1)
+    popularity = 1.0 / ranks ** 0.5
+    popularity /= popularity.sum()
+    stock_codes = np.array([f"{20000 + i}" for i in range(n_products)], dtype=object)
+    descriptions = np.array([
+        f"{_ADJECTIVES[i % len(_ADJECTIVES)]} {_NOUNS[(i // len(_ADJECTIVES)) % len(_NOUNS)]} {i}"
+        for i in range(n_products)
+    ], dtype=object)
+    unit_prices = np.round(rng.lognormal(mean=1.0, sigma=0.8, size=n_products), 2) + 0.1
+
+    # Clients : activité de type Pareto et pays fixe par client
+    activity = rng.pareto(1.5, size=n_customers) + 1
+    activity /= activity.sum()
+    customer_ids = np.arange(12346, 12346 + n_customers, dtype=float)
+    customer_countries = rng.choice(len(_COUNTRIES), size=n_customers, p=_COUNTRY_WEIGHTS)
+
+    # Factures : taille de panier géométrique (moyenne ~20 lignes)
+    basket_sizes = rng.geometric(1 / 20, size=n_rows // 10 + 1)
+    cumulative = np.cumsum(basket_sizes)
+    n_invoices = int(np.searchsorted(cumulative, n_rows) + 1)
+    basket_sizes = basket_sizes[:n_invoices]
+    basket_sizes[-1] -= cumulative[n_invoices - 1] - n_rows
+
+    start_ts = pd.Timestamp(start).value
+    span = pd.Timestamp(end).value - start_ts
+    invoice_dates = np.sort(start_ts + (rng.random(n_invoices) * span).astype(np.int64))
+    invoice_customers = rng.choice(n_customers, size=n_invoices, p=activity)
+    cancelled = rng.random(n_invoices) < 0.02
+    invoice_numbers = np.array([f"{536365 + i}" for i in range(n_invoices)], dtype=object)
+    invoice_numbers[cancelled] = 'C' + invoice_numbers[cancelled]
+
+    # Lignes de facture
+    row_invoice = np.repeat(np.arange(n_invoices), basket_sizes)
+    row_product = rng.choice(n_products, size=n_rows, p=popularity)
+    if affinity > 0:
+        # Thème t = produits t, t + n_themes, ... (têtes et queues de catalogue mêlées)
+        n_themes = max(1, n_products // theme_size)
+        row_theme = rng.integers(0, n_themes, size=n_invoices)[row_invoice]
+        themed = rng.random(n_rows) < affinity
+        members = (n_products - row_theme[themed] + n_themes - 1) // n_themes
+        row_product[themed] = row_theme[themed] + n_themes * (rng.random(themed.sum()) * members).astype(np.int64)
+    quantity = rng.geometric(0.15, size=n_rows)
+    quantity[cancelled[row_invoice]] *= -1
+
+    row_customer = invoice_customers[row_invoice]
+    customer_col = customer_ids[row_customer]
+    anonymous = rng.random(n_invoices) < 0.25
+    customer_col[anonymous[row_invoice]] = np.nan
+
+    df = pd.DataFrame({
+        'InvoiceNo': invoice_numbers[row_invoice],
+        'StockCode': stock_codes[row_product],
+        'Description': descriptions[row_product],
+        'Quantity': quantity,
+        'InvoiceDate': pd.to_datetime(invoice_dates[row_invoice]).floor('min'),
+        'UnitPrice': unit_prices[row_product],
+        'CustomerID': customer_col,
+        'Country': np.array(_COUNTRIES, dtype=object)[customer_countries[row_customer]],
+    })
+
+    # Doublons exacts (~1%) comme dans l'export source
+    duplicates = df.sample(frac=0.01, random_state=seed)
+    df = pd.concat([df, duplicates]).sort_index(kind='stable').reset_index(drop=True)
+    return df.head(n_rows)
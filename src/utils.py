@@ -2,14 +2,14 @@
 Module utilitaire
 Fonctions helpers communes
 """
-import pandas as pd
-import yaml
-def load_config():
-    """Chargement de la configuration YAML"""
-    with open('config/config.yaml', 'r') as file:
-        return yaml.safe_load(file)
+import hashlib
+import weakref
 
+import pandas as pd
+from src.config import load_config
 
+# id(DataFrame), colonnes -> (référence faible, empreinte)
+_FINGERPRINTS = {}
 
 def format_currency(value):
     """Formatage des montants en £"""
@@ -20,4 +20,33 @@ def safe_qcut(series, q, labels):
     try:
         return pd.qcut(series, q, labels=labels, duplicates='drop')
     except ValueError:
-        return pd.Series([labels[0]] * len(series))
\ No newline at end of file
+        return pd.Series([labels[0]] * len(series))
+
+def dataset_fingerprint(df, columns=None):
+    """
+    Empreinte du contenu d'un DataFrame (clé de cache)
+
+    Hachage vectorisé des valeurs : toute modification des lignes ou des
+    colonnes retenues change l'empreinte.
+    """
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    digest = hashlib.sha1(str(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def cached_fingerprint(df, columns=None):
+    """
+    dataset_fingerprint mémorisée par objet DataFrame
+
+    Calculée une fois par table tant qu'elle est en mémoire : les tables
+    sont supposées non modifiées en place (une nouvelle table, même de
+    contenu différent, reçoit sa propre empreinte).
+    """
+    key = (id(df), tuple(columns) if columns is not None else None)
+    entry = _FINGERPRINTS.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    fingerprint = dataset_fingerprint(df, columns)
+    _FINGERPRINTS[key] = (weakref.ref(df, lambda _, key=key: _FINGERPRINTS.pop(key, None)), fingerprint)
+    return fingerprint
@@ -23,7 +23,7 @@ def create_rfm_pie(rfm):
 
 def create_segment_profiles(rfm):
     """Profils moyens par segment"""
-    profiles = rfm.groupby('Segment')[['Récence', 'Fréquence', 'Montant']].mean().round(2)
+    profiles = rfm.groupby('Segment', observed=True)[['Récence', 'Fréquence', 'Montant']].mean().round(2)
     st.dataframe(profiles, use_container_width=True)
 
 def create_monetary_box(rfm):
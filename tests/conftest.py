@@ -0,0 +1,48 @@
+"""
+Fixtures partagées : petit jeu synthétique au format Online Retail
+"""
+import os
+import sys
+import warnings
+
+import pytest
+from mlxtend.frequent_patterns import association_rules
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.basket_analysis import build_sparse_basket, mine_frequent_itemsets, rank_rules
+from src.data_preprocessing import add_features, clean_transactions
+from src.rfm_analysis import assign_segments, calculate_rfm, score_rfm
+from src.synthetic import generate_transactions
+
+
+@pytest.fixture(scope='session')
+def raw():
+    """Lignes brutes (annulations, clients anonymes, doublons exacts)"""
+    return generate_transactions(20_000, seed=0, affinity=0.3)
+
+
+@pytest.fixture(scope='session')
+def transactions(raw):
+    """Transactions nettoyées avec features (libellés en chaînes)"""
+    return add_features(clean_transactions(raw))
+
+
+@pytest.fixture(scope='session')
+def rfm_segments(transactions):
+    """Table RFM scorée avec segments"""
+    rfm = score_rfm(calculate_rfm(transactions))
+    rfm['Segment'] = assign_segments(rfm)
+    return rfm
+
+
+@pytest.fixture(scope='session')
+def rules(transactions):
+    """Règles d'association (support 0.02), les 100 de plus fort lift"""
+    basket, _, products = build_sparse_basket(transactions)
+    itemsets = mine_frequent_itemsets(basket, products, 0.02, 'fpgrowth')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        rules = association_rules(itemsets, metric='lift', min_threshold=1.0)
+    # Peu de règles : chaque client reçoit aussi des produits similaires et de son segment
+    return rank_rules(rules).head(100).reset_index(drop=True)
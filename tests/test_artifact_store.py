@@ -0,0 +1,60 @@
+"""
+Tests du store d'artefacts Parquet : aller-retour, projection, ajouts
+"""
+import pandas as pd
+import pytest
+
+from src.artifact_store import (append_artifact, dataset_version, read_artifact, read_manifest,
+                                store_exists, write_artifact, write_artifacts)
+
+
+def test_round_trip_keeps_values_and_types(transactions, rfm_segments, tmp_path):
+    rules = pd.DataFrame({
+        'antecedents': [frozenset({'A'}), frozenset({'A', 'B'})],
+        'consequents': [frozenset({'C'}), frozenset({'D'})],
+        'lift': [2.5, 1.5],
+    })
+    write_artifacts(str(tmp_path), transactions, rfm_segments, rules)
+    assert store_exists(str(tmp_path))
+
+    stored = read_artifact(str(tmp_path), 'transactions')
+    assert isinstance(stored['Description'].dtype, pd.CategoricalDtype)
+    assert isinstance(stored['Country'].dtype, pd.CategoricalDtype)
+    assert len(stored) == len(transactions)
+    pd.testing.assert_series_equal(stored['Description'].astype(str),
+                                   transactions['Description'].astype(str), check_index=False)
+    assert stored['TotalPrice'].sum() == pytest.approx(transactions['TotalPrice'].sum())
+
+    rfm = read_artifact(str(tmp_path), 'rfm_segments')
+    assert rfm.index.tolist() == rfm_segments.index.tolist()
+    assert isinstance(rfm['Segment'].dtype, pd.CategoricalDtype)
+    assert rfm['Segment'].astype(str).tolist() == rfm_segments['Segment'].astype(str).tolist()
+
+    # Les itemsets sont restitués en frozensets
+    pd.testing.assert_frame_equal(read_artifact(str(tmp_path), 'association_rules'), rules)
+
+
+def test_projection_loads_only_requested_columns(transactions, tmp_path):
+    write_artifact(str(tmp_path), 'transactions', transactions)
+    stored = read_artifact(str(tmp_path), 'transactions', columns=['CustomerID', 'TotalPrice'])
+    assert list(stored.columns) == ['CustomerID', 'TotalPrice']
+    assert len(stored) == len(transactions)
+
+
+def test_append_adds_part_and_changes_version(transactions, tmp_path):
+    first, second = transactions.iloc[:1000], transactions.iloc[1000:1500]
+    write_artifact(str(tmp_path), 'transactions', first)
+    version = dataset_version(str(tmp_path), names=('transactions',))
+
+    append_artifact(str(tmp_path), 'transactions', second)
+    manifest = read_manifest(str(tmp_path))
+    assert len(manifest['artifacts']['transactions']['files']) == 2
+    assert manifest['artifacts']['transactions']['rows'] == 1500
+    assert len(read_artifact(str(tmp_path), 'transactions')) == 1500
+    assert dataset_version(str(tmp_path), names=('transactions',)) != version
+
+
+def test_append_rejects_other_schema(transactions, tmp_path):
+    write_artifact(str(tmp_path), 'transactions', transactions.iloc[:100])
+    with pytest.raises(ValueError):
+        append_artifact(str(tmp_path), 'transactions', transactions.iloc[100:200].drop(columns='Country'))
@@ -0,0 +1,49 @@
+"""
+Tests du minage des itemsets : FP-Growth, ECLAT et SON contre mlxtend apriori
+"""
+import warnings
+
+import pytest
+from mlxtend.frequent_patterns import apriori
+
+from src.basket_analysis import (basket_to_frame, build_sparse_basket, mine_frequent_itemsets,
+                                 mine_frequent_itemsets_partitioned)
+
+MIN_SUPPORT = 0.02
+
+
+def _supports(itemsets):
+    return {frozenset(items): round(float(support), 9)
+            for items, support in zip(itemsets['itemsets'], itemsets['support'])}
+
+
+@pytest.fixture(scope='module')
+def basket(transactions):
+    basket, _, products = build_sparse_basket(transactions)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        reference = apriori(basket_to_frame(basket, products), min_support=MIN_SUPPORT,
+                            use_colnames=True)
+    assert len(reference) > 0
+    return basket, products, _supports(reference)
+
+
+@pytest.mark.parametrize('algorithm', ['apriori', 'fpgrowth', 'eclat'])
+def test_single_process_mining_matches_mlxtend(basket, algorithm):
+    matrix, products, expected = basket
+    itemsets = mine_frequent_itemsets(matrix, products, MIN_SUPPORT, algorithm)
+    assert _supports(itemsets) == expected
+
+
+@pytest.mark.parametrize('algorithm', ['fpgrowth', 'eclat'])
+def test_partitioned_mining_matches_mlxtend(basket, algorithm):
+    matrix, products, expected = basket
+    itemsets = mine_frequent_itemsets_partitioned(matrix, products, MIN_SUPPORT, algorithm,
+                                                  partitions=3, n_jobs=2)
+    assert _supports(itemsets) == expected
+
+
+def test_unknown_algorithm_raises(basket):
+    matrix, products, _ = basket
+    with pytest.raises(ValueError):
+        mine_frequent_itemsets(matrix, products, MIN_SUPPORT, 'fp-max')
@@ -0,0 +1,52 @@
+"""
+Tests des recommandations par lots contre get_customer_recommendations
+"""
+import numpy as np
+import pytest
+
+from src.batch_recommendations import get_batch_recommendations, iter_batch_recommendations
+from src.item_similarity import build_item_similarity
+from src.recommendations import build_segment_popularity, get_customer_recommendations
+
+
+def _single(row):
+    return (row['produit'], row['lift'], row['source'])
+
+
+def _batch(row):
+    lift = None if np.isnan(row.lift) else row.lift
+    return (row.produit, lift, row.source)
+
+
+def _assert_matches_single(transactions, rfm_segments, rules, **kwargs):
+    popularity = build_segment_popularity(transactions, rfm_segments)
+    customers = rfm_segments.index[::max(1, len(rfm_segments) // 60)]
+
+    batch = get_batch_recommendations(transactions, rfm_segments, rules, customer_ids=customers,
+                                      top_n=10, segment_popularity=popularity, **kwargs)
+    by_customer = {customer: group.sort_values('rang')
+                   for customer, group in batch.groupby('CustomerID')}
+
+    for customer in customers:
+        expected = get_customer_recommendations(transactions, rfm_segments, rules, customer,
+                                                segment_popularity=popularity,
+                                                **kwargs)['recommendations']
+        group = by_customer.get(customer)
+        actual = [] if group is None else [_batch(row) for row in group.itertuples()]
+        assert actual == [_single(row) for row in expected], customer
+
+
+@pytest.mark.parametrize('with_similarity', [False, True])
+def test_batch_matches_single_customer(transactions, rfm_segments, rules, with_similarity):
+    similarity = build_item_similarity(transactions) if with_similarity else None
+    _assert_matches_single(transactions, rfm_segments, rules, item_similarity=similarity)
+
+
+def test_chunks_cover_every_customer_once(transactions, rfm_segments, rules):
+    chunks = list(iter_batch_recommendations(transactions, rfm_segments, rules,
+                                             top_n=5, chunk_size=len(rfm_segments) // 3))
+    assert len(chunks) > 1
+    customers = np.concatenate([chunk['CustomerID'].unique() for chunk in chunks])
+    assert len(customers) == len(set(customers))
+    assert set(customers) <= set(rfm_segments.index)
+    assert all(chunk.groupby('CustomerID')['rang'].max().le(5).all() for chunk in chunks)
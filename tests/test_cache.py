@@ -0,0 +1,76 @@
+"""
+Tests du cache des résultats dérivés par version des données
+"""
+import pytest
+
+from src.cache import clear_cache, get_or_compute
+from src.config import DEFAULT_CONFIG_PATH, get_settings
+
+
+class Counter:
+    """Calcul factice qui compte ses appels"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_cache()
+    yield
+    clear_cache()
+
+
+def test_result_is_reused_for_same_version():
+    compute = Counter()
+    assert get_or_compute('metriques', 'v1', compute) == 1
+    assert get_or_compute('metriques', 'v1', compute) == 1
+    assert compute.calls == 1
+
+
+def test_new_version_invalidates_result():
+    compute = Counter()
+    get_or_compute('metriques', 'v1', compute)
+    assert get_or_compute('metriques', 'v2', compute) == 2
+    assert compute.calls == 2
+
+
+def test_params_distinguish_results():
+    assert get_or_compute('segment', 'v1', lambda: 'a', params=('Champions',)) == 'a'
+    assert get_or_compute('segment', 'v1', lambda: 'b', params=('Hibernants',)) == 'b'
+    assert get_or_compute('segment', 'v1', lambda: 'c', params=('Champions',)) == 'a'
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    """Configuration avec niveau disque dans un répertoire temporaire"""
+    path = tmp_path / 'config.yaml'
+    text = open(DEFAULT_CONFIG_PATH, encoding='utf-8').read()
+    path.write_text(text.replace('disk_dir: null', f'disk_dir: "{tmp_path / "cache"}"'), encoding='utf-8')
+    monkeypatch.setenv('SEGMENTATION_CONFIG', str(path))
+    return tmp_path / 'cache'
+
+
+def test_lru_evicts_oldest_entries():
+    max_entries = get_settings().cache.max_entries
+    for i in range(max_entries + 1):
+        get_or_compute('client', 'v1', lambda i=i: i, params=(i,))
+    compute = Counter()
+    assert get_or_compute('client', 'v1', compute, params=(0,)) == 1
+    assert get_or_compute('client', 'v1', compute, params=(max_entries,)) == max_entries
+    assert compute.calls == 1
+
+
+def test_disk_tier_survives_memory_clear_and_drops_old_versions(disk_cache):
+    compute = Counter()
+    get_or_compute('metriques', 'v1' * 8, compute)
+    clear_cache()
+    assert get_or_compute('metriques', 'v1' * 8, compute) == 1
+    assert compute.calls == 1
+
+    get_or_compute('metriques', 'v2' * 8, compute)
+    assert len(list(disk_cache.glob('metriques-*.pkl'))) == 1
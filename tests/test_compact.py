@@ -0,0 +1,76 @@
+"""
+Tests de la représentation compacte : types, décodage, tables de codes partagées
+"""
+import numpy as np
+import pandas as pd
+
+from src.artifact_store import append_artifact, read_artifact, read_code_tables, write_artifact
+from src.compact import build_code_tables, compact_transactions, decode_labels, memory_report
+from src.item_similarity import build_item_similarity, similarity_from_frame, similarity_to_frame
+
+
+def test_compact_types_and_round_trip(transactions):
+    compacted = compact_transactions(transactions)
+    assert compacted['CustomerID'].dtype == np.int32
+    assert compacted['Quantity'].dtype == np.int32
+    assert compacted['TotalPrice'].dtype == np.float64
+    assert isinstance(compacted['Description'].dtype, pd.CategoricalDtype)
+    assert compact_transactions(compacted).dtypes.equals(compacted.dtypes)
+
+    decoded = decode_labels(compacted, ['Description', 'Country'])
+    assert decoded['Description'].tolist() == transactions['Description'].tolist()
+    assert memory_report(transactions, compacted).loc['Total', 'gain'] > 1
+
+
+def test_shared_tables_give_same_codes(transactions):
+    first, second = transactions.iloc[:5000], transactions.iloc[5000:]
+    tables = build_code_tables(first, second)
+    left, right = compact_transactions(first, tables), compact_transactions(second, tables)
+    assert left['Description'].cat.categories.equals(right['Description'].cat.categories)
+    # Concaténation sans repasser par les chaînes
+    assert isinstance(pd.concat([left, right])['Description'].dtype, pd.CategoricalDtype)
+
+    extended = build_code_tables(second, base=build_code_tables(first))
+    assert all(extended[col].equals(tables[col]) for col in tables)
+
+
+def test_store_tables_cover_appended_parts(transactions, tmp_path):
+    store = str(tmp_path)
+    first, second = transactions.iloc[:5000], transactions.iloc[5000:]
+    write_artifact(store, 'transactions', first)
+    append_artifact(store, 'transactions', second)
+
+    tables = read_code_tables(store)
+    expected = build_code_tables(transactions)
+    assert set(tables) == set(expected)
+    assert all(tables[col].equals(expected[col]) for col in expected)
+    assert list(read_code_tables(store, ['Country'])) == ['Country']
+
+    stored = read_artifact(store, 'transactions', columns=['InvoiceNo', 'Description'])
+    assert stored['Description'].cat.categories.equals(tables['Description'])
+    assert stored['InvoiceNo'].astype(str).tolist() == transactions['InvoiceNo'].astype(str).tolist()
+
+
+def test_similarity_shares_description_codes(transactions, tmp_path):
+    store = str(tmp_path)
+    write_artifact(store, 'transactions', transactions)
+    similarity = build_item_similarity(transactions, k=5)
+    write_artifact(store, 'item_similarity', similarity_to_frame(similarity))
+
+    frame = read_artifact(store, 'item_similarity')
+    descriptions = read_artifact(store, 'transactions', columns=['Description'])['Description']
+    assert frame['Voisin'].cat.categories.equals(descriptions.cat.categories)
+
+    # Reconstruction sur les codes identique à celle sur les libellés
+    from_codes = similarity_from_frame(frame)
+    from_labels = similarity_from_frame(frame.astype({'Description': object, 'Voisin': object}))
+    assert list(from_codes['products']) == list(from_labels['products'])
+    np.testing.assert_array_equal(from_codes['neighbors'], from_labels['neighbors'])
+    np.testing.assert_array_equal(from_codes['scores'], from_labels['scores'])
+
+
+def test_similarity_without_store_tables_keeps_own_codes(transactions, tmp_path):
+    frame = similarity_to_frame(build_item_similarity(transactions, k=3))
+    write_artifact(str(tmp_path), 'item_similarity', frame)
+    assert read_code_tables(str(tmp_path)) == {}
+    assert read_artifact(str(tmp_path), 'item_similarity')['Voisin'].tolist() == frame['Voisin'].tolist()
@@ -0,0 +1,45 @@
+"""
+Tests de la configuration typée : cache par processus et rechargement sur mtime
+"""
+import os
+import shutil
+
+import pytest
+
+from src.config import DEFAULT_CONFIG_PATH, get_settings
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / 'config.yaml'
+    shutil.copy(DEFAULT_CONFIG_PATH, path)
+    monkeypatch.setenv('SEGMENTATION_CONFIG', str(path))
+    return path
+
+
+def _rewrite(path, old, new):
+    """Modification du fichier avec une date de modification postérieure"""
+    stat = os.stat(path)
+    path.write_text(path.read_text(encoding='utf-8').replace(old, new), encoding='utf-8')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_settings_parsed_once_while_file_unchanged(config_file):
+    settings = get_settings()
+    assert get_settings() is settings
+    assert isinstance(settings.rfm.recency_quantiles, int)
+
+
+def test_settings_reloaded_when_mtime_changes(config_file):
+    before = get_settings()
+    _rewrite(config_file, 'min_quantity: 0', 'min_quantity: 3')
+    after = get_settings()
+    assert after is not before
+    assert after.data.min_quantity == 3
+    assert get_settings() is after
+
+
+def test_default_path_independent_of_working_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv('SEGMENTATION_CONFIG', raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert get_settings().path == DEFAULT_CONFIG_PATH
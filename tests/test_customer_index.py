@@ -0,0 +1,40 @@
+"""
+Tests de l'index client CSR contre les filtres par masque booléen
+"""
+import pandas as pd
+import pytest
+
+from src.compact import compact_transactions
+from src.customer_index import (build_customer_index, get_customer_products, get_customer_summary,
+                                get_customer_transactions)
+
+
+@pytest.fixture(scope='module')
+def index(transactions):
+    return build_customer_index(compact_transactions(transactions))
+
+
+def test_offsets_cover_every_transaction(index, transactions):
+    assert index['offsets'][0] == 0
+    assert index['offsets'][-1] == len(transactions)
+    assert (pd.Series(index['offsets']).diff().dropna() > 0).all()
+
+
+def test_lookups_match_boolean_masks(index, transactions):
+    for customer_id in transactions['CustomerID'].drop_duplicates().sample(25, random_state=0):
+        mask = transactions[transactions['CustomerID'] == customer_id]
+        history = get_customer_transactions(index, customer_id)
+        assert len(history) == len(mask)
+        # Tri stable : ordre d'origine conservé dans la tranche du client
+        assert list(history['InvoiceNo'].astype(str)) == list(mask['InvoiceNo'].astype(str))
+        assert list(get_customer_products(index, customer_id)) == list(mask['Description'].unique())
+        assert get_customer_summary(index, customer_id) == {
+            'nb_produits': mask['Description'].nunique(),
+            'nb_commandes': mask['InvoiceNo'].nunique()
+        }
+
+
+def test_unknown_customer_is_empty(index):
+    assert get_customer_transactions(index, -1).empty
+    assert len(get_customer_products(index, -1)) == 0
+    assert get_customer_summary(index, -1) == {'nb_produits': 0, 'nb_commandes': 0}
@@ -0,0 +1,101 @@
+"""
+Tests du préprocessing : ingestion incrémentale et nettoyage parallèle
+"""
+import pandas as pd
+
+import src.data_preprocessing as data_preprocessing
+from src.artifact_store import read_artifact
+from src.data_preprocessing import (add_features, clean_and_featurize_parallel, clean_transactions,
+                                    load_and_clean_data, partition_by_invoice, read_ingestion_state,
+                                    read_source_since)
+
+TEXT_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Country']
+
+
+def _canonical(df):
+    """Lignes dans un ordre et des types communs (compactées ou non)"""
+    out = pd.DataFrame({col: df[col].astype(str).to_numpy() for col in TEXT_COLUMNS})
+    out['Quantity'] = df['Quantity'].to_numpy(dtype='int64')
+    out['UnitPrice'] = df['UnitPrice'].to_numpy(dtype='float64').round(2)
+    out['CustomerID'] = df['CustomerID'].to_numpy(dtype='int64')
+    out['InvoiceDate'] = df['InvoiceDate'].to_numpy()
+    out['TotalPrice'] = df['TotalPrice'].to_numpy(dtype='float64').round(6)
+    return out.sort_values(list(out.columns)).reset_index(drop=True)
+
+
+def test_incremental_ingestion_matches_full_load(raw, tmp_path):
+    cut = raw['InvoiceDate'].quantile(0.6)
+    first, second = tmp_path / 'lot1.parquet', tmp_path / 'lot2.parquet'
+    full = tmp_path / 'complet.parquet'
+    raw[raw['InvoiceDate'] < cut].to_parquet(first)
+    # Le second lot recouvre le premier : les lignes déjà vues sont écartées
+    raw[raw['InvoiceDate'] >= raw['InvoiceDate'].quantile(0.5)].to_parquet(second)
+    raw.to_parquet(full)
+
+    store_dir = str(tmp_path / 'store')
+    load_and_clean_data(str(first), incremental=True, store_dir=store_dir)
+    load_and_clean_data(str(second), incremental=True, store_dir=store_dir)
+    # Un lot déjà ingéré n'ajoute rien
+    assert load_and_clean_data(str(second), incremental=True, store_dir=store_dir).empty
+
+    incremental = read_artifact(store_dir, 'transactions')
+    expected = load_and_clean_data(str(full))
+    pd.testing.assert_frame_equal(_canonical(incremental), _canonical(expected))
+
+
+def test_late_rows_are_deduplicated_not_dropped(raw, tmp_path):
+    cut = raw['InvoiceDate'].quantile(0.6)
+    # Avant-dernières factures du premier lot, livrées en retard avec le second
+    before_cut = raw[raw['InvoiceDate'] < cut].sort_values('InvoiceDate')
+    late_invoices = before_cut['InvoiceNo'].unique()[-4:-1]
+    is_late = raw['InvoiceNo'].isin(late_invoices)
+    first, second = tmp_path / 'lot1.parquet', tmp_path / 'lot2.parquet'
+    raw[(raw['InvoiceDate'] < cut) & ~is_late].to_parquet(first)
+    # Export cumulatif : historique complet, factures tardives comprises
+    raw.to_parquet(second)
+
+    store_dir = str(tmp_path / 'store')
+    load_and_clean_data(str(first), incremental=True, store_dir=store_dir)
+    watermark = pd.Timestamp(read_ingestion_state(store_dir)['watermark']['InvoiceDate'])
+    batch = load_and_clean_data(str(second), incremental=True, store_dir=store_dir)
+
+    late = batch[batch['InvoiceDate'] < watermark]
+    assert len(late) > 0
+    assert set(late['InvoiceNo'].astype(str)) <= set(late_invoices)
+    assert read_ingestion_state(store_dir)['late_rows'] == len(late)
+    # Le lot tardif ne fait pas reculer le filigrane
+    assert pd.Timestamp(read_ingestion_state(store_dir)['watermark']['InvoiceDate']) >= watermark
+
+    stored = read_artifact(store_dir, 'transactions')
+    expected = load_and_clean_data(str(second))
+    pd.testing.assert_frame_equal(_canonical(stored), _canonical(expected))
+
+
+def test_read_source_since_filters_parquet_and_csv(raw, tmp_path):
+    since = raw['InvoiceDate'].quantile(0.8)
+    expected = int((raw['InvoiceDate'] >= since).sum())
+
+    raw.to_parquet(tmp_path / 'source.parquet')
+    from_parquet = read_source_since(str(tmp_path / 'source.parquet'), since)
+    assert len(from_parquet) == expected
+    assert from_parquet['InvoiceDate'].min() >= since
+
+    raw.to_csv(tmp_path / 'source.csv', index=False)
+    from_csv = read_source_since(str(tmp_path / 'source.csv'), since, chunksize=3_000)
+    assert len(from_csv) == expected
+    assert from_csv['InvoiceDate'].min() >= since
+
+
+def test_partition_by_invoice_keeps_invoices_together(raw):
+    parts = partition_by_invoice(raw, 4)
+    assert sum(len(part) for part in parts) == len(raw)
+    seen = [set(part['InvoiceNo']) for part in parts]
+    for i, invoices in enumerate(seen):
+        for other in seen[i + 1:]:
+            assert not invoices & other
+
+
+def test_parallel_cleaning_matches_serial(raw, monkeypatch):
+    monkeypatch.setattr(data_preprocessing, 'MIN_PARALLEL_ROWS', 0)
+    expected = add_features(clean_transactions(raw))
+    pd.testing.assert_frame_equal(clean_and_featurize_parallel(raw, n_jobs=3), expected)
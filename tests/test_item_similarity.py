@@ -0,0 +1,50 @@
+"""
+Tests de la similarité produit-produit top-K contre le calcul dense
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.item_similarity import (build_item_similarity, similar_products, similarity_from_frame,
+                                 similarity_to_frame)
+
+K = 5
+
+
+def _dense_similarity(transactions, metric):
+    purchases = pd.crosstab(transactions['CustomerID'], transactions['Description']).gt(0).astype(float)
+    values = purchases.to_numpy()
+    common = values.T @ values
+    buyers = values.sum(axis=0)
+    if metric == 'cosine':
+        similarity = common / np.sqrt(np.outer(buyers, buyers))
+    else:
+        similarity = common / (buyers[:, None] + buyers[None, :] - common)
+    np.fill_diagonal(similarity, 0)
+    return purchases.columns, similarity
+
+
+@pytest.mark.parametrize('metric', ['cosine', 'jaccard'])
+def test_top_k_matches_dense_similarity(transactions, metric):
+    similarity = build_item_similarity(transactions, k=K, metric=metric, block_size=64)
+    products, dense = _dense_similarity(transactions, metric)
+    assert list(similarity['products']) == list(products)
+    for i in range(len(products)):
+        expected = np.sort(dense[i])[::-1][:K]
+        expected = expected[expected > 0]
+        scores = similarity['scores'][i][similarity['neighbors'][i] >= 0]
+        np.testing.assert_allclose(scores, expected, rtol=1e-5)
+        np.testing.assert_allclose(dense[i, similarity['neighbors'][i][:len(scores)]], scores, rtol=1e-5)
+
+
+def test_unknown_metric_is_rejected(transactions):
+    with pytest.raises(ValueError):
+        build_item_similarity(transactions, metric='pearson')
+
+
+def test_frame_round_trip(transactions):
+    similarity = build_item_similarity(transactions, k=K)
+    restored = similarity_from_frame(similarity_to_frame(similarity))
+    history = list(similarity['products'][:3])
+    assert similar_products(restored, history) == similar_products(similarity, history)
+    assert all(product not in history for product, _ in similar_products(similarity, history))
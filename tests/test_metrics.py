@@ -0,0 +1,32 @@
+"""
+Tests des métriques : ventilation de tous les segments en un passage
+"""
+import pandas as pd
+import pytest
+
+from src.compact import compact_transactions
+from src.metrics import compute_all_segments_breakdown, compute_segment_metrics, get_all_segments_metrics
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_breakdown_matches_per_segment_loop(transactions, rfm_segments, compact):
+    df = compact_transactions(transactions) if compact else transactions
+    breakdown = compute_all_segments_breakdown(df, rfm_segments)
+    assert set(breakdown) == set(rfm_segments['Segment'].unique())
+
+    for segment, metrics in breakdown.items():
+        expected = compute_segment_metrics(df, rfm_segments, segment)
+        assert metrics['ca_total'] == pytest.approx(expected['ca_total'])
+        assert metrics['panier_moyen'] == pytest.approx(expected['panier_moyen'])
+        assert metrics['nb_commandes'] == expected['nb_commandes']
+        pd.testing.assert_series_equal(
+            metrics['top_items'].rename(index=str).sort_index(),
+            expected['top_items'].rename(index=str).sort_index(),
+            check_names=False, check_index_type=False, check_categorical=False)
+
+
+def test_segment_metrics_table_is_consistent(transactions, rfm_segments):
+    metrics = get_all_segments_metrics(transactions, rfm_segments)
+    assert metrics['Clients'].sum() == len(rfm_segments)
+    assert metrics['Part CA'].sum() == pytest.approx(100)
+    assert metrics['CA'].is_monotonic_decreasing
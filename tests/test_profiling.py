@@ -0,0 +1,50 @@
+"""
+Tests du profilage : mesures bornées, agrégat par étape, rapport
+"""
+import json
+
+import pytest
+
+import src.profiling as profiling
+from src.profiling import (disable_profiling, enable_profiling, get_records, profiled, reset_profiling,
+                           summarize, write_report)
+
+
+@profiled('test.etape')
+def _step(df):
+    return df
+
+
+@pytest.fixture
+def profiling_on(monkeypatch):
+    monkeypatch.setattr(profiling, '_records', profiling.deque(maxlen=10))
+    reset_profiling()
+    enable_profiling()
+    yield
+    disable_profiling()
+    reset_profiling()
+
+
+def test_disabled_records_nothing():
+    reset_profiling()
+    _step([1, 2])
+    assert get_records() == [] and summarize() == {}
+
+
+def test_records_bounded_and_summary_complete(profiling_on, transactions):
+    for _ in range(25):
+        _step(transactions)
+    records = get_records()
+    assert len(records) == 10
+    assert records[0]['rows_in'] == records[0]['rows_out'] == len(transactions)
+    assert summarize()['test.etape']['calls'] == 25
+
+
+def test_report_written_then_cleared(profiling_on, tmp_path):
+    for _ in range(12):
+        _step(None)
+    report = write_report(tmp_path / 'profil.json', metadata={'source': 'test'})
+    assert json.loads((tmp_path / 'profil.json').read_text(encoding='utf-8'))['summary'] == report['summary']
+    assert report['summary']['test.etape']['calls'] == 12
+    assert report['metadata'] == {'source': 'test', 'records_dropped': 2}
+    assert get_records() == [] and summarize() == {}
@@ -0,0 +1,77 @@
+"""
+Tests des recommandations : index de règles compilé contre le parcours de toutes les règles
+"""
+import pytest
+
+import src.recommendations as recommendations
+from src.cache import clear_cache
+from src.rule_index import build_rule_index, match_rules
+from src.recommendations import build_segment_popularity, get_customer_recommendations, segment_popularity_for
+
+
+def _histories(transactions, count=40):
+    histories = transactions.groupby('CustomerID')['Description'].unique()
+    return [set(history) for history in histories.iloc[::max(1, len(histories) // count)]]
+
+
+def test_match_rules_matches_full_scan(transactions, rules):
+    index = build_rule_index(rules)
+    matched_any = False
+    for history in _histories(transactions):
+        expected = [rule_id for rule_id, antecedents in enumerate(rules['antecedents'])
+                    if set(antecedents) <= history]
+        matched = list(match_rules(index, history))
+        assert matched == expected
+        matched_any |= bool(expected)
+    assert matched_any
+
+
+def test_empty_rules_and_unknown_products(rules):
+    assert len(match_rules(build_rule_index(rules.iloc[0:0]), {'A', 'B'})) == 0
+    assert len(match_rules(build_rule_index(rules), {'produit inconnu'})) == 0
+
+
+def test_association_recommendations_match_rule_scan(transactions, rfm_segments, rules):
+    popularity = build_segment_popularity(transactions, rfm_segments)
+    index = build_rule_index(rules)
+    for customer in rfm_segments.index[::10]:
+        history = set(transactions.loc[transactions['CustomerID'] == customer, 'Description'])
+        # Meilleur lift de chaque conséquent atteint, par parcours de toutes les règles
+        expected = {}
+        for rule in rules.itertuples():
+            if set(rule.antecedents) <= history:
+                for product in rule.consequents:
+                    if product not in history:
+                        expected[product] = max(expected.get(product, 0), round(rule.lift, 2))
+
+        result = get_customer_recommendations(transactions, rfm_segments, rules, customer,
+                                              rule_index=index, segment_popularity=popularity)
+        association = {row['produit']: row['lift'] for row in result['recommendations']
+                       if row['source'] == 'Association'}
+        best = sorted(expected.items(), key=lambda item: -item[1])[:10]
+        assert sorted(association.values(), reverse=True) == pytest.approx([lift for _, lift in best])
+        assert all(expected[product] == lift for product, lift in association.items())
+
+
+def test_segment_popularity_built_once_per_dataset(transactions, rfm_segments, rules, monkeypatch):
+    clear_cache()
+    calls = []
+    build = recommendations.build_segment_popularity
+    monkeypatch.setattr(recommendations, 'build_segment_popularity',
+                        lambda *args: calls.append(1) or build(*args))
+
+    customers = rfm_segments.index[:3]
+    for customer in customers:
+        get_customer_recommendations(transactions, rfm_segments, rules, customer)
+    assert len(calls) == 1
+    # Même contenu dans une autre table : même version, pas de recalcul
+    segment_popularity_for(transactions.copy(), rfm_segments.copy())
+    assert len(calls) == 1
+
+    # Segments modifiés : nouvelle version, table recalculée
+    relabelled = rfm_segments.assign(Segment=rfm_segments['Segment'].iloc[::-1].to_numpy())
+    popularity = segment_popularity_for(transactions, relabelled)
+    assert len(calls) == 2
+    expected = build(transactions, relabelled)
+    assert popularity.keys() == expected.keys()
+    assert all(popularity[segment].equals(expected[segment]) for segment in expected)
@@ -0,0 +1,112 @@
+"""
+Tests du calcul RFM, de la segmentation et des snapshots contre les versions historiques
+"""
+from datetime import timedelta
+from itertools import product
+
+import pandas as pd
+import pytest
+
+import src.rfm_analysis as rfm_analysis
+from src.compact import compact_transactions
+from src.rfm_analysis import assign_segments, calculate_rfm, map_rfm_to_segment
+
+
+def baseline_rfm(df, snapshot_date):
+    """Version historique (un appel Python par client)"""
+    return df.groupby('CustomerID').agg({
+        'InvoiceDate': lambda x: (snapshot_date - x.max()).days,
+        'InvoiceNo': 'nunique',
+        'TotalPrice': 'sum'
+    }).rename(columns={
+        'InvoiceDate': 'Récence',
+        'InvoiceNo': 'Fréquence',
+        'TotalPrice': 'Montant'
+    })
+
+
+@pytest.mark.parametrize('engine', ['pandas', 'numpy'])
+@pytest.mark.parametrize('compact', [False, True])
+def test_rfm_engines_match_baseline(transactions, engine, compact):
+    snapshot = transactions['InvoiceDate'].max() + timedelta(days=1)
+    expected = baseline_rfm(transactions, snapshot)
+    df = compact_transactions(transactions) if compact else transactions
+
+    rfm = calculate_rfm(df, snapshot, engine=engine)
+    pd.testing.assert_frame_equal(rfm.reset_index(drop=True), expected.reset_index(drop=True),
+                                  check_dtype=False, check_exact=False)
+    assert list(rfm.index.astype('int64')) == list(expected.index.astype('int64'))
+
+
+def test_unknown_engine_raises(transactions):
+    with pytest.raises(ValueError):
+        calculate_rfm(transactions, engine='spark')
+
+
+def baseline_segment(r_score, f_score, m_score):
+    """Cascade historique codée en dur"""
+    if r_score >= 4 and f_score >= 4 and m_score >= 4:
+        return 'Champions'
+    elif r_score >= 2 and f_score >= 3 and m_score >= 3:
+        return 'Clients Fidèles'
+    elif r_score >= 3 and f_score >= 2 and m_score >= 3:
+        return 'Potentiels Fidèles'
+    elif r_score >= 4 and f_score <= 1:
+        return 'Nouveaux Clients'
+    elif r_score <= 1 and f_score >= 4 and m_score >= 4:
+        return 'À Ne Pas Perdre'
+    elif r_score <= 1 and f_score <= 2 and m_score <= 2:
+        return 'Hibernants'
+    else:
+        return 'Autre'
+
+
+GRID = list(product(range(1, 6), repeat=3))
+
+
+def test_lookup_table_matches_baseline_cascade():
+    scores = pd.DataFrame(GRID, columns=['R_score', 'F_score', 'M_score'])
+    expected = [baseline_segment(*cell) for cell in GRID]
+    assert list(assign_segments(scores)) == expected
+    assert [map_rfm_to_segment(*cell) for cell in GRID] == expected
+    # Hors de la grille des quantiles : même cascade
+    assert map_rfm_to_segment(9, 9, 9) == baseline_segment(9, 9, 9)
+
+
+def test_segment_table_compiled_once(monkeypatch):
+    calls = []
+    build = rfm_analysis.build_segment_table
+
+    def counting_build(*args, **kwargs):
+        calls.append(args)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(rfm_analysis, '_SEGMENT_TABLE', None)
+    monkeypatch.setattr(rfm_analysis, 'build_segment_table', counting_build)
+    for cell in GRID:
+        map_rfm_to_segment(*cell)
+    assign_segments(pd.DataFrame(GRID, columns=['R_score', 'F_score', 'M_score']))
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize('freq', ['QE', 'ME'])
+def test_snapshots_match_full_recomputation(transactions, freq):
+    snapshots = rfm_analysis.compute_segment_snapshots(transactions, freq)
+    assert len(snapshots) >= 3
+    for period, rfm_q in snapshots.items():
+        snapshot = pd.Timestamp(period).normalize() + timedelta(days=1)
+        expected = rfm_analysis.score_rfm(
+            calculate_rfm(transactions[transactions['InvoiceDate'] < snapshot], snapshot))
+        expected['Segment'] = assign_segments(expected)
+        pd.testing.assert_frame_equal(
+            rfm_q[['Récence', 'Fréquence', 'Montant']].reset_index(drop=True),
+            expected[['Récence', 'Fréquence', 'Montant']].reset_index(drop=True),
+            check_dtype=False)
+        assert list(rfm_q.index) == list(expected.index)
+        assert list(rfm_q['Segment']) == list(expected['Segment'])
+
+
+def test_snapshots_cached_per_dataset_and_frequency(transactions):
+    quarterly = rfm_analysis.compute_segment_snapshots(transactions, 'QE')
+    assert rfm_analysis.compute_segment_snapshots(transactions, 'QE') is quarterly
+    assert rfm_analysis.compute_segment_snapshots(transactions, 'ME') is not quarterly
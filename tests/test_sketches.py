@@ -0,0 +1,61 @@
+"""
+Tests des sketches de métriques globales (fusion, sérialisation, précision)
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.metrics import compute_business_insights, compute_global_metrics
+from src.sketches import GlobalMetricsSketch, HyperLogLog, KLLSketch
+
+
+def test_merged_chunks_equal_single_pass(transactions):
+    half = len(transactions) // 2
+    merged = (GlobalMetricsSketch().update(transactions.iloc[:half])
+              .merge(GlobalMetricsSketch().update(transactions.iloc[half:])))
+    single = GlobalMetricsSketch().update(transactions)
+    np.testing.assert_array_equal(merged.invoices.registers, single.invoices.registers)
+    np.testing.assert_array_equal(merged.customers.registers, single.customers.registers)
+    assert merged.ca_total == pytest.approx(single.ca_total)
+
+
+def test_frame_round_trip(transactions):
+    sketch = GlobalMetricsSketch().update(transactions)
+    restored = GlobalMetricsSketch.from_frame(sketch.to_frame())
+    result, expected = restored.result(), sketch.result()
+    assert result['nb_commandes'] == expected['nb_commandes']
+    assert result['nb_clients'] == expected['nb_clients']
+    pd.testing.assert_series_equal(result['top_items'], expected['top_items'], check_index_type=False)
+
+
+def test_sketch_metrics_close_to_exact(transactions):
+    exact = compute_global_metrics(transactions, approximate=False)
+    approx = compute_global_metrics(transactions, approximate=True)
+    assert approx['ca_total'] == pytest.approx(exact['ca_total'])
+    for key in ('nb_commandes', 'nb_clients'):
+        assert abs(approx[key] - exact[key]) <= 0.05 * exact[key]
+    assert list(approx['top_items'].index) == list(exact['top_items'].index)
+
+
+def test_approximate_insights_use_sketch_totals_and_exact_thresholds(transactions, rfm_segments):
+    exact = compute_business_insights(transactions, rfm_segments, approximate=False)
+    sketch = GlobalMetricsSketch.from_frame(GlobalMetricsSketch().update(transactions).to_frame())
+    # Le CA total vient du sketch : les transactions ne sont pas agrégées
+    approx = compute_business_insights(transactions.iloc[0:0], rfm_segments, approximate=True, sketch=sketch)
+    assert approx['valeur_client_moyenne'] == pytest.approx(exact['valeur_client_moyenne'])
+    for key in ('nb_clients_risque', 'nb_opportunites', 'taux_retention', 'top_segment'):
+        assert approx[key] == exact[key]
+
+
+def test_hyperloglog_error_bound():
+    values = np.arange(200_000)
+    estimate = HyperLogLog(14).update(values).count()
+    assert abs(estimate - len(values)) <= 0.03 * len(values)
+
+
+def test_kll_rank_error():
+    values = np.random.default_rng(0).lognormal(2.0, 1.0, size=100_000)
+    sketch = KLLSketch(200).update(values)
+    for q in (0.25, 0.5, 0.75):
+        assert abs((values <= sketch.quantile(q)).mean() - q) <= 0.03
+
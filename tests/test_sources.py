@@ -0,0 +1,100 @@
+"""
+Tests des sources brutes : cache local par contenu, conversion Excel -> Parquet, synthetic://
+"""
+import io
+import urllib.error
+
+import pandas as pd
+import pytest
+
+import src.sources as sources
+from src.config import DEFAULT_CONFIG_PATH
+from src.sources import fetch_source, local_source, synthetic_source
+
+URL = 'https://example.org/Online%20Retail.xlsx'
+
+
+def _config(tmp_path, monkeypatch, offline=False):
+    path = tmp_path / f"config-{offline}.yaml"
+    text = open(DEFAULT_CONFIG_PATH, encoding='utf-8').read()
+    text = text.replace('raw_cache_dir: "data/raw"', f'raw_cache_dir: "{tmp_path / "raw"}"')
+    text = text.replace('offline: false', f'offline: {str(offline).lower()}')
+    path.write_text(text, encoding='utf-8')
+    monkeypatch.setenv('SEGMENTATION_CONFIG', str(path))
+
+
+class Response(io.BytesIO):
+    """Réponse HTTP factice (contenu et en-têtes de validation)"""
+
+    headers = {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """urlopen factice : contenu courant, 304 si l'ETag envoyé est à jour"""
+    _config(tmp_path, monkeypatch)
+    state = {'content': b'classeur v1', 'requests': []}
+
+    def urlopen(request, timeout=None):
+        state['requests'].append(dict(request.header_items()))
+        if request.get_header('If-none-match') == '"v1"' and state['content'] == b'classeur v1':
+            raise urllib.error.HTTPError(request.full_url, 304, 'Not Modified', {}, None)
+        return Response(state['content'])
+
+    monkeypatch.setattr(sources.urllib.request, 'urlopen', urlopen)
+    return state
+
+
+def test_download_once_then_read_locally(server):
+    path = fetch_source(URL)
+    assert open(path, 'rb').read() == b'classeur v1'
+    assert path.endswith('.xlsx')
+    assert fetch_source(URL) == path
+    assert len(server['requests']) == 1
+
+
+def test_refresh_revalidates_and_downloads_changes(server):
+    path = fetch_source(URL)
+    assert fetch_source(URL, refresh=True) == path  # 304 : copie conservée
+    assert server['requests'][-1].get('If-none-match') == '"v1"'
+
+    server['content'] = b'classeur v2'
+    changed = fetch_source(URL, refresh=True)
+    assert changed != path and open(changed, 'rb').read() == b'classeur v2'
+
+
+def test_offline_uses_cache_or_fails(server, tmp_path, monkeypatch):
+    path = fetch_source(URL)
+    _config(tmp_path, monkeypatch, offline=True)
+    assert fetch_source(URL, refresh=True) == path
+    with pytest.raises(ConnectionError):
+        fetch_source('https://example.org/autre.xlsx')
+    assert len(server['requests']) == 1
+
+
+def test_excel_converted_once_to_parquet(raw, tmp_path, monkeypatch):
+    _config(tmp_path, monkeypatch)
+    workbook = tmp_path / 'Online Retail.xlsx'
+    workbook.write_bytes(b'classeur')
+    reads = []
+    sample = raw.head(50).assign(StockCode=lambda df: df['StockCode'].where(df.index % 2 == 0, 85123))
+    monkeypatch.setattr(sources.pd, 'read_excel', lambda path: reads.append(path) or sample.copy())
+
+    target = local_source(str(workbook))
+    assert target.endswith('.parquet') and local_source(str(workbook)) == target
+    assert len(reads) == 1
+    converted = pd.read_parquet(target)
+    assert len(converted) == len(sample)
+    assert converted['StockCode'].map(type).eq(str).all()  # codes mixtes stockés en chaînes
+
+    csv = tmp_path / 'source.csv'
+    csv.write_text('a\n1\n')
+    assert local_source(str(csv)) == str(csv)
+
+
+def test_synthetic_source_parameters():
+    first = synthetic_source('synthetic://500?seed=3&affinity=0.5')
+    assert len(first) == 500
+    pd.testing.assert_frame_equal(first, synthetic_source('synthetic://500?seed=3&affinity=0.5'))
+    assert not first.equals(synthetic_source('synthetic://500?seed=4'))
+    assert sources.is_synthetic('synthetic://500') and not sources.is_remote('synthetic://500')
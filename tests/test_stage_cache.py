@@ -0,0 +1,95 @@
+"""
+Tests de la mémoïsation des étapes : clés (entrées, configuration, code) et éviction LRU
+"""
+import os
+
+import pytest
+
+import src.stage_cache as stage_cache
+from src.config import DEFAULT_CONFIG_PATH, get_settings
+from src.stage_cache import clear_stage_cache, run_stage, source_fingerprint
+
+
+@pytest.fixture
+def stage_dir(tmp_path, monkeypatch):
+    """Cache d'étapes de 1 Mo dans un répertoire temporaire"""
+    path = tmp_path / 'config.yaml'
+    text = open(DEFAULT_CONFIG_PATH, encoding='utf-8').read()
+    text = text.replace('stage_dir: "data/cache/stages"', f'stage_dir: "{tmp_path / "stages"}"')
+    text = text.replace('stage_max_mb: 2048', 'stage_max_mb: 1')
+    path.write_text(text, encoding='utf-8')
+    monkeypatch.setenv('SEGMENTATION_CONFIG', str(path))
+    return tmp_path / 'stages'
+
+
+class Counter:
+    """Calcul factice qui compte ses appels"""
+
+    def __init__(self, size=0):
+        self.calls, self.size = 0, size
+
+    def __call__(self):
+        self.calls += 1
+        return {'calls': self.calls, 'payload': os.urandom(self.size)}
+
+
+def test_second_run_reads_cache(stage_dir):
+    compute = Counter()
+    first, key, cached = run_stage('rfm', compute, inputs=('source',))
+    assert not cached
+    second, same_key, cached = run_stage('rfm', compute, inputs=('source',))
+    assert cached and same_key == key
+    assert second['calls'] == first['calls'] == 1
+
+    _, _, cached = run_stage('rfm', compute, inputs=('source',), refresh=True)
+    assert not cached and compute.calls == 2
+
+
+def test_inputs_config_and_code_change_the_key(stage_dir, monkeypatch):
+    compute = Counter()
+    settings = get_settings()
+    _, key, _ = run_stage('rfm', compute, inputs=('a',), config=settings.rfm, modules=('src.compact',))
+    _, other_input, cached = run_stage('rfm', compute, inputs=('b',), config=settings.rfm,
+                                       modules=('src.compact',))
+    assert not cached and other_input != key
+    _, other_config, cached = run_stage('rfm', compute, inputs=('a',), config={'recency_quantiles': 3},
+                                        modules=('src.compact',))
+    assert not cached and other_config != key
+
+    # Code modifié : autre empreinte du module
+    monkeypatch.setitem(stage_cache._module_digests, 'src.compact', 'modifie')
+    _, other_code, cached = run_stage('rfm', compute, inputs=('a',), config=settings.rfm,
+                                      modules=('src.compact',))
+    assert not cached and other_code != key
+    assert compute.calls == 4
+
+
+def test_least_recently_used_entries_evicted(stage_dir):
+    compute = Counter(size=400_000)
+    for name in ('a', 'b'):
+        run_stage(name, compute)
+    run_stage('a', compute)  # 'a' plus récent que 'b'
+    os.utime(stage_dir / next(f for f in os.listdir(stage_dir) if f.startswith('b-')), ns=(0, 0))
+    run_stage('c', compute)
+
+    remaining = sorted(filename.split('-')[0] for filename in os.listdir(stage_dir))
+    assert remaining == ['a', 'c']
+    clear_stage_cache()
+    assert os.listdir(stage_dir) == []
+
+
+def test_disabled_cache_always_computes(stage_dir, monkeypatch):
+    monkeypatch.setattr(stage_cache, 'stage_cache_dir', lambda settings=None: None)
+    compute = Counter()
+    run_stage('rfm', compute)
+    _, _, cached = run_stage('rfm', compute)
+    assert not cached and compute.calls == 2
+
+
+def test_source_fingerprint_follows_file(tmp_path):
+    path = tmp_path / 'source.csv'
+    path.write_text('a\n1\n')
+    before = source_fingerprint(str(path))
+    path.write_text('a\n1\n2\n')
+    assert source_fingerprint(str(path)) != before
+    assert source_fingerprint('synthetic://1000') == 'synthetic://1000'
@@ -0,0 +1,83 @@
+"""
+Tests du chemin en flux : blocs nettoyés, agrégats RFM, couples panier et achats
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.basket_analysis import basket_from_pairs, build_sparse_basket
+from src.compact import PairAccumulator, compact_transactions, fold_pairs
+from src.data_preprocessing import iter_clean_chunks, load_and_clean_data
+from src.item_similarity import build_item_similarity, item_similarity_from_purchases
+from src.metrics import compute_segment_totals
+from src.rfm_analysis import calculate_rfm, calculate_rfm_streaming
+
+CHUNKSIZE = 3_000
+
+
+@pytest.fixture(scope='module')
+def source(raw, tmp_path_factory):
+    path = tmp_path_factory.mktemp('flux') / 'source.csv'
+    raw.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def streamed(source):
+    """Un seul passage sur les blocs : RFM, couples (facture, produit) et (client, produit)"""
+    basket_pairs = PairAccumulator('InvoiceNo', weight='Quantity')
+    purchase_pairs = PairAccumulator('CustomerID')
+    chunks = fold_pairs(iter_clean_chunks(source, chunksize=CHUNKSIZE), basket_pairs, purchase_pairs)
+    return calculate_rfm_streaming(chunks), basket_pairs, purchase_pairs
+
+
+def test_chunks_match_full_cleaning(source):
+    chunks = list(iter_clean_chunks(source, chunksize=CHUNKSIZE))
+    assert len(chunks) > 1
+    streamed = compact_transactions(pd.concat(chunks))
+    full = load_and_clean_data(source)
+    assert len(streamed) == len(full)
+    assert streamed['TotalPrice'].sum() == pytest.approx(full['TotalPrice'].sum())
+
+
+def test_streaming_rfm_matches_full(source, streamed):
+    rfm, _, _ = streamed
+    expected = calculate_rfm(load_and_clean_data(source))
+    pd.testing.assert_frame_equal(rfm, expected, check_dtype=False, check_index_type=False)
+
+
+def test_basket_from_pairs_matches_full_basket(source, streamed):
+    _, basket_pairs, _ = streamed
+    basket, invoices, products = basket_from_pairs(basket_pairs)
+    expected, expected_invoices, expected_products = build_sparse_basket(load_and_clean_data(source))
+    assert list(products) == list(expected_products)
+    assert list(invoices.astype(str)) == list(expected_invoices.astype(str))
+    assert (basket != expected).nnz == 0
+
+
+def test_similarity_from_pairs_matches_full(source, streamed):
+    _, _, purchase_pairs = streamed
+    purchases, _, products = purchase_pairs.matrix()
+    similarity = item_similarity_from_purchases(purchases, products)
+    expected = build_item_similarity(load_and_clean_data(source))
+    assert list(similarity['products']) == list(expected['products'])
+    np.testing.assert_array_equal(similarity['neighbors'], expected['neighbors'])
+    np.testing.assert_allclose(similarity['scores'], expected['scores'], rtol=1e-6)
+
+
+def test_empty_stream_gives_empty_aggregates(raw, tmp_path):
+    path = tmp_path / 'annulations.csv'
+    cancelled = raw.head(100).assign(Quantity=-1)
+    cancelled.to_csv(path, index=False)
+    pairs = PairAccumulator('InvoiceNo', weight='Quantity')
+    rfm = calculate_rfm_streaming(fold_pairs(iter_clean_chunks(str(path)), pairs))
+    assert rfm.empty
+    basket, invoices, products = basket_from_pairs(pairs)
+    assert basket.shape == (0, 0)
+
+
+def test_segment_totals_from_rfm(rfm_segments):
+    totals = compute_segment_totals(rfm_segments)
+    assert totals['Clients'].sum() == len(rfm_segments)
+    assert totals['CA'].sum() == pytest.approx(rfm_segments['Montant'].sum())
+    assert totals['CA'].is_monotonic_decreasing